@@ -1,20 +1,25 @@
 # agente_pesquisa_contratos.py - Versão 3.0 (Pesquisa Ampla e Aprofundada)
 
 import asyncio
-import aiohttp
-import re
 from datetime import datetime
-from typing import Dict, Any, List
-from googlesearch import search
-from bs4 import BeautifulSoup
+from typing import Dict, Any, List, Optional
+
+from loop_assincrono import executar_no_loop
+from cache_paginas import CachePaginas
+from cache_buscas import CacheBuscas
+from extracao_html import extrair_texto_html_async
+from sessao_http import obter_sessao
+from deduplicacao import remover_quase_duplicados
+from selecao_trechos import selecionar_trechos
 
 class AgentePesquisaContratos:
     """
     Agente de Pesquisa Otimizado e Especializado em encontrar modelos e cláusulas de contratos.
     v3.0: Realiza uma pesquisa ampla no Google, sem se restringir a sites pré-definidos,
     garantindo uma maior diversidade de fontes e resiliência a bloqueios.
+    As buscas e as páginas já baixadas são reaproveitadas por meio dos caches compartilhados.
     """
-    def __init__(self):
+    def __init__(self, cache_paginas: Optional[CachePaginas] = None, cache_buscas: Optional[CacheBuscas] = None):
         print("🔍 Inicializando Agente de Pesquisa de CONTRATOS (Pesquisa Ampla v3.0)...")
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -26,36 +31,32 @@ class AgentePesquisaContratos:
             'tamanho_maximo_conteudo': 20000,
             'min_sucessos_por_termo': 4,
             'google_search_results': 10,
+            'caracteres_por_fonte': 2000, # Trechos mais relevantes de cada modelo enviados ao redator.
         }
+        # COMENTÁRIO: Os caches de páginas e de buscas são compartilhados entre os agentes de pesquisa (injetados pelo orquestrador).
+        self.cache_paginas = cache_paginas or CachePaginas()
+        self.cache_buscas = cache_buscas or CacheBuscas()
         print("✅ Sistema de pesquisa de CONTRATOS inicializado.")
 
+    async def _limpar_html(self, html: str) -> Dict[str, Any]:
+        """Texto limpo da página, preservando as quebras de linha, extraído no pool de processos (fora do event loop)."""
+        return await extrair_texto_html_async(html, remover_tags=('script', 'style', 'nav', 'footer', 'header'), separador='\n')
+
     async def _extrair_conteudo_url_async(self, session, url: str) -> Dict[str, Any]:
-        """Extrai conteúdo de uma URL de forma assíncrona com logs detalhados."""
+        """Extrai conteúdo de uma URL de forma assíncrona (do cache de páginas, quando possível) com logs detalhados."""
         print(f"→ Tentando extrair de: {url}")
-        try:
-            async with session.get(url, headers=self.headers, timeout=15, ssl=False) as response:
-                if response.status == 200:
-                    raw_html = await response.read()
-                    html = raw_html.decode('utf-8', errors='ignore')
-                    soup = BeautifulSoup(html, 'html.parser')
-                    for tag in soup.find_all(['script', 'style', 'nav', 'footer', 'header']):
-                        tag.decompose()
-                    texto = soup.body.get_text(separator='\n', strip=True) if soup.body else ""
-                    texto_limpo = re.sub(r'\n\s*\n', '\n', texto).strip()
-                    
-                    if len(texto_limpo) < self.config['tamanho_minimo_conteudo']:
-                        print(f"⚠️ Descartado (curto): {url}")
-                        return None
+        pagina = await self.cache_paginas.obter(session, url, self._limpar_html, "pesquisa_contratos", self.headers, 15, max_caracteres=self.config['tamanho_maximo_conteudo'])
+        if not pagina:
+            return None
 
-                    print(f"✔ SUCESSO: Conteúdo extraído de {url} ({len(texto_limpo)} caracteres)")
-                    return {"url": url, "texto": texto_limpo[:self.config['tamanho_maximo_conteudo']]}
-                else:
-                    print(f"❌ Falha (Status {response.status}): {url}")
-                    return None
-        except Exception as e:
-            print(f"❌ Falha (Erro: {type(e).__name__}): {url}")
+        texto_limpo = pagina['texto']
+        if len(texto_limpo) < self.config['tamanho_minimo_conteudo']:
+            print(f"⚠️ Descartado (curto): {url}")
             return None
 
+        print(f"✔ SUCESSO: Conteúdo extraído de {url} ({len(texto_limpo)} caracteres)")
+        return {"url": url, "texto": texto_limpo[:self.config['tamanho_maximo_conteudo']]}
+
     async def _pesquisar_e_extrair_async(self, termo: str) -> List[Dict[str, Any]]:
         """
         COMENTÁRIO: Lógica principal aprimorada. Agora ele busca mais links e tenta extrair
@@ -71,22 +72,22 @@ class AgentePesquisaContratos:
         urls_tentadas = set()
         
         try:
-            loop = asyncio.get_event_loop()
-            urls_google = await loop.run_in_executor(None, lambda: list(search(query, num_results=self.config['google_search_results'], lang="pt")))
+            urls_google = await self.cache_buscas.buscar(query, num_results=self.config['google_search_results'], lang="pt")
             
-            async with aiohttp.ClientSession() as session:
-                tasks = []
-                for url in urls_google:
-                    if url not in urls_tentadas:
-                        urls_tentadas.add(url)
-                        tasks.append(self._extrair_conteudo_url_async(session, url))
-                
-                resultados_tasks = await asyncio.gather(*tasks)
-                
-                resultados_sucesso = [res for res in resultados_tasks if res]
+            # COMENTÁRIO: Sessão HTTP única do processo: conexões e consultas DNS são reaproveitadas entre termos e solicitações.
+            session = obter_sessao()
+            tasks = []
+            for url in urls_google:
+                if url not in urls_tentadas:
+                    urls_tentadas.add(url)
+                    tasks.append(self._extrair_conteudo_url_async(session, url))
+            
+            resultados_tasks = await asyncio.gather(*tasks)
+            
+            resultados_sucesso = [{**res, 'termo': termo} for res in resultados_tasks if res]
 
-                # Limita ao número mínimo de sucessos desejado
-                resultados_sucesso = resultados_sucesso[:self.config['min_sucessos_por_termo']]
+            # Limita ao número mínimo de sucessos desejado
+            resultados_sucesso = resultados_sucesso[:self.config['min_sucessos_por_termo']]
 
             print(f"🎯 Pesquisa para '{termo}' concluída com {len(resultados_sucesso)} extrações bem-sucedidas.")
             return resultados_sucesso
@@ -100,19 +101,24 @@ class AgentePesquisaContratos:
         resultados_brutos = await asyncio.gather(*tasks)
         
         todos_conteudos = [item for sublist in resultados_brutos for item in sublist]
+        # COMENTÁRIO: O mesmo modelo costuma ser republicado em vários sites; cada cópia custaria tokens em todas as seções.
+        total_bruto = len(todos_conteudos)
+        todos_conteudos = remover_quase_duplicados(todos_conteudos)
+        if len(todos_conteudos) < total_bruto:
+            print(f"♻️ {total_bruto - len(todos_conteudos)} modelos quase duplicados removidos da pesquisa.")
         
         pesquisa_formatada = "## Modelos e Cláusulas de Referência Encontrados:\n\n"
         for item in todos_conteudos:
             pesquisa_formatada += f"### Fonte: {item['url']}\n\n"
-            pesquisa_formatada += f"```text\n{item['texto'][:2000]}...\n```\n\n---\n\n"
+            pesquisa_formatada += f"```text\n{selecionar_trechos(item['texto'], item['termo'], self.config['caracteres_por_fonte'])}...\n```\n\n---\n\n"
             
         return {"pesquisa_formatada": pesquisa_formatada, "conteudos_extraidos": todos_conteudos}
 
-    def pesquisar_fundamentacao_completa(self, fundamentos: List[str], **kwargs) -> Dict[str, Any]:
-        """Ponto de entrada síncrono que executa a lógica assíncrona."""
+    async def pesquisar_fundamentacao_completa_async(self, fundamentos: List[str], **kwargs) -> Dict[str, Any]:
+        """Ponto de entrada assíncrono usado pelo orquestrador."""
         inicio_pesquisa = datetime.now()
         try:
-            resultado = asyncio.run(self.pesquisar_modelos_async(fundamentos))
+            resultado = await self.pesquisar_modelos_async(fundamentos)
         except Exception as e:
             print(f"❌ Erro crítico durante a pesquisa de contratos: {e}")
             return {"pesquisa_formatada": "A pesquisa de modelos de contrato falhou.", "conteudos_extraidos": []}
@@ -130,4 +136,8 @@ class AgentePesquisaContratos:
             print("⚠️ Nenhum modelo ou conteúdo relevante foi extraído com sucesso.")
         print(f"✅ PESQUISA DE CONTRATOS CONCLUÍDA em {tempo_total:.1f} segundos\n")
         
-        return resultado
\ No newline at end of file
+        return resultado
+
+    def pesquisar_fundamentacao_completa(self, fundamentos: List[str], **kwargs) -> Dict[str, Any]:
+        """Ponto de entrada síncrono: executa a versão assíncrona no event loop persistente."""
+        return executar_no_loop(self.pesquisar_fundamentacao_completa_async(fundamentos, **kwargs))
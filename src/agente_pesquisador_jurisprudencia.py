@@ -1,32 +1,51 @@
 # agente_pesquisador_jurisprudencia.py - v4.3 (Com Lógica de Busca Corrigida)
 
 import asyncio
-import aiohttp
-import re
-import openai
 import os
+import re
 import random
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
-from googlesearch import search
-from bs4 import BeautifulSoup
+from typing import Dict, Any, List, Optional
+
+from loop_assincrono import executar_no_loop
+from cliente_llm import ClienteLLM
+from cache_paginas import CachePaginas
+from cache_buscas import CacheBuscas
+from extracao_html import extrair_texto_html_async
+from sessao_http import obter_sessao
+from indice_jurisprudencia import IndiceJurisprudencia
+from pre_filtro_jurisprudencia import PreFiltroJurisprudencia
+from cache_vereditos import CacheVereditos
+from selecao_trechos import selecionar_trechos
 from urllib.parse import urlparse
 
+# COMENTÁRIO: Linhas da resposta em lote, ex: "3: SIM", "[4] - NÃO".
+_RE_VEREDITO_LOTE = re.compile(r'\[?(\d+)\]?\s*[:=\-)]\s*"?(SIM|NÃO|NAO)\b')
+
 class AgentePesquisadorJurisprudencia:
     """
     Agente Especializado em Pesquisa de Jurisprudência.
     v4.3: Lógica de busca no Google corrigida para remover o parâmetro 'start' incompatível.
+    As jurisprudências aprovadas vão para o índice local, consultado antes da raspagem na web.
+    Uma triagem local aprova ou descarta os casos evidentes; só os ambíguos são validados com IA, em lotes.
+    Os vereditos ficam em cache por URL e termo: páginas já reprovadas nem são baixadas de novo.
     """
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, cliente_llm: Optional[ClienteLLM] = None, cache_paginas: Optional[CachePaginas] = None, cache_buscas: Optional[CacheBuscas] = None, indice_jurisprudencia: Optional[IndiceJurisprudencia] = None, cache_vereditos: Optional[CacheVereditos] = None):
         print("⚖️  Inicializando Agente de Pesquisa de JURISPRUDÊNCIA (v4.3)...")
         
         if not api_key:
             api_key = os.getenv('DEEPSEEK_API_KEY')
         
-        if not api_key:
+        if not api_key and not cliente_llm:
             raise ValueError("A chave da API da DeepSeek é necessária para o filtro de relevância e não foi encontrada.")
         
-        self.client = openai.OpenAI(api_key=api_key, base_url="https://api.deepseek.com/v1")
+        self.cliente_llm = cliente_llm or ClienteLLM(api_key=api_key)
+        self.cache_paginas = cache_paginas or CachePaginas()
+        self.cache_buscas = cache_buscas or CacheBuscas()
+        self.indice_jurisprudencia = indice_jurisprudencia or IndiceJurisprudencia()
+        self.pre_filtro = PreFiltroJurisprudencia()
+        self.cache_vereditos = cache_vereditos or CacheVereditos()
+        self.contadores_relevancia = {'aprovadas_localmente': 0, 'descartadas_localmente': 0, 'validadas_com_ia': 0, 'chamadas_ia': 0, 'itens_reenviados': 0}
         
         self.user_agents = [
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
@@ -41,12 +60,14 @@ class AgentePesquisadorJurisprudencia:
             'tamanho_minimo_conteudo': 300,
             'min_sucessos_por_termo': 10,
             'google_search_results': 25, # Pede uma lista grande de uma só vez
+            'tamanho_lote_ia': int(os.getenv('JURIDOC_LOTE_RELEVANCIA', '8')), # Páginas classificadas por chamada à IA
+            'caracteres_por_item_ia': 2000,
         }
         self.sites_prioritarios = ['jusbrasil.com.br', 'stj.jus.br', 'stf.jus.br', 'tst.jus.br', 'conjur.com.br', 'migalhas.com.br', 'ambito-juridico.com.br']
         print("✅ Sistema de pesquisa de JURISPRUDÊNCIA inicializado.")
 
-    async def _validar_relevancia_com_ia_async(self, texto: str, termo_pesquisa: str) -> bool:
-        # ... (código de validação com IA permanece o mesmo)
+    async def _validar_relevancia_com_ia_async(self, texto: str, termo_pesquisa: str) -> Optional[bool]:
+        """Veredito da IA para uma página; None se a chamada falhar (a página não é aprovada, mas o veredito não vai para o cache)."""
         try:
             prompt = f"""
             Analise o seguinte texto e determine se ele é uma JURISPRUDÊNCIA (decisão judicial, acórdão, ementa) relevante para o termo de pesquisa "{termo_pesquisa}".
@@ -54,58 +75,122 @@ class AgentePesquisadorJurisprudencia:
 
             TEXTO PARA ANÁLISE:
             ---
-            {texto[:2000]}
+            {selecionar_trechos(texto, termo_pesquisa, self.config['caracteres_por_item_ia'])}
             ---
             """
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
-                model="deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=10,
-                temperature=0.0
-            )
-            resposta = response.choices[0].message.content.strip().upper()
+            resposta = await self.cliente_llm.completar(prompt, temperatura=0.0, max_tokens=10)
+            resposta = resposta.strip().upper()
             return "SIM" in resposta
         except Exception as e:
             print(f"⚠️ Erro na validação com IA: {e}")
-            return False
+            return None
 
-    async def _extrair_e_validar_async(self, session, url: str, termo_pesquisa: str) -> Dict[str, Any]:
-        # ... (código de extração via Google Cache permanece o mesmo)
-        cached_url = f"http://webcache.googleusercontent.com/search?q=cache:{url}"
-        print(f"→ Tentando extrair de (via cache): {url}")
+    async def _validar_relevancia_em_lote_async(self, paginas: List[Dict[str, Any]], termo_pesquisa: str) -> List[Optional[bool]]:
+        """
+        Classifica várias páginas numa única chamada à IA, com um veredito por item.
+        Retorna None para os itens cuja resposta não pôde ser interpretada.
+        """
+        limite = self.config['caracteres_por_item_ia']
+        textos = "\n\n".join(f"[{indice}]\n{selecionar_trechos(pagina['texto'], termo_pesquisa, limite)}" for indice, pagina in enumerate(paginas, 1))
+        prompt = f"""
+        Analise cada um dos {len(paginas)} textos numerados abaixo e determine se ele é uma JURISPRUDÊNCIA (decisão judicial, acórdão, ementa) relevante para o termo de pesquisa "{termo_pesquisa}".
+        Responda APENAS com uma linha por texto, no formato "número: SIM" ou "número: NÃO" (ex: "1: SIM"), sem nenhum comentário.
+
+        TEXTOS PARA ANÁLISE:
+        ---
+        {textos}
+        ---
+        """
         try:
-            request_headers = self.headers.copy()
-            request_headers['User-Agent'] = random.choice(self.user_agents)
-
-            async with session.get(cached_url, headers=request_headers, timeout=20, ssl=False) as response:
-                if response.status == 200:
-                    raw_html = await response.read()
-                    html = raw_html.decode('utf-8', errors='ignore')
-                    soup = BeautifulSoup(html, 'html.parser')
-                    for tag in soup.find_all(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-                        tag.decompose()
-                    
-                    texto = soup.body.get_text(separator=' ', strip=True) if soup.body else ""
-                    texto_limpo = re.sub(r'\s+', ' ', texto).strip()
-                    
-                    if len(texto_limpo) < self.config['tamanho_minimo_conteudo']:
-                        print(f"⚠️ Descartado (curto): {url}")
-                        return None
-
-                    print(f"  -> Validando relevância do conteúdo com IA...")
-                    if await self._validar_relevancia_com_ia_async(texto_limpo, termo_pesquisa):
-                        print(f"✔ SUCESSO (IA APROVOU): Conteúdo extraído de {url} ({len(texto_limpo)} caracteres)")
-                        return { "url": url, "texto": texto_limpo, "titulo": soup.title.string.strip() if soup.title else "N/A" }
-                    else:
-                        print(f"⚠️ Descartado (IA Reprovou como irrelevante): {url}")
-                        return None
-                else:
-                    print(f"❌ Falha (Status {response.status}): {url}")
-                    return None
+            resposta = await self.cliente_llm.completar(prompt, temperatura=0.0, max_tokens=8 * len(paginas) + 20)
         except Exception as e:
-            print(f"❌ Falha (Erro: {type(e).__name__}): {url}")
+            print(f"⚠️ Erro na validação em lote com IA: {e}")
+            return [None] * len(paginas)
+        vereditos = {int(numero): veredito == "SIM" for numero, veredito in _RE_VEREDITO_LOTE.findall(resposta.upper())}
+        return [vereditos.get(indice) for indice in range(1, len(paginas) + 1)]
+
+    async def _classificar_com_ia_async(self, paginas: List[Dict[str, Any]], termo_pesquisa: str) -> List[Optional[bool]]:
+        """Um lote por chamada; os itens sem veredito interpretável são validados individualmente (None se ainda assim falharem)."""
+        if len(paginas) == 1:
+            self.contadores_relevancia['chamadas_ia'] += 1
+            return [await self._validar_relevancia_com_ia_async(paginas[0]['texto'], termo_pesquisa)]
+        self.contadores_relevancia['chamadas_ia'] += 1
+        vereditos = await self._validar_relevancia_em_lote_async(paginas, termo_pesquisa)
+        pendentes = [indice for indice, veredito in enumerate(vereditos) if veredito is None]
+        if pendentes:
+            print(f"⚠️ Resposta do lote incompleta ({len(pendentes)} de {len(paginas)} sem veredito); validando esses itens um a um.")
+            self.contadores_relevancia['itens_reenviados'] += len(pendentes)
+            self.contadores_relevancia['chamadas_ia'] += len(pendentes)
+            individuais = await asyncio.gather(*[self._validar_relevancia_com_ia_async(paginas[indice]['texto'], termo_pesquisa) for indice in pendentes])
+            for indice, veredito in zip(pendentes, individuais):
+                vereditos[indice] = veredito
+        return vereditos
+
+    async def _filtrar_relevantes_async(self, paginas: List[Dict[str, Any]], termo_pesquisa: str, vereditos_conhecidos: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Vereditos em cache (para o mesmo conteúdo) primeiro, depois a triagem local; as páginas ambíguas são
+        validadas pela IA em lotes de 'tamanho_lote_ia' (os lotes são enviados em paralelo).
+        Mantém a ordem original das páginas e grava no cache os novos vereditos. Páginas sem veredito (falha na
+        chamada à IA) não são aprovadas nesta pesquisa nem gravadas no cache, para serem julgadas de novo depois.
+        """
+        vereditos_conhecidos = vereditos_conhecidos or {}
+        do_cache = [self.cache_vereditos.veredito_valido(vereditos_conhecidos.get(pagina['url']), pagina['texto']) for pagina in paginas]
+        novos = [indice for indice, veredito in enumerate(do_cache) if veredito is None]
+        vereditos: List[Optional[bool]] = list(do_cache)
+        for indice in novos:
+            vereditos[indice] = self.pre_filtro.classificar(paginas[indice]['texto'], termo_pesquisa)
+            if vereditos[indice] is True: self.contadores_relevancia['aprovadas_localmente'] += 1
+            if vereditos[indice] is False: self.contadores_relevancia['descartadas_localmente'] += 1
+
+        ambiguas = [indice for indice in novos if vereditos[indice] is None]
+        self.contadores_relevancia['validadas_com_ia'] += len(ambiguas)
+        if ambiguas:
+            tamanho_lote = max(1, self.config['tamanho_lote_ia'])
+            lotes = [ambiguas[inicio:inicio + tamanho_lote] for inicio in range(0, len(ambiguas), tamanho_lote)]
+            print(f"  -> Validando relevância de {len(ambiguas)} páginas com IA em {len(lotes)} chamada(s)...")
+            resultados_lotes = await asyncio.gather(*[self._classificar_com_ia_async([paginas[indice] for indice in lote], termo_pesquisa) for lote in lotes])
+            for lote, resultado in zip(lotes, resultados_lotes):
+                for indice, veredito in zip(lote, resultado):
+                    vereditos[indice] = veredito
+
+        await asyncio.gather(*[
+            self.cache_vereditos.definir(paginas[indice]['url'], termo_pesquisa, paginas[indice]['texto'], vereditos[indice])
+            for indice in novos if vereditos[indice] is not None
+        ])
+
+        aprovadas = []
+        validadas_com_ia, julgadas_antes = set(ambiguas), set(range(len(paginas))) - set(novos)
+        for indice, (pagina, veredito) in enumerate(zip(paginas, vereditos)):
+            origem = "IA" if indice in validadas_com_ia else "VEREDITO EM CACHE" if indice in julgadas_antes else "TRIAGEM LOCAL"
+            if veredito:
+                print(f"✔ SUCESSO ({origem} APROVOU): Conteúdo extraído de {pagina['url']} ({len(pagina['texto'])} caracteres)")
+                aprovadas.append(pagina)
+            elif veredito is None:
+                print(f"⚠️ Descartado nesta pesquisa (sem veredito da IA): {pagina['url']}")
+            else:
+                print(f"⚠️ Descartado ({origem} reprovou como irrelevante): {pagina['url']}")
+        return aprovadas
+
+    async def _limpar_html(self, html: str) -> Dict[str, Any]:
+        """Texto limpo e título da página, extraídos no pool de processos (fora do event loop)."""
+        return await extrair_texto_html_async(html, separador=' ')
+
+    async def _extrair_async(self, session, url: str) -> Optional[Dict[str, Any]]:
+        # ... (código de extração via Google Cache permanece o mesmo; a página baixada passa pelo cache de páginas)
+        cached_url = f"http://webcache.googleusercontent.com/search?q=cache:{url}"
+        print(f"→ Tentando extrair de (via cache): {url}")
+        request_headers = self.headers.copy()
+        request_headers['User-Agent'] = random.choice(self.user_agents)
+
+        pagina = await self.cache_paginas.obter(session, cached_url, self._limpar_html, "jurisprudencia", request_headers, 20)
+        if not pagina:
+            return None
+
+        texto_limpo = pagina['texto']
+        if len(texto_limpo) < self.config['tamanho_minimo_conteudo']:
+            print(f"⚠️ Descartado (curto): {url}")
             return None
+        return { "url": url, "texto": texto_limpo, "titulo": pagina['titulo'] }
 
     async def _pesquisar_termo_async(self, termo: str) -> List[Dict[str, Any]]:
         """
@@ -114,44 +199,62 @@ class AgentePesquisadorJurisprudencia:
         """
         print(f"\n📚 Buscando jurisprudência para o termo: '{termo}'...")
         
+        # COMENTÁRIO: O índice local responde primeiro; a raspagem só completa o que faltar para a meta.
+        resultados_locais = self.indice_jurisprudencia.pesquisar(termo, limite=self.config['min_sucessos_por_termo'])
+        faltantes = self.config['min_sucessos_por_termo'] - len(resultados_locais)
+        if faltantes <= 0:
+            print(f"⚡ Pesquisa para '{termo}' respondida pelo índice local ({len(resultados_locais)} jurisprudências).")
+            return resultados_locais
+        if resultados_locais:
+            print(f"  -> {len(resultados_locais)} jurisprudências do índice local; buscando mais {faltantes} na web.")
+
         resultados_sucesso = []
-        urls_ja_vistas = set()
+        urls_ja_vistas = {item['url'] for item in resultados_locais}
         
         try:
-            loop = asyncio.get_event_loop()
-            
             dominios_query = " OR ".join([f"site:{site}" for site in self.sites_prioritarios])
             query = f'"{termo}" jurisprudência ementa acórdão {dominios_query}'
             
             # COMENTÁRIO: A chamada ao 'search' foi corrigida, removendo o parâmetro 'start'.
-            # Ele agora pede uma lista grande de resultados de uma só vez.
-            urls_encontradas = await loop.run_in_executor(None, lambda: list(search(query, num_results=self.config['google_search_results'], lang="pt")))
+            # Ele agora pede uma lista grande de resultados de uma só vez (respondida pelo cache de buscas, quando possível).
+            urls_encontradas = await self.cache_buscas.buscar(query, num_results=self.config['google_search_results'], lang="pt")
             
             if not urls_encontradas:
                 print("  -> Google não retornou links. Encerrando busca para este termo.")
-                return []
+                return resultados_locais
 
             urls_novas = [url for url in urls_encontradas if url not in urls_ja_vistas and "/busca?" not in url]
             urls_ja_vistas.update(urls_novas)
 
-            async with aiohttp.ClientSession() as session:
-                tasks = []
-                for url in urls_novas:
-                    # Adiciona a tarefa à lista para ser executada em paralelo
-                    tasks.append(self._extrair_e_validar_async(session, url, termo))
-                
-                # Executa todas as tarefas de extração e validação em paralelo
-                resultados_tasks = await asyncio.gather(*tasks)
+            # COMENTÁRIO: Páginas já julgadas irrelevantes para este termo são ignoradas sem download nem IA.
+            vereditos_conhecidos = dict(zip(urls_novas, await asyncio.gather(*[self.cache_vereditos.obter(url, termo) for url in urls_novas])))
+            irrelevantes = [url for url, veredito in vereditos_conhecidos.items() if veredito and not veredito['relevante']]
+            if irrelevantes:
+                self.cache_vereditos.contadores['ignoradas_sem_download'] += len(irrelevantes)
+                print(f"  -> {len(irrelevantes)} páginas já julgadas irrelevantes para '{termo}' foram ignoradas (sem download).")
+                urls_novas = [url for url in urls_novas if url not in irrelevantes]
+
+            # COMENTÁRIO: Sessão HTTP única do processo: conexões e consultas DNS são reaproveitadas entre termos e solicitações.
+            session = obter_sessao()
+            tasks = []
+            for url in urls_novas:
+                # Adiciona a tarefa à lista para ser executada em paralelo
+                tasks.append(self._extrair_async(session, url))
+            
+            # Executa todas as extrações em paralelo e depois valida a relevância do conjunto (em lotes)
+            paginas = [pagina for pagina in await asyncio.gather(*tasks) if pagina]
+            aprovados = await self._filtrar_relevantes_async(paginas, termo, vereditos_conhecidos)
 
-                # Filtra apenas os resultados bem-sucedidos e limita à meta
-                resultados_sucesso = [res for res in resultados_tasks if res][:self.config['min_sucessos_por_termo']]
+            # Todos os aprovados vão para o índice local; o retorno é limitado ao que falta para a meta
+            self.indice_jurisprudencia.adicionar(aprovados, termo)
+            resultados_sucesso = aprovados[:faltantes]
 
             print(f"🎯 Pesquisa para '{termo}' concluída com {len(resultados_sucesso)} extrações bem-sucedidas.")
-            return resultados_sucesso
+            return resultados_locais + resultados_sucesso
 
         except Exception as e:
             print(f"⚠️ Falha crítica na busca: {e}")
-            return resultados_sucesso
+            return resultados_locais + resultados_sucesso
 
     async def pesquisar_jurisprudencia_async(self, termos: List[str]) -> List[Dict[str, Any]]:
         """Cria e executa todas as tarefas de pesquisa em paralelo."""
@@ -161,11 +264,11 @@ class AgentePesquisadorJurisprudencia:
         todos_os_resultados = [item for sublist in resultados_por_termo for item in sublist]
         return todos_os_resultados
 
-    def pesquisar(self, termos: List[str]) -> List[Dict[str, Any]]:
-        """Ponto de entrada síncrono que executa a lógica assíncrona."""
+    async def pesquisar_async(self, termos: List[str]) -> List[Dict[str, Any]]:
+        """Ponto de entrada assíncrono usado pelo orquestrador."""
         inicio_pesquisa = datetime.now()
         try:
-            resultado = asyncio.run(self.pesquisar_jurisprudencia_async(termos))
+            resultado = await self.pesquisar_jurisprudencia_async(termos)
         except Exception as e:
             print(f"❌ Erro crítico durante a pesquisa de jurisprudência: {e}")
             return []
@@ -173,5 +276,10 @@ class AgentePesquisadorJurisprudencia:
         tempo_total = (datetime.now() - inicio_pesquisa).total_seconds()
         print(f"\n--- RESUMO DA PESQUISA DE JURISPRUDÊNCIA ---")
         print(f"✅ Total de {len(resultado)} conteúdos relevantes encontrados.")
+        print(f"📊 Relevância: {self.contadores_relevancia} | Vereditos em cache: {self.cache_vereditos.contadores}")
         print(f"✅ PESQUISA CONCLUÍDA em {tempo_total:.1f} segundos\n")
         return resultado
+
+    def pesquisar(self, termos: List[str]) -> List[Dict[str, Any]]:
+        """Ponto de entrada síncrono: executa a versão assíncrona no event loop persistente."""
+        return executar_no_loop(self.pesquisar_async(termos))
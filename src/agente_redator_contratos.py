@@ -3,40 +3,43 @@
 import json
 import logging
 import asyncio
-import openai
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Set
 import re
 from datetime import datetime
 
+from redacao_secoes import gerar_secoes_async
+from loop_assincrono import executar_no_loop
+from cliente_llm import ClienteLLM
+from orcamento_tokens import OrcamentoTokens
+from construtor_prompts import ContextosSecoes
+
 class AgenteRedatorContratos:
     """
     Agente Redator Otimizado e Especializado na redação de Contratos.
     v5.3: Lógica de qualificação das partes e de inclusão de cláusulas aprimorada para evitar erros e alucinações.
     """
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cliente_llm: Optional[ClienteLLM] = None):
         if not api_key: raise ValueError("DEEPSEEK_API_KEY não configurada")
-        self.client = openai.OpenAI(api_key=api_key, base_url="https://api.deepseek.com/v1")
+        # COMENTÁRIO: O cliente é compartilhado entre os agentes (injetado pelo orquestrador) para reaproveitar conexões.
+        self.cliente_llm = cliente_llm or ClienteLLM(api_key=api_key)
+        self.orcamento_tokens = OrcamentoTokens()
         print("✅ Agente Redator de CONTRATOS (Dinâmico v5.3) inicializado.")
 
-    async def _chamar_api_async(self, prompt: str, secao_nome: str) -> str:
+    async def _chamar_api_async(self, prompt: str, secao_nome: str, tamanho_alvo: Optional[int] = None, texto_anterior: Optional[str] = None, contexto: Optional[str] = None, ler_cache: bool = True) -> str:
         """Chama a API de forma assíncrona para gerar uma seção específica do contrato."""
         print(f"📝 Gerando/Melhorando cláusula: {secao_nome}")
         try:
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
-                model="deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=8192,
-                temperature=0.2
-            )
-            return re.sub(r'^```html|```$', '', response.choices[0].message.content.strip())
+            conteudo = await self.cliente_llm.completar(prompt, temperatura=0.2, max_tokens=8192, tamanho_alvo=tamanho_alvo, texto_anterior=texto_anterior, contexto=contexto, ler_cache=ler_cache)
+            return re.sub(r'^```html|```$', '', conteudo.strip())
         except Exception as e:
             print(f"❌ ERRO na API para a cláusula {secao_nome}: {e}")
+            # Numa continuação, a falha mantém o texto já existente em vez de anexar a mensagem de erro.
+            if texto_anterior: return ""
             return f"<h3>ERRO AO GERAR CLÁUSULA - {secao_nome.upper()}</h3><p>Detalhes: {e}</p>"
 
-    async def gerar_documento_html_puro_async(self, dados_formulario: Dict, pesquisas: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None) -> str:
-        """Cria ou melhora as cláusulas do documento em paralelo."""
+    async def gerar_documento_html_puro_async(self, dados_formulario: Dict, pesquisas: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Cria ou melhora as cláusulas do documento em paralelo e retorna o HTML e as cláusulas."""
         
         print("--- DADOS RECEBIDOS PELO AGENTE REDATOR DE CONTRATOS ---")
         print(json.dumps(dados_formulario, indent=2, ensure_ascii=False))
@@ -50,14 +53,13 @@ class AgenteRedatorContratos:
             instrucao_melhoria = f"\n\nINSTRUÇÕES PARA MELHORIA: A versão anterior foi considerada insatisfatória. Reescreva e expanda o conteúdo para atender a seguinte recomendação: '{' '.join(recomendacoes)}'."
 
         tipo_contrato = dados_formulario.get('tipo_contrato_especifico', 'DE PRESTAÇÃO DE SERVIÇOS')
-        pesquisa_formatada = pesquisas.get('pesquisa_formatada', 'Nenhuma pesquisa de referência foi encontrada.')
 
         prompts = {
-            "objeto": f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nPara um '{tipo_contrato}', redija a 'CLÁUSULA PRIMEIRA - DO OBJETO', detalhando o seguinte: {dados_formulario.get('objeto', '')}\n\nUse a seguinte pesquisa como referência:\n{pesquisa_formatada}",
-            "valor": f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nPara um '{tipo_contrato}', redija a 'CLÁUSULA SEGUNDA - DO VALOR E DA FORMA DE PAGAMENTO', detalhando o valor de '{dados_formulario.get('valor', '')}' e a forma de pagamento: '{dados_formulario.get('pagamento', '')}'",
-            "prazos": f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nPara um '{tipo_contrato}', redija a 'CLÁUSULA TERCEIRA - DOS PRAZOS', detalhando os seguintes prazos: '{dados_formulario.get('prazos', '')}'",
-            "obrigacoes": f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nPara um '{tipo_contrato}', redija a 'CLÁUSULA QUARTA - DAS OBRIGAÇÕES DAS PARTES', detalhando as seguintes responsabilidades: '{dados_formulario.get('responsabilidades', '')}'. Crie subtítulos com '<strong>Obrigações do CONTRATANTE:</strong>' e '<strong>Obrigações do CONTRATADO:</strong>'.",
-            "penalidades": f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nPara um '{tipo_contrato}', redija a 'CLÁUSULA QUINTA - DAS PENALIDADES', detalhando as seguintes penalidades: '{dados_formulario.get('penalidades', '')}'",
+            "objeto": f"Para um '{tipo_contrato}', redija a 'CLÁUSULA PRIMEIRA - DO OBJETO', detalhando o seguinte: {dados_formulario.get('objeto', '')}. Use a PESQUISA - MODELOS DE REFERÊNCIA como referência.",
+            "valor": f"Para um '{tipo_contrato}', redija a 'CLÁUSULA SEGUNDA - DO VALOR E DA FORMA DE PAGAMENTO', detalhando o valor de '{dados_formulario.get('valor', '')}' e a forma de pagamento: '{dados_formulario.get('pagamento', '')}'",
+            "prazos": f"Para um '{tipo_contrato}', redija a 'CLÁUSULA TERCEIRA - DOS PRAZOS', detalhando os seguintes prazos: '{dados_formulario.get('prazos', '')}'",
+            "obrigacoes": f"Para um '{tipo_contrato}', redija a 'CLÁUSULA QUARTA - DAS OBRIGAÇÕES DAS PARTES', detalhando as seguintes responsabilidades: '{dados_formulario.get('responsabilidades', '')}'. Crie subtítulos com '<strong>Obrigações do CONTRATANTE:</strong>' e '<strong>Obrigações do CONTRATADO:</strong>'.",
+            "penalidades": f"Para um '{tipo_contrato}', redija a 'CLÁUSULA QUINTA - DAS PENALIDADES', detalhando as seguintes penalidades: '{dados_formulario.get('penalidades', '')}'",
         }
 
         # COMENTÁRIO: Lógica condicional aprimorada para incluir cláusulas apenas quando necessário.
@@ -66,18 +68,21 @@ class AgenteRedatorContratos:
         contratos_com_pi_e_sigilo = ["prestação de serviços", "desenvolvimento de software", "franquia", "criação"]
         if any(termo in tipo_contrato.lower() for termo in contratos_com_pi_e_sigilo):
             print("  -> Tipo de contrato requer cláusulas de PI e Confidencialidade.")
-            prompts["propriedade"] = f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nPara um '{tipo_contrato}', redija a 'CLÁUSULA SEXTA - DA PROPRIEDADE INTELECTUAL', criando uma cláusula padrão que defina a quem pertence a propriedade intelectual do trabalho desenvolvido."
-            prompts["confidencialidade"] = f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nRedija a 'CLÁUSULA SÉTIMA - DA CONFIDENCIALIDADE', criando uma cláusula padrão que obrigue as partes a manter sigilo."
+            prompts["propriedade"] = f"Para um '{tipo_contrato}', redija a 'CLÁUSULA SEXTA - DA PROPRIEDADE INTELECTUAL', criando uma cláusula padrão que defina a quem pertence a propriedade intelectual do trabalho desenvolvido."
+            prompts["confidencialidade"] = "Redija a 'CLÁUSULA SÉTIMA - DA CONFIDENCIALIDADE', criando uma cláusula padrão que obrigue as partes a manter sigilo."
             clausulas_a_gerar.extend(["propriedade", "confidencialidade"])
         else:
             print("  -> Tipo de contrato simples. Cláusulas de PI e Confidencialidade não serão geradas.")
 
-        prompts["rescisao"] = f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nPara um '{tipo_contrato}', redija a 'CLÁUSULA DE RESCISÃO', detalhando as condições e consequências da rescisão."
-        prompts["foro"] = f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nRedija a 'CLÁUSULA DO FORO', especificando o foro de eleição como: '{dados_formulario.get('foro', '')}'"
+        prompts["rescisao"] = f"Para um '{tipo_contrato}', redija a 'CLÁUSULA DE RESCISÃO', detalhando as condições e consequências da rescisão."
+        prompts["foro"] = f"Redija a 'CLÁUSULA DO FORO', especificando o foro de eleição como: '{dados_formulario.get('foro', '')}'"
         clausulas_a_gerar.extend(["rescisao", "foro"])
 
-        tasks = [self._chamar_api_async(prompts[nome], nome) for nome in clausulas_a_gerar]
-        resultados = await asyncio.gather(*tasks)
+        # COMENTÁRIO: Cada seção recebe um contexto com as regras, os dados do caso e só a pesquisa de que depende (dentro do orçamento de tokens).
+        # Com a pesquisa ainda em andamento, a seção espera apenas essa parte; as seções sem pesquisa começam imediatamente.
+        contextos = ContextosSecoes(prompts, {"objeto": ["pesquisa_formatada"]}, [instrucao_formato, instrucao_fidelidade], dados_formulario, pesquisas, {"pesquisa_formatada": "MODELOS DE REFERÊNCIA"}, instrucao_melhoria, self.orcamento_tokens, {"dados": json.dumps(dados_formulario, ensure_ascii=False)}, padrao_pesquisa="Nenhuma pesquisa de referência foi encontrada.")
+        secoes = await gerar_secoes_async(contextos.chamar_api(self._chamar_api_async, ler_cache=not documento_anterior), {nome: prompts[nome] for nome in clausulas_a_gerar}, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes)
+        resultados = [secoes[nome] for nome in clausulas_a_gerar]
         
         clausulas_html = "\n".join(resultados)
 
@@ -105,7 +110,7 @@ class AgenteRedatorContratos:
         qualificacao_contratante = montar_qualificacao(contratante, "Contratante")
         qualificacao_contratado = montar_qualificacao(contratado, "Contratado")
 
-        return f"""
+        html_final = f"""
 <!DOCTYPE html><html lang="pt-BR"><head><title>{tipo_contrato.title()}</title><style>body{{font-family:'Times New Roman',serif;line-height:1.6;text-align:justify;margin:3cm}}h1{{text-align:center;font-size:16pt;margin-bottom:2cm;}}h2{{font-size:14pt;margin-top:1.5cm;font-weight:bold;text-align:center;}}h3{{font-size:12pt;margin-top:1cm;font-weight:bold;}}p{{text-indent:2em;margin-bottom:15px}}</style></head>
 <body>
     <h1>{tipo_contrato.upper()}</h1>
@@ -122,11 +127,15 @@ class AgenteRedatorContratos:
     <p style="text-align:center;">_________________________________________<br>Testemunha 2</p>
 </body></html>
         """
+        return {"documento_html": html_final, "secoes": secoes, "tokens_prompt": contextos.tokens_prompt}
 
-    def redigir_peticao_completa(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None) -> Dict:
-        """Ponto de entrada síncrono que executa a lógica assíncrona, passando o feedback se existir."""
+    async def redigir_peticao_completa_async(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict:
+        """Ponto de entrada assíncrono usado pelo orquestrador, passando o feedback e as seções a reaproveitar, se existirem."""
         try:
-            documento_html = asyncio.run(self.gerar_documento_html_puro_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes))
-            return {"documento_html": documento_html}
+            return await self.gerar_documento_html_puro_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes)
         except Exception as e:
             return {"status": "erro", "erro": str(e)}
+
+    def redigir_peticao_completa(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict:
+        """Ponto de entrada síncrono: executa a versão assíncrona no event loop persistente."""
+        return executar_no_loop(self.redigir_peticao_completa_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes))
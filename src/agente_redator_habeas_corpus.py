@@ -3,41 +3,44 @@
 import json
 import logging
 import asyncio
-import openai
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Set
 import re
 from datetime import datetime
 
+from redacao_secoes import gerar_secoes_async
+from loop_assincrono import executar_no_loop
+from cliente_llm import ClienteLLM
+from orcamento_tokens import OrcamentoTokens
+from construtor_prompts import ContextosSecoes
+
 class AgenteRedatorHabeasCorpus:
     """
     Agente Redator Especializado em Habeas Corpus.
     v2.1: Utiliza prompts rígidos para garantir a fidelidade aos dados e evitar
     a repetição desnecessária da qualificação das partes.
     """
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cliente_llm: Optional[ClienteLLM] = None):
         if not api_key: raise ValueError("DEEPSEEK_API_KEY não configurada")
-        self.client = openai.OpenAI(api_key=api_key, base_url="https://api.deepseek.com/v1")
+        # COMENTÁRIO: O cliente é compartilhado entre os agentes (injetado pelo orquestrador) para reaproveitar conexões.
+        self.cliente_llm = cliente_llm or ClienteLLM(api_key=api_key)
+        self.orcamento_tokens = OrcamentoTokens()
         print("✅ Agente Redator de HABEAS CORPUS (v2.1 com Prompts Rígidos) inicializado.")
 
-    async def _chamar_api_async(self, prompt: str, secao_nome: str) -> str:
+    async def _chamar_api_async(self, prompt: str, secao_nome: str, tamanho_alvo: Optional[int] = None, texto_anterior: Optional[str] = None, contexto: Optional[str] = None, ler_cache: bool = True) -> str:
         """Chama a API de forma assíncrona para gerar uma seção específica."""
         print(f"📝 Gerando/Melhorando seção de Habeas Corpus: {secao_nome}")
         try:
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
-                model="deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=8192,
-                temperature=0.3
-            )
-            return re.sub(r'^```html|```$', '', response.choices[0].message.content.strip())
+            conteudo = await self.cliente_llm.completar(prompt, temperatura=0.3, max_tokens=8192, tamanho_alvo=tamanho_alvo, texto_anterior=texto_anterior, contexto=contexto, ler_cache=ler_cache)
+            return re.sub(r'^```html|```$', '', conteudo.strip())
         except Exception as e:
             print(f"❌ ERRO na API para a seção {secao_nome}: {e}")
+            # Numa continuação, a falha mantém o texto já existente em vez de anexar a mensagem de erro.
+            if texto_anterior: return ""
             return f"<h2>Erro ao Gerar Seção: {secao_nome}</h2><p>{e}</p>"
 
-    async def gerar_documento_html_puro_async(self, dados_formulario: Dict, pesquisas: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None) -> str:
-        """Cria ou melhora as seções do documento em paralelo."""
+    async def gerar_documento_html_puro_async(self, dados_formulario: Dict, pesquisas: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Cria ou melhora as seções do documento em paralelo (apenas as indicadas, numa nova tentativa) e retorna o HTML e as seções."""
         
         instrucao_formato = "Sua resposta DEVE ser um bloco de código HTML bem formatado. NÃO use Markdown (como `**` ou `*`). Para ênfase, use apenas tags HTML como `<strong>` para negrito."
         
@@ -49,17 +52,19 @@ class AgenteRedatorHabeasCorpus:
         if recomendacoes:
             instrucao_melhoria = f"\n\nINSTRUÇÕES PARA MELHORIA: A versão anterior foi considerada insatisfatória. Reescreva e expanda o conteúdo para atender a seguinte recomendação: '{' '.join(recomendacoes)}'."
 
-        # COMENTÁRIO: As novas instruções foram adicionadas a todos os prompts.
         prompts = {
-            "fatos": f"{instrucao_formato}\n{instrucao_fidelidade}\n{instrucao_referencia}{instrucao_melhoria}\n\nRedija a seção 'DOS FATOS E DO CONSTRANGIMENTO ILEGAL' de um Habeas Corpus. Seja extremamente detalhado, com no mínimo 10.000 caracteres. Descreva a prisão, o constrangimento ilegal, a autoridade coatora e o motivo pelo qual a prisão é ilegal. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. Comece com <h2>DOS FATOS E DO CONSTRANGIMENTO ILEGAL</h2>.",
-            "direito": f"{instrucao_formato}\n{instrucao_fidelidade}\n{instrucao_referencia}{instrucao_melhoria}\n\nRedija a seção 'DO DIREITO E DO PEDIDO LIMINAR' de um Habeas Corpus. Seja detalhado, com no mínimo 15.000 caracteres. Foque no direito à liberdade (Art. 5º, LXVIII, CF) e nos artigos do Código de Processo Penal sobre as hipóteses de soltura. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. PESQUISA: {pesquisas.get('legislacao_formatada', 'N/A')}. Comece com <h2>DO DIREITO E DO PEDIDO LIMINAR</h2>.",
-            "pedidos": f"{instrucao_formato}\n{instrucao_fidelidade}\n{instrucao_referencia}{instrucao_melhoria}\n\nRedija a seção 'DOS PEDIDOS' de um Habeas Corpus. Seja detalhado, com no mínimo 5.000 caracteres. Peça a concessão liminar da ordem para expedir o alvará de soltura e, no mérito, a confirmação da ordem. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. Comece com <h2>DOS PEDIDOS</h2>."
+            "fatos": "Redija a seção 'DOS FATOS E DO CONSTRANGIMENTO ILEGAL' de um Habeas Corpus. Seja extremamente detalhado, com no mínimo 10.000 caracteres. Descreva a prisão, o constrangimento ilegal, a autoridade coatora e o motivo pelo qual a prisão é ilegal. Comece com <h2>DOS FATOS E DO CONSTRANGIMENTO ILEGAL</h2>.",
+            "direito": "Redija a seção 'DO DIREITO E DO PEDIDO LIMINAR' de um Habeas Corpus. Seja detalhado, com no mínimo 15.000 caracteres. Foque no direito à liberdade (Art. 5º, LXVIII, CF) e nos artigos do Código de Processo Penal sobre as hipóteses de soltura. Use a PESQUISA - LEGISLAÇÃO. Comece com <h2>DO DIREITO E DO PEDIDO LIMINAR</h2>.",
+            "pedidos": "Redija a seção 'DOS PEDIDOS' de um Habeas Corpus. Seja detalhado, com no mínimo 5.000 caracteres. Peça a concessão liminar da ordem para expedir o alvará de soltura e, no mérito, a confirmação da ordem. Comece com <h2>DOS PEDIDOS</h2>."
         }
         
-        tasks = [self._chamar_api_async(p, n) for n, p in prompts.items()]
-        secao_fatos, secao_direito, secao_pedidos = await asyncio.gather(*tasks)
+        # COMENTÁRIO: Cada seção recebe um contexto com as regras, os dados do caso e só a pesquisa de que depende (dentro do orçamento de tokens).
+        # Com a pesquisa ainda em andamento, a seção espera apenas essa parte; as seções sem pesquisa começam imediatamente.
+        contextos = ContextosSecoes(prompts, {"direito": ["legislacao_formatada"]}, [instrucao_formato, instrucao_fidelidade, instrucao_referencia], dados_formulario, pesquisas, {"legislacao_formatada": "LEGISLAÇÃO"}, instrucao_melhoria, self.orcamento_tokens, {"dados": json.dumps(dados_formulario, ensure_ascii=False)})
+        secoes = await gerar_secoes_async(contextos.chamar_api(self._chamar_api_async, ler_cache=not documento_anterior), prompts, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes)
+        secao_fatos, secao_direito, secao_pedidos = [secoes[nome] for nome in prompts]
         
-        return f"""
+        html_final = f"""
 <!DOCTYPE html><html lang="pt-BR"><head><title>Habeas Corpus</title><style>body{{font-family:'Times New Roman',serif;line-height:1.8;text-align:justify;margin:3cm}}h1{{text-align:center;font-size:16pt}}h2{{text-align:left;font-size:14pt;margin-top:30px;font-weight:bold}}p{{text-indent:2em;margin-bottom:15px}}.qualificacao p{{text-indent:0}}</style></head>
 <body>
     <h1>EXCELENTÍSSIMO SENHOR DOUTOR DESEMBARGADOR PRESIDENTE DO EGRÉGIO TRIBUNAL DE JUSTIÇA DO ESTADO DE {dados_formulario.get('reu', {}).get('estado', 'UF')}</h1>
@@ -76,11 +81,15 @@ class AgenteRedatorHabeasCorpus:
     <p style="text-align:center;margin-top:80px;">_________________________________________<br>ADVOGADO<br>OAB/SP Nº XXX.XXX</p>
 </body></html>
         """
+        return {"documento_html": html_final, "secoes": secoes, "tokens_prompt": contextos.tokens_prompt}
 
-    def redigir_peticao_completa(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None) -> Dict:
-        """Ponto de entrada síncrono que executa a lógica assíncrona, passando o feedback se existir."""
+    async def redigir_peticao_completa_async(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict:
+        """Ponto de entrada assíncrono usado pelo orquestrador, passando o feedback e as seções a reaproveitar, se existirem."""
         try:
-            documento_html = asyncio.run(self.gerar_documento_html_puro_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes))
-            return {"documento_html": documento_html}
+            return await self.gerar_documento_html_puro_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes)
         except Exception as e:
             return {"status": "erro", "erro": str(e)}
+
+    def redigir_peticao_completa(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict:
+        """Ponto de entrada síncrono: executa a versão assíncrona no event loop persistente."""
+        return executar_no_loop(self.redigir_peticao_completa_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes))
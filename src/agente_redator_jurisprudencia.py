@@ -3,6 +3,8 @@
 from typing import Dict, Any, List
 from datetime import datetime
 
+from selecao_trechos import selecionar_trechos
+
 class AgenteRedatorJurisprudencia:
     """
     Agente Especializado com uma única responsabilidade:
@@ -31,8 +33,8 @@ class AgenteRedatorJurisprudencia:
                     url = item.get('url', '#')
                     texto = item.get('texto', 'Conteúdo não extraído.')
                     
-                    # Limita o resumo do texto para não poluir o documento
-                    resumo = texto[:1500] + '...' if len(texto) > 1500 else texto
+                    # Limita o resumo do texto aos trechos mais relevantes para os termos, para não poluir o documento
+                    resumo = selecionar_trechos(texto, ' '.join(termos_pesquisados), 1500) + '...' if len(texto) > 1500 else texto
                     
                     corpo_html += f"""
                         <div class="resultado-item">
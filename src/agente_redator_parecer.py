@@ -3,41 +3,44 @@
 import json
 import logging
 import asyncio
-import openai
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Set
 import re
 from datetime import datetime
 
+from redacao_secoes import gerar_secoes_async
+from loop_assincrono import executar_no_loop
+from cliente_llm import ClienteLLM
+from orcamento_tokens import OrcamentoTokens
+from construtor_prompts import ContextosSecoes
+
 class AgenteRedatorParecer:
     """
     Agente Redator Otimizado e Especializado em Pareceres Jurídicos.
     v3.0: Utiliza prompts modulares e assíncronos para cada seção, garantindo
     maior detalhe, qualidade e o cumprimento da meta de 30.000 caracteres.
     """
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cliente_llm: Optional[ClienteLLM] = None):
         if not api_key: raise ValueError("DEEPSEEK_API_KEY não configurada")
-        self.client = openai.OpenAI(api_key=api_key, base_url="https://api.deepseek.com/v1")
+        # COMENTÁRIO: O cliente é compartilhado entre os agentes (injetado pelo orquestrador) para reaproveitar conexões.
+        self.cliente_llm = cliente_llm or ClienteLLM(api_key=api_key)
+        self.orcamento_tokens = OrcamentoTokens()
         print("✅ Agente Redator de PARECER JURÍDICO (Modular v3.0) inicializado.")
 
-    async def _chamar_api_async(self, prompt: str, secao_nome: str) -> str:
+    async def _chamar_api_async(self, prompt: str, secao_nome: str, tamanho_alvo: Optional[int] = None, texto_anterior: Optional[str] = None, contexto: Optional[str] = None, ler_cache: bool = True) -> str:
         """Chama a API de forma assíncrona para gerar uma seção específica."""
         print(f"📝 Gerando/Melhorando seção de parecer: {secao_nome}")
         try:
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
-                model="deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=8192,
-                temperature=0.3
-            )
-            return re.sub(r'^```html|```$', '', response.choices[0].message.content.strip())
+            conteudo = await self.cliente_llm.completar(prompt, temperatura=0.3, max_tokens=8192, tamanho_alvo=tamanho_alvo, texto_anterior=texto_anterior, contexto=contexto, ler_cache=ler_cache)
+            return re.sub(r'^```html|```$', '', conteudo.strip())
         except Exception as e:
             print(f"❌ ERRO na API para a seção {secao_nome}: {e}")
+            # Numa continuação, a falha mantém o texto já existente em vez de anexar a mensagem de erro.
+            if texto_anterior: return ""
             return f"<h2>Erro ao Gerar Seção: {secao_nome}</h2><p>{e}</p>"
 
-    async def gerar_documento_html_puro_async(self, dados_formulario: Dict, pesquisas: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None) -> str:
-        """Cria ou melhora as seções do documento em paralelo."""
+    async def gerar_documento_html_puro_async(self, dados_formulario: Dict, pesquisas: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Cria ou melhora as seções do documento em paralelo (apenas as indicadas, numa nova tentativa) e retorna o HTML e as seções."""
         
         instrucao_formato = "Sua resposta DEVE ser um bloco de código HTML bem formatado. NÃO use Markdown (como `**` ou `*`). Para ênfase, use apenas tags HTML como `<strong>` para negrito."
         instrucao_fidelidade = "ATENÇÃO: Sua tarefa é redigir um texto jurídico. Você DEVE se basear ESTRITAMENTE nos dados fornecidos no JSON 'DADOS DO CASO' e na 'PESQUISA' jurídica. NÃO invente fatos."
@@ -48,18 +51,21 @@ class AgenteRedatorParecer:
 
         # COMENTÁRIO: A redação agora é modular, com um prompt detalhado para cada seção e metas de caracteres individuais.
         prompts = {
-            "ementa": f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nRedija a 'EMENTA' de um parecer jurídico. Crie um resumo conciso em 3 a 5 tópicos. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. Comece com <h3>EMENTA</h3>.",
-            "relatorio": f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nRedija a seção 'I - RELATÓRIO' de um parecer jurídico. Seja extremamente detalhado, com no mínimo 8.000 caracteres. Descreva a consulta feita pelo solicitante. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. Comece com <h2>I - RELATÓRIO</h2>.",
-            "fundamentacao": f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nRedija a seção 'II - FUNDAMENTAÇÃO' de um parecer jurídico. Seja detalhado, com no mínimo 15.000 caracteres. Analise a questão com base na legislação e jurisprudência pesquisadas. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. PESQUISA: {pesquisas.get('pesquisa_formatada', 'N/A')}. Comece com <h2>II - FUNDAMENTAÇÃO</h2>.",
-            "conclusao": f"{instrucao_formato}\n{instrucao_fidelidade}{instrucao_melhoria}\n\nRedija a seção 'III - CONCLUSÃO' de um parecer jurídico. Seja detalhado, com no mínimo 7.000 caracteres. Responda objetivamente à consulta com base na fundamentação. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. Comece com <h2>III - CONCLUSÃO</h2>."
+            "ementa": "Redija a 'EMENTA' de um parecer jurídico. Crie um resumo conciso em 3 a 5 tópicos. Comece com <h3>EMENTA</h3>.",
+            "relatorio": "Redija a seção 'I - RELATÓRIO' de um parecer jurídico. Seja extremamente detalhado, com no mínimo 8.000 caracteres. Descreva a consulta feita pelo solicitante. Comece com <h2>I - RELATÓRIO</h2>.",
+            "fundamentacao": "Redija a seção 'II - FUNDAMENTAÇÃO' de um parecer jurídico. Seja detalhado, com no mínimo 15.000 caracteres. Analise a questão com base na PESQUISA - LEGISLAÇÃO, na PESQUISA - JURISPRUDÊNCIA e na PESQUISA - DOUTRINA. Comece com <h2>II - FUNDAMENTAÇÃO</h2>.",
+            "conclusao": "Redija a seção 'III - CONCLUSÃO' de um parecer jurídico. Seja detalhado, com no mínimo 7.000 caracteres. Responda objetivamente à consulta com base na fundamentação. Comece com <h2>III - CONCLUSÃO</h2>."
         }
         
-        tasks = [self._chamar_api_async(p, n) for n, p in prompts.items()]
-        secao_ementa, secao_relatorio, secao_fundamentacao, secao_conclusao = await asyncio.gather(*tasks)
+        # COMENTÁRIO: Cada seção recebe um contexto com as regras, os dados do caso e só a pesquisa de que depende (dentro do orçamento de tokens).
+        # Com a pesquisa ainda em andamento, a seção espera apenas essa parte; as seções sem pesquisa começam imediatamente.
+        contextos = ContextosSecoes(prompts, {"fundamentacao": ["legislacao_formatada", "jurisprudencia_formatada", "doutrina_formatada"]}, [instrucao_formato, instrucao_fidelidade], dados_formulario, pesquisas, {"legislacao_formatada": "LEGISLAÇÃO", "jurisprudencia_formatada": "JURISPRUDÊNCIA", "doutrina_formatada": "DOUTRINA"}, instrucao_melhoria, self.orcamento_tokens, {"dados": json.dumps(dados_formulario, ensure_ascii=False)})
+        secoes = await gerar_secoes_async(contextos.chamar_api(self._chamar_api_async, ler_cache=not documento_anterior), prompts, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes)
+        secao_ementa, secao_relatorio, secao_fundamentacao, secao_conclusao = [secoes[nome] for nome in prompts]
         
         documento_html = f"{secao_ementa}{secao_relatorio}{secao_fundamentacao}{secao_conclusao}"
         
-        return f"""
+        html_final = f"""
 <!DOCTYPE html><html lang="pt-BR"><head><title>Parecer Jurídico</title><style>body{{font-family:'Times New Roman',serif;line-height:1.6;text-align:justify;margin:3cm}}h1,h2,h3{{text-align:center;font-weight:bold}}h1{{font-size:16pt}}h2{{font-size:14pt;margin-top:30px;text-align:left;}}h3{{font-size:12pt;margin-top:20px;text-align:left;font-style:italic;}}p{{text-indent:2em;margin-bottom:15px}}</style></head>
 <body>
     <h1>PARECER JURÍDICO</h1>
@@ -71,11 +77,15 @@ class AgenteRedatorParecer:
     {documento_html}
 </body></html>
         """
+        return {"documento_html": html_final, "secoes": secoes, "tokens_prompt": contextos.tokens_prompt}
 
-    def redigir_peticao_completa(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None) -> Dict:
-        """Ponto de entrada síncrono que executa a lógica assíncrona, passando o feedback se existir."""
+    async def redigir_peticao_completa_async(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict:
+        """Ponto de entrada assíncrono usado pelo orquestrador, passando o feedback e as seções a reaproveitar, se existirem."""
         try:
-            documento_html = asyncio.run(self.gerar_documento_html_puro_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes))
-            return {"documento_html": documento_html}
+            return await self.gerar_documento_html_puro_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes)
         except Exception as e:
             return {"status": "erro", "erro": str(e)}
+
+    def redigir_peticao_completa(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict:
+        """Ponto de entrada síncrono: executa a versão assíncrona no event loop persistente."""
+        return executar_no_loop(self.redigir_peticao_completa_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes))
@@ -3,41 +3,44 @@
 import json
 import logging
 import asyncio
-import openai
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Set
 import re
 from datetime import datetime
 
+from redacao_secoes import gerar_secoes_async
+from loop_assincrono import executar_no_loop
+from cliente_llm import ClienteLLM
+from orcamento_tokens import OrcamentoTokens
+from construtor_prompts import ContextosSecoes
+
 class AgenteRedatorQueixaCrime:
     """
     Agente Redator Especializado em Queixa-Crime.
     v2.2: Utiliza prompts rígidos para garantir a fidelidade aos dados e evitar
     a repetição desnecessária da qualificação das partes.
     """
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cliente_llm: Optional[ClienteLLM] = None):
         if not api_key: raise ValueError("DEEPSEEK_API_KEY não configurada")
-        self.client = openai.OpenAI(api_key=api_key, base_url="https://api.deepseek.com/v1")
+        # COMENTÁRIO: O cliente é compartilhado entre os agentes (injetado pelo orquestrador) para reaproveitar conexões.
+        self.cliente_llm = cliente_llm or ClienteLLM(api_key=api_key)
+        self.orcamento_tokens = OrcamentoTokens()
         print("✅ Agente Redator de QUEIXA-CRIME (v2.2 com Correção de Repetição) inicializado.")
 
-    async def _chamar_api_async(self, prompt: str, secao_nome: str) -> str:
+    async def _chamar_api_async(self, prompt: str, secao_nome: str, tamanho_alvo: Optional[int] = None, texto_anterior: Optional[str] = None, contexto: Optional[str] = None, ler_cache: bool = True) -> str:
         """Chama a API de forma assíncrona para gerar uma seção específica."""
         print(f"📝 Gerando/Melhorando seção criminal: {secao_nome}")
         try:
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
-                model="deepseek-chat",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=8192,
-                temperature=0.3
-            )
-            return re.sub(r'^```html|```$', '', response.choices[0].message.content.strip())
+            conteudo = await self.cliente_llm.completar(prompt, temperatura=0.3, max_tokens=8192, tamanho_alvo=tamanho_alvo, texto_anterior=texto_anterior, contexto=contexto, ler_cache=ler_cache)
+            return re.sub(r'^```html|```$', '', conteudo.strip())
         except Exception as e:
             print(f"❌ ERRO na API para a seção {secao_nome}: {e}")
+            # Numa continuação, a falha mantém o texto já existente em vez de anexar a mensagem de erro.
+            if texto_anterior: return ""
             return f"<h2>Erro ao Gerar Seção: {secao_nome}</h2><p>{e}</p>"
 
-    async def gerar_documento_html_puro_async(self, dados_formulario: Dict, pesquisas: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None) -> str:
-        """Cria ou melhora as seções do documento em paralelo."""
+    async def gerar_documento_html_puro_async(self, dados_formulario: Dict, pesquisas: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Cria ou melhora as seções do documento em paralelo (apenas as indicadas, numa nova tentativa) e retorna o HTML e as seções."""
         
         instrucao_formato = "Sua resposta DEVE ser um bloco de código HTML bem formatado. NÃO use Markdown (como `**` ou `*`). Para ênfase, use apenas tags HTML como `<strong>` para negrito."
         
@@ -50,21 +53,23 @@ class AgenteRedatorQueixaCrime:
         if recomendacoes:
             instrucao_melhoria = f"\n\nINSTRUÇÕES PARA MELHORIA: A versão anterior foi considerada insatisfatória. Reescreva e expanda significativamente o conteúdo para atender a seguinte recomendação: '{' '.join(recomendacoes)}'. Use o rascunho anterior como referência do que NÃO fazer.\nRASCUNHO ANTERIOR:\n{documento_anterior}"
 
-        # COMENTÁRIO: A 'instrucao_referencia' foi adicionada a todos os prompts.
         prompts = {
-            "fatos": f"{instrucao_formato}\n\n{instrucao_fidelidade}\n{instrucao_referencia}{instrucao_melhoria}\n\nRedija a seção 'DOS FATOS' de uma queixa-crime. Seja extremamente detalhado, com no mínimo 10.000 caracteres. Descreva o crime, as circunstâncias, o local e a data. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. Comece com <h2>DOS FATOS</h2>.",
-            "direito_tipificacao": f"{instrucao_formato}\n\n{instrucao_fidelidade}\n{instrucao_referencia}{instrucao_melhoria}\n\nRedija a subseção 'DA TIPIFICAÇÃO PENAL' para uma queixa-crime. Seja detalhado, com no mínimo 7.000 caracteres. Foque em tipificar o crime (ex: Calúnia, Art. 138 do Código Penal). DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. PESQUISA: {pesquisas.get('legislacao_formatada', 'N/A')}. Comece com <h3>Da Tipificação Penal</h3>.",
-            "direito_autoria": f"{instrucao_formato}\n\n{instrucao_fidelidade}\n{instrucao_referencia}{instrucao_melhoria}\n\nRedija a subseção 'DA AUTORIA E MATERIALIDADE' para uma queixa-crime. Seja detalhado, com no mínimo 7.000 caracteres. Demonstre quem cometeu o crime e como o crime se materializou. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. Comece com <h3>Da Autoria e Materialidade</h3>.",
-            "direito_procedibilidade": f"{instrucao_formato}\n\n{instrucao_fidelidade}\n{instrucao_referencia}{instrucao_melhoria}\n\nRedija a subseção 'DA PROCEDIBILIDADE' para uma queixa-crime. Seja detalhado, com no mínimo 7.000 caracteres. Explique a legitimidade da ação penal privada. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. Comece com <h3>Da Procedibilidade da Ação</h3>.",
-            "pedidos": f"{instrucao_formato}\n\n{instrucao_fidelidade}\n{instrucao_referencia}{instrucao_melhoria}\n\nRedija a seção 'DOS PEDIDOS' de uma queixa-crime. Seja detalhado, com no mínimo 5.000 caracteres. Peça o recebimento da queixa, a citação do querelado e a condenação. DADOS DO CASO: {json.dumps(dados_formulario, ensure_ascii=False)}. Comece com <h2>DOS PEDIDOS</h2>."
+            "fatos": "Redija a seção 'DOS FATOS' de uma queixa-crime. Seja extremamente detalhado, com no mínimo 10.000 caracteres. Descreva o crime, as circunstâncias, o local e a data. Comece com <h2>DOS FATOS</h2>.",
+            "direito_tipificacao": "Redija a subseção 'DA TIPIFICAÇÃO PENAL' para uma queixa-crime. Seja detalhado, com no mínimo 7.000 caracteres. Foque em tipificar o crime (ex: Calúnia, Art. 138 do Código Penal). Use a PESQUISA - LEGISLAÇÃO. Comece com <h3>Da Tipificação Penal</h3>.",
+            "direito_autoria": "Redija a subseção 'DA AUTORIA E MATERIALIDADE' para uma queixa-crime. Seja detalhado, com no mínimo 7.000 caracteres. Demonstre quem cometeu o crime e como o crime se materializou. Comece com <h3>Da Autoria e Materialidade</h3>.",
+            "direito_procedibilidade": "Redija a subseção 'DA PROCEDIBILIDADE' para uma queixa-crime. Seja detalhado, com no mínimo 7.000 caracteres. Explique a legitimidade da ação penal privada. Comece com <h3>Da Procedibilidade da Ação</h3>.",
+            "pedidos": "Redija a seção 'DOS PEDIDOS' de uma queixa-crime. Seja detalhado, com no mínimo 5.000 caracteres. Peça o recebimento da queixa, a citação do querelado e a condenação. Comece com <h2>DOS PEDIDOS</h2>."
         }
         
-        tasks = [self._chamar_api_async(p, n) for n, p in prompts.items()]
-        secao_fatos, sub_tip, sub_aut, sub_proc, secao_pedidos = await asyncio.gather(*tasks)
+        # COMENTÁRIO: Cada seção recebe um contexto com as regras, os dados do caso e só a pesquisa de que depende (dentro do orçamento de tokens).
+        # Com a pesquisa ainda em andamento, a seção espera apenas essa parte; as seções sem pesquisa começam imediatamente.
+        contextos = ContextosSecoes(prompts, {"direito_tipificacao": ["legislacao_formatada"]}, [instrucao_formato, instrucao_fidelidade, instrucao_referencia], dados_formulario, pesquisas, {"legislacao_formatada": "LEGISLAÇÃO"}, instrucao_melhoria, self.orcamento_tokens, {"dados": json.dumps(dados_formulario, ensure_ascii=False), "rascunho_anterior": documento_anterior or ""})
+        secoes = await gerar_secoes_async(contextos.chamar_api(self._chamar_api_async, ler_cache=not documento_anterior), prompts, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes)
+        secao_fatos, sub_tip, sub_aut, sub_proc, secao_pedidos = [secoes[nome] for nome in prompts]
         
         secao_direito = f"<h2>DO DIREITO</h2>{sub_tip}{sub_aut}{sub_proc}"
         
-        return f"""
+        html_final = f"""
 <!DOCTYPE html><html lang="pt-BR"><head><title>Queixa-Crime</title><style>body{{font-family:'Times New Roman',serif;line-height:1.8;text-align:justify;margin:3cm}}h1{{text-align:center;font-size:16pt}}h2{{text-align:left;font-size:14pt;margin-top:30px;font-weight:bold}}p{{text-indent:2em;margin-bottom:15px}}.qualificacao p{{text-indent:0}}</style></head>
 <body>
     <h1>EXCELENTÍSSIMO SENHOR DOUTOR JUIZ DE DIREITO DO JUIZADO ESPECIAL CRIMINAL DA COMARCA DE {dados_formulario.get('reu', {}).get('cidade', 'CIDADE')} - {dados_formulario.get('reu', {}).get('estado', 'UF')}</h1>
@@ -81,11 +86,15 @@ class AgenteRedatorQueixaCrime:
     <p style="text-align:center;margin-top:80px;">_________________________________________<br>ADVOGADO<br>OAB/SP Nº XXX.XXX</p>
 </body></html>
         """
+        return {"documento_html": html_final, "secoes": secoes, "tokens_prompt": contextos.tokens_prompt}
 
-    def redigir_peticao_completa(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None) -> Dict:
-        """Ponto de entrada síncrono que executa a lógica assíncrona, passando o feedback se existir."""
+    async def redigir_peticao_completa_async(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict:
+        """Ponto de entrada assíncrono usado pelo orquestrador, passando o feedback e as seções a reaproveitar, se existirem."""
         try:
-            documento_html = asyncio.run(self.gerar_documento_html_puro_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes))
-            return {"documento_html": documento_html}
+            return await self.gerar_documento_html_puro_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes)
         except Exception as e:
             return {"status": "erro", "erro": str(e)}
+
+    def redigir_peticao_completa(self, dados_estruturados: Dict, pesquisa_juridica: Dict, documento_anterior: Optional[str] = None, recomendacoes: Optional[List[str]] = None, callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict:
+        """Ponto de entrada síncrono: executa a versão assíncrona no event loop persistente."""
+        return executar_no_loop(self.redigir_peticao_completa_async(dados_estruturados, pesquisa_juridica, documento_anterior, recomendacoes, callback_secao, secoes_anteriores, secoes_a_regenerar, metas_secoes))
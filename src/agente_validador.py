@@ -1,40 +1,83 @@
-# agente_validador.py - Versão 2.3 com Recomendação de Formatação Aprimorada
+# agente_validador.py - Versão 2.4 com Metas Calibradas por Tipo de Documento
 
+import os
 import re
-from typing import Dict, Any, List
+import json
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+CAMINHO_METAS_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metas_validacao.json')
+
 class AgenteValidador:
     """
-    Agente Validador v2.3 que:
+    Agente Validador v2.4 que:
     - Analisa a qualidade do documento.
     - Gera recomendações claras, incluindo instruções de formatação para evitar HTML aninhado.
+    - Usa metas de tamanho específicas para cada tipo de documento e para cada seção, lidas da tabela
+      'metas_validacao.json' (gerada por 'calibrar_metas_validacao.py' a partir de documentos aceitos).
     """
-    
-    def __init__(self):
-        print("✅ Inicializando Agente Validador v2.3 (com Feedback Aprimorado)...")
-        self.criterios_validacao = {
-            'tamanho_minimo': 30000,
-        }
+
+    def __init__(self, caminho_metas: Optional[str] = None):
+        print("✅ Inicializando Agente Validador v2.4 (com Metas Calibradas por Tipo)...")
+        self.caminho_metas = caminho_metas or os.getenv('JURIDOC_METAS_VALIDACAO', CAMINHO_METAS_PADRAO)
+        self.criterios_validacao = self._carregar_metas(self.caminho_metas)
+        # COMENTÁRIO: Se definido, cada documento final é anexado a este arquivo JSONL, formando o corpus de calibração.
+        self.caminho_corpus = os.getenv('JURIDOC_CORPUS_DOCUMENTOS')
         print("✅ Agente Validador inicializado")
-    
-    def validar_e_formatar(self, documento_html: str, dados_originais: Dict[str, Any] = None) -> Dict[str, Any]:
+
+    def _carregar_metas(self, caminho: str) -> Dict[str, Dict[str, Any]]:
+        """Carrega a tabela de metas; sem ela, mantém a meta única de 30.000 caracteres."""
+        metas = {'padrao': {'tamanho_minimo': 30000, 'tolerancia': 0.80, 'secoes': {}}}
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                tabela = json.load(arquivo)
+            metas.update({tipo: criterios for tipo, criterios in tabela.items() if not tipo.startswith('_')})
+            print(f"   -> Metas de validação carregadas para: {[tipo for tipo in metas if tipo != 'padrao']}")
+        except Exception as e:
+            print(f"⚠️ Não foi possível carregar as metas de validação ({caminho}): {e}. Usando a meta padrão.")
+        return metas
+
+    def obter_criterios(self, tipo_documento: Optional[str]) -> Dict[str, Any]:
+        """Critérios do tipo de documento, completados pelos valores padrão."""
+        padrao = self.criterios_validacao['padrao']
+        criterios = self.criterios_validacao.get(tipo_documento or '', {})
+        return {
+            'tamanho_minimo': criterios.get('tamanho_minimo', padrao['tamanho_minimo']),
+            'tolerancia': criterios.get('tolerancia', padrao.get('tolerancia', 0.80)),
+            'secoes': criterios.get('secoes', {}),
+        }
+
+    def validar_e_formatar(self, documento_html: str, dados_originais: Dict[str, Any] = None, secoes: Optional[Dict[str, str]] = None, tipo_documento: Optional[str] = None) -> Dict[str, Any]:
         """
         Valida o documento e retorna um status e recomendações.
+        Quando as seções são informadas, também mede cada seção contra a meta do seu tipo de documento
+        e aponta quais ficaram abaixo dela ('secoes_reprovadas'), para que só elas sejam reescritas.
         """
         try:
             print("🔍 Iniciando validação de qualidade...")
             if not isinstance(documento_html, str): documento_html = ""
-            
+            tipo_documento = tipo_documento or (dados_originais or {}).get('tipo_documento')
+            criterios = self.obter_criterios(tipo_documento)
+
             analise = self._analisar_documento(documento_html)
-            
-            print(f"   -> Tamanho do Documento: {analise['tamanho']} caracteres (Meta: {self.criterios_validacao['tamanho_minimo']})")
-            
-            problemas, recomendacoes = self._identificar_problemas_e_recomendar(analise)
-            
+
+            print(f"   -> Tamanho do Documento: {analise['tamanho']} caracteres (Meta para '{tipo_documento or 'padrao'}': {criterios['tamanho_minimo']})")
+
+            problemas, recomendacoes = self._identificar_problemas_e_recomendar(analise, criterios)
+
             status = "reprovado" if problemas else "aprovado"
-            
+
+            metricas_secoes = self._analisar_secoes(secoes or {}, criterios)
+            secoes_reprovadas = [nome for nome, metrica in metricas_secoes.items() if not metrica['aprovada']]
+            if status == "reprovado" and secoes_reprovadas:
+                recomendacoes.extend(
+                    f"A seção '{nome}' tem apenas {metricas_secoes[nome]['tamanho']} caracteres; expanda-a para no mínimo {metricas_secoes[nome]['meta']} caracteres."
+                    for nome in secoes_reprovadas
+                )
+
             print(f"📊 Status da Validação: {status.upper()}")
+            for nome, metrica in metricas_secoes.items():
+                print(f"   -> Seção '{nome}': {metrica['tamanho']} caracteres (Meta: {metrica['meta']}) {'✔' if metrica['aprovada'] else '✘'}")
             if recomendacoes:
                 print(f"📋 Recomendações: {', '.join(recomendacoes)}")
 
@@ -42,45 +85,77 @@ class AgenteValidador:
                 "status": status,
                 "documento_validado": documento_html,
                 "recomendacoes": recomendacoes,
-                "score_qualidade": self._calcular_score_qualidade(documento_html),
+                "metricas_secoes": metricas_secoes,
+                "secoes_reprovadas": secoes_reprovadas,
+                "score_qualidade": self._calcular_score_qualidade(documento_html, criterios),
                 "timestamp": datetime.now().isoformat()
             }
-            
+
         except Exception as e:
             print(f"❌ Erro na validação: {e}")
             return {"status": "erro", "erro": str(e)}
-    
+
     def _analisar_documento(self, documento: str) -> Dict[str, Any]:
         """Analisa as métricas do documento."""
         return {'tamanho': len(documento)}
 
-    def _identificar_problemas_e_recomendar(self, analise: Dict[str, Any]) -> (List[Dict], List[str]):
+    def _analisar_secoes(self, secoes: Dict[str, str], criterios: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Mede cada seção que tem meta definida, com a mesma tolerância usada para o documento."""
+        metricas = {}
+        for nome, meta in criterios['secoes'].items():
+            if nome not in secoes: continue
+            tamanho = len(secoes[nome] or "")
+            metricas[nome] = {
+                'tamanho': tamanho,
+                'meta': meta,
+                'aprovada': tamanho >= meta * criterios['tolerancia'],
+            }
+        return metricas
+
+    def _identificar_problemas_e_recomendar(self, analise: Dict[str, Any], criterios: Dict[str, Any]) -> (List[Dict], List[str]):
         """Identifica problemas e gera recomendações textuais para a IA."""
         problemas = []
         recomendacoes = []
-        
-        tamanho_aceitavel = self.criterios_validacao['tamanho_minimo'] * 0.80
+
+        tamanho_aceitavel = criterios['tamanho_minimo'] * criterios['tolerancia']
         if analise['tamanho'] < tamanho_aceitavel:
             problema = {
                 'tipo': 'tamanho_insuficiente',
-                'descricao': f"Documento com {analise['tamanho']} caracteres (meta de 80%: {int(tamanho_aceitavel)})"
+                'descricao': f"Documento com {analise['tamanho']} caracteres (meta de {int(criterios['tolerancia'] * 100)}%: {int(tamanho_aceitavel)})"
             }
             problemas.append(problema)
-            
+
             # COMENTÁRIO: A recomendação agora inclui uma instrução de formatação explícita para a IA.
             # Isto deve resolver o problema do HTML aninhado na segunda tentativa.
             recomendacoes.append("O documento está muito curto. Expanda todas as seções com mais detalhes. IMPORTANTE: Ao reescrever, gere APENAS o conteúdo HTML da seção solicitada, sem incluir `<!DOCTYPE>`, `<html>`, `<head>`, ou `<body>` tags.")
-            
+
         return problemas, recomendacoes
 
-    def _calcular_score_qualidade(self, documento: str) -> float:
+    def _calcular_score_qualidade(self, documento: str, criterios: Dict[str, Any]) -> float:
         """Calcula um score de qualidade com base no tamanho."""
         score = 0.0
         tamanho = len(documento)
-        meta = self.criterios_validacao['tamanho_minimo']
-        
+        meta = criterios['tamanho_minimo']
+
         if meta == 0: return 100.0
-        
+
         score = (tamanho / meta) * 100.0
-            
+
         return min(100.0, round(score, 2))
+
+    def registrar_no_corpus(self, tipo_documento: str, documento_html: str, secoes: Dict[str, str], status_validacao: str, tentativas: int):
+        """Anexa o documento final ao corpus de calibração (JSONL), quando JURIDOC_CORPUS_DOCUMENTOS está definido."""
+        if not self.caminho_corpus: return
+        registro = {
+            "tipo_documento": tipo_documento,
+            "status_validacao": status_validacao,
+            "tentativas": tentativas,
+            "tamanho_documento": len(documento_html or ""),
+            "tamanhos_secoes": {nome: len(conteudo or "") for nome, conteudo in (secoes or {}).items()},
+            "timestamp": datetime.now().isoformat(),
+        }
+        try:
+            with open(self.caminho_corpus, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"⚠️ Falha ao registrar o documento no corpus de calibração: {e}")
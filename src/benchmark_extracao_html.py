@@ -0,0 +1,109 @@
+# benchmark_extracao_html.py - Comparação de Desempenho entre os Backends de Extração de HTML
+
+"""
+Mede a vazão (páginas/s e MB/s) de cada backend de 'extracao_html' sobre um corpus de páginas salvas,
+e a vazão do pool de processos usado em produção.
+
+Uso:
+    python benchmark_extracao_html.py --corpus ./corpus_paginas
+    python benchmark_extracao_html.py --corpus ./corpus_paginas --baixar urls.txt    # salva as páginas antes
+    python benchmark_extracao_html.py --corpus ./corpus_paginas --backends lxml tokenizador --processos 4
+"""
+
+import os
+import time
+import hashlib
+import argparse
+import importlib.util
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from extracao_html import BACKENDS, extrair_texto_html
+
+def baixar_corpus(arquivo_urls: str, diretorio: str):
+    """Salva no corpus cada URL listada (uma por linha) que ainda não tenha sido baixada."""
+    os.makedirs(diretorio, exist_ok=True)
+    with open(arquivo_urls, encoding='utf-8') as arquivo:
+        urls = [linha.strip() for linha in arquivo if linha.strip() and not linha.startswith('#')]
+    for url in urls:
+        caminho = os.path.join(diretorio, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.html')
+        if os.path.exists(caminho): continue
+        try:
+            requisicao = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+            with urllib.request.urlopen(requisicao, timeout=20) as resposta, open(caminho, 'wb') as saida:
+                saida.write(resposta.read())
+            print(f"✔ Salva: {url}")
+        except Exception as e:
+            print(f"❌ Falha ao baixar {url}: {e}")
+
+def carregar_corpus(diretorio: str) -> List[str]:
+    paginas = []
+    for raiz, _, arquivos in os.walk(diretorio):
+        for nome in sorted(arquivos):
+            if nome.lower().endswith(('.html', '.htm')):
+                with open(os.path.join(raiz, nome), 'rb') as arquivo:
+                    paginas.append(arquivo.read().decode('utf-8', errors='ignore'))
+    return paginas
+
+def medir(paginas: List[str], backend: str, repeticoes: int) -> float:
+    """Melhor tempo (em segundos) para extrair todas as páginas do corpus num único processo."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for html in paginas:
+            extrair_texto_html(html, backend=backend)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+def medir_pool(paginas: List[str], backend: str, processos: int) -> float:
+    """Tempo para extrair o corpus no pool de processos (inclui o custo de enviar as páginas aos processos)."""
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        pool.submit(len, "").result()
+        inicio = time.perf_counter()
+        list(pool.map(_extrair_com_backend, paginas, [backend] * len(paginas)))
+        return time.perf_counter() - inicio
+
+def _extrair_com_backend(html: str, backend: str):
+    return extrair_texto_html(html, backend=backend)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a vazão dos backends de extração de texto HTML sobre um corpus salvo.")
+    parser.add_argument('--corpus', required=True, help="Diretório com as páginas salvas (.html).")
+    parser.add_argument('--baixar', default=None, help="Arquivo com URLs (uma por linha) a salvar no corpus antes de medir.")
+    parser.add_argument('--backends', nargs='+', default=None, choices=BACKENDS, help="Backends a comparar (padrão: todos os disponíveis).")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Repetições por backend; vale o melhor tempo (padrão: 3).")
+    parser.add_argument('--processos', type=int, default=0, help="Se maior que zero, também mede o pool com esse número de processos.")
+    args = parser.parse_args()
+
+    if args.baixar:
+        baixar_corpus(args.baixar, args.corpus)
+
+    paginas = carregar_corpus(args.corpus)
+    if not paginas:
+        print("❌ Nenhuma página .html encontrada no corpus.")
+        return
+    megabytes = sum(len(html.encode('utf-8')) for html in paginas) / (1024 * 1024)
+    print(f"📚 Corpus: {len(paginas)} páginas, {megabytes:.1f} MB\n")
+
+    backends = args.backends or [b for b in BACKENDS if b != 'lxml' or importlib.util.find_spec('lxml') is not None]
+    # O html.parser (comportamento original) é medido primeiro, para servir de referência.
+    backends = sorted(backends, key=lambda b: b != 'html.parser')
+    referencia = None
+    print(f"{'backend':<14}{'tempo (s)':>10}{'páginas/s':>12}{'MB/s':>9}{'texto médio':>13}{'vs. html.parser':>17}")
+    for backend in backends:
+        tempo = medir(paginas, backend, args.repeticoes)
+        tamanho_medio = sum(len(extrair_texto_html(html, backend=backend)['texto']) for html in paginas) / len(paginas)
+        if backend == 'html.parser':
+            referencia = tempo
+        aceleracao = f"{referencia / tempo:.1f}x" if referencia else "-"
+        print(f"{backend:<14}{tempo:>10.3f}{len(paginas) / tempo:>12.1f}{megabytes / tempo:>9.2f}{tamanho_medio:>13.0f}{aceleracao:>17}")
+
+    if args.processos > 0:
+        print()
+        for backend in backends:
+            tempo = medir_pool(paginas, backend, args.processos)
+            print(f"pool ({args.processos} proc.) {backend:<14}{tempo:>8.3f}s {len(paginas) / tempo:>8.1f} páginas/s")
+
+if __name__ == '__main__':
+    main()
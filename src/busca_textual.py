@@ -0,0 +1,84 @@
+# busca_textual.py - Tokenização em Português e Índice Invertido BM25 em Memória
+
+import re
+import math
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Tuple, Any, Hashable
+
+STOPWORDS = {
+    'a', 'ao', 'aos', 'as', 'ate', 'com', 'como', 'da', 'das', 'de', 'do', 'dos', 'e', 'ela', 'ele', 'em', 'entre',
+    'era', 'essa', 'esse', 'esta', 'este', 'foi', 'ha', 'isso', 'isto', 'ja', 'lhe', 'mais', 'mas', 'na', 'nao', 'nas',
+    'no', 'nos', 'o', 'os', 'ou', 'para', 'pela', 'pelas', 'pelo', 'pelos', 'por', 'qual', 'quando', 'que', 'se', 'sem',
+    'ser', 'seu', 'seus', 'sua', 'suas', 'sobre', 'tambem', 'tem', 'um', 'uma', 'umas', 'uns',
+}
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas e sem acentos (ex: 'Jurisprudência' -> 'jurisprudencia')."""
+    decomposto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(caractere for caractere in decomposto if not unicodedata.combining(caractere))
+
+def _radical(token: str) -> str:
+    """Redução leve de plural ('horas' -> 'hora', 'acordaos' -> 'acordao'), suficiente para aproximar termos de busca."""
+    if len(token) > 4 and token.endswith('oes'):
+        return token[:-3] + 'ao'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def tokenizar(texto: str) -> List[str]:
+    """Tokens normalizados, sem stopwords, usados tanto na indexação quanto nas consultas."""
+    return [_radical(token) for token in re.findall(r'[a-z0-9]+', normalizar_texto(texto)) if token not in STOPWORDS and len(token) > 1]
+
+class IndiceBM25:
+    """
+    Índice invertido em memória com ranqueamento BM25.
+    Usado para a busca textual local (legislação) e para escolher os trechos mais relevantes de um texto.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.identificadores: List[Hashable] = []
+        self.tamanhos: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.tamanho_total = 0
+
+    def __len__(self) -> int:
+        return len(self.identificadores)
+
+    def adicionar(self, identificador: Hashable, texto: str):
+        """Indexa um documento; 'identificador' é o que a busca devolve."""
+        posicao = len(self.identificadores)
+        tokens = tokenizar(texto)
+        self.identificadores.append(identificador)
+        self.tamanhos.append(len(tokens))
+        self.tamanho_total += len(tokens)
+        for token, frequencia in Counter(tokens).items():
+            self.postings.setdefault(token, {})[posicao] = frequencia
+
+    def buscar(self, consulta: str, limite: int = 10, cobertura_minima: float = 0.0) -> List[Tuple[Any, float]]:
+        """
+        Retorna até 'limite' pares (identificador, score), do mais relevante para o menos relevante.
+        'cobertura_minima' é a fração dos termos da consulta que o documento precisa conter (0 a 1).
+        """
+        termos = list(dict.fromkeys(tokenizar(consulta)))
+        if not termos or not self.identificadores:
+            return []
+        total_documentos = len(self.identificadores)
+        tamanho_medio = self.tamanho_total / total_documentos or 1.0
+        scores: Dict[int, float] = {}
+        termos_encontrados: Dict[int, int] = {}
+        for termo in termos:
+            documentos = self.postings.get(termo)
+            if not documentos: continue
+            idf = math.log(1 + (total_documentos - len(documentos) + 0.5) / (len(documentos) + 0.5))
+            for posicao, frequencia in documentos.items():
+                normalizacao = self.k1 * (1 - self.b + self.b * self.tamanhos[posicao] / tamanho_medio)
+                scores[posicao] = scores.get(posicao, 0.0) + idf * frequencia * (self.k1 + 1) / (frequencia + normalizacao)
+                termos_encontrados[posicao] = termos_encontrados.get(posicao, 0) + 1
+        minimo_termos = math.ceil(cobertura_minima * len(termos))
+        ranking = sorted(
+            (posicao for posicao in scores if termos_encontrados[posicao] >= minimo_termos),
+            key=lambda posicao: scores[posicao], reverse=True
+        )
+        return [(self.identificadores[posicao], round(scores[posicao], 4)) for posicao in ranking[:limite]]
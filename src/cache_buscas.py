@@ -0,0 +1,65 @@
+# cache_buscas.py - Cache Persistente das Buscas no Google (Consulta -> Lista de URLs)
+
+import os
+import asyncio
+from typing import Dict, Any, List
+from googlesearch import search
+
+from cache_persistente import CachePersistente, gerar_chave
+
+class CacheBuscas:
+    """
+    Cache em disco dos resultados do 'googlesearch.search', compartilhado pelos agentes de pesquisa.
+    - A mesma consulta (texto, número de resultados e idioma) é respondida do cache até expirar o TTL,
+      inclusive depois de reiniciar o servidor.
+    - Consultas idênticas feitas ao mesmo tempo (ex: dois jobs com o mesmo fundamento) disparam uma única
+      busca no Google; as demais aguardam e recebem o mesmo resultado (single-flight).
+    - Listas vazias não são guardadas, pois normalmente indicam bloqueio temporário do Google.
+    O cache pode ser desligado com JURIDOC_CACHE_BUSCAS=0; as buscas continuam passando por aqui.
+    """
+    def __init__(self):
+        self.config = {
+            'ttl_segundos': int(os.getenv('JURIDOC_CACHE_BUSCAS_TTL_SEGUNDOS', str(3 * 24 * 3600))),
+            'max_entradas': int(os.getenv('JURIDOC_CACHE_BUSCAS_MAX_ENTRADAS', '20000')),
+        }
+        self.cache = None
+        if os.getenv('JURIDOC_CACHE_BUSCAS', '1') != '0':
+            self.cache = CachePersistente("buscas", ttl_segundos=self.config['ttl_segundos'], max_entradas=self.config['max_entradas'])
+        # COMENTÁRIO: Buscas em andamento por chave. Todos os agentes rodam no mesmo event loop, então não há necessidade de lock.
+        self._em_andamento: Dict[str, asyncio.Future] = {}
+        self.contadores = {'do_cache': 0, 'consultas_google': 0, 'compartilhadas': 0}
+
+    async def buscar(self, query: str, num_results: int, lang: str = "pt") -> List[str]:
+        """Retorna a lista de URLs da consulta, do cache quando possível."""
+        chave = gerar_chave(query, num_results, lang)
+        if self.cache:
+            urls = await self.cache.obter_async(chave)
+            if urls is not None:
+                self.contadores['do_cache'] += 1
+                print(f"⚡ Busca servida do cache: {query[:80]}")
+                return list(urls)
+
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(self._consultar_google(chave, query, num_results, lang))
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._em_andamento.pop(chave, None))
+        else:
+            self.contadores['compartilhadas'] += 1
+        # COMENTÁRIO: 'shield' impede que o cancelamento de um dos interessados cancele a busca dos demais.
+        return list(await asyncio.shield(tarefa))
+
+    async def _consultar_google(self, chave: str, query: str, num_results: int, lang: str) -> List[str]:
+        """Executa a busca bloqueante numa thread e guarda o resultado."""
+        self.contadores['consultas_google'] += 1
+        loop = asyncio.get_running_loop()
+        urls = await loop.run_in_executor(None, lambda: list(search(query, num_results=num_results, lang=lang)))
+        if self.cache and urls:
+            await self.cache.definir_async(chave, urls)
+        return urls
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Buscas respondidas do cache, enviadas ao Google e compartilhadas entre consultas simultâneas."""
+        if not self.cache:
+            return {"habilitado": False, **self.contadores}
+        return {"habilitado": True, **self.contadores, **self.cache.estatisticas()}
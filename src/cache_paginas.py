@@ -0,0 +1,146 @@
+# cache_paginas.py - Cache Persistente do Conteúdo das Páginas Pesquisadas (com GET Condicional)
+
+import os
+import re
+import time
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
+
+from cache_persistente import CachePersistente, gerar_chave
+
+TIPOS_CONTEUDO_ACEITOS = ('text/html', 'application/xhtml+xml', 'application/xml', 'text/xml', 'text/plain')
+# COMENTÁRIO: Estimativa barata do texto visível já recebido (sem scripts, estilos e tags), usada para parar o download cedo.
+_RE_BLOCOS_INVISIVEIS = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_RE_TAGS = re.compile(r'<[^>]*>')
+_RE_ESPACOS = re.compile(r'\s+')
+
+class CachePaginas:
+    """
+    Cache em disco do texto já limpo das páginas baixadas pelos agentes de pesquisa, endereçado pela URL.
+    - Dentro do prazo de frescor, a página é servida do cache sem nenhum acesso à rede.
+    - Depois dele, é revalidada com uma requisição condicional (If-None-Match / If-Modified-Since, a partir do
+      ETag e do Last-Modified guardados); um 304 renova o prazo sem baixar nem processar a página de novo.
+    - Falhas (status diferente de 200, timeouts, erros de conexão) entram num cache negativo de curta duração,
+      para que uma URL que acabou de falhar não seja tentada novamente a cada requisição.
+    - Como cada agente limpa o HTML de um jeito, o conteúdo é guardado por (perfil de extração, URL).
+    - O corpo é lido em blocos, com um limite de bytes por página, e a leitura para assim que o texto recebido
+      já basta para o que o agente vai guardar. Respostas que não são HTML (PDF, imagens...) são descartadas pelo
+      Content-Type, sem baixar o corpo.
+    O cache pode ser desligado com JURIDOC_CACHE_PAGINAS=0; as páginas continuam sendo baixadas por aqui.
+    """
+    def __init__(self):
+        self.config = {
+            'frescor_segundos': int(os.getenv('JURIDOC_CACHE_PAGINAS_FRESCOR_SEGUNDOS', str(24 * 3600))),
+            'ttl_segundos': int(os.getenv('JURIDOC_CACHE_PAGINAS_TTL_SEGUNDOS', str(30 * 24 * 3600))),
+            'ttl_negativo_segundos': int(os.getenv('JURIDOC_CACHE_PAGINAS_NEGATIVO_SEGUNDOS', '3600')),
+            'max_entradas': int(os.getenv('JURIDOC_CACHE_PAGINAS_MAX_ENTRADAS', '20000')),
+            'max_bytes': int(os.getenv('JURIDOC_CACHE_PAGINAS_MAX_MB', '300')) * 1024 * 1024,
+            'max_bytes_pagina': int(os.getenv('JURIDOC_MAX_KB_PAGINA', '2048')) * 1024,
+            'tamanho_bloco': 64 * 1024,
+            'margem_texto': 2.0, # Parte do texto estimado ainda sai na limpeza (menus, rodapés); lê o dobro do necessário.
+        }
+        self.cache = None
+        if os.getenv('JURIDOC_CACHE_PAGINAS', '1') != '0':
+            self.cache = CachePersistente(
+                "paginas",
+                ttl_segundos=self.config['ttl_segundos'],
+                max_entradas=self.config['max_entradas'],
+                max_bytes=self.config['max_bytes'],
+            )
+        self.contadores = {'frescas': 0, 'revalidadas': 0, 'baixadas': 0, 'truncadas': 0, 'negativas': 0, 'erros': 0}
+
+    async def obter(self, session, url: str, extrair: Callable[[str], Awaitable[Dict[str, Any]]], perfil: str, headers: Dict[str, str], timeout: float, max_caracteres: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o conteúdo extraído da página ({'texto', 'titulo', ...}, conforme 'extrair'), ou None se a página falhou.
+        'extrair' recebe o HTML decodificado e devolve (assíncrono) o conteúdo limpo; só é chamado quando a página é de fato baixada.
+        'max_caracteres' é quanto texto o agente aproveita da página; o download para quando ele já foi recebido.
+        """
+        chave = gerar_chave(perfil, url)
+        entrada = await self.cache.obter_async(chave) if self.cache else None
+        agora = time.time()
+
+        if entrada:
+            idade = agora - entrada['validado_em']
+            if entrada.get('falha'):
+                if idade < self.config['ttl_negativo_segundos']:
+                    self.contadores['negativas'] += 1
+                    print(f"🚫 Ignorada (falhou há {int(idade)}s: {entrada['falha']}): {url}")
+                    return None
+                entrada = None
+            elif idade < self.config['frescor_segundos']:
+                self.contadores['frescas'] += 1
+                print(f"⚡ Do cache: {url}")
+                return entrada['conteudo']
+
+        headers_requisicao = dict(headers)
+        if entrada and entrada.get('etag'):
+            headers_requisicao['If-None-Match'] = entrada['etag']
+        if entrada and entrada.get('last_modified'):
+            headers_requisicao['If-Modified-Since'] = entrada['last_modified']
+
+        try:
+            async with session.get(url, headers=headers_requisicao, timeout=timeout, ssl=False) as response:
+                if response.status == 304 and entrada:
+                    self.contadores['revalidadas'] += 1
+                    print(f"⚡ Do cache (não modificada): {url}")
+                    await self._guardar(chave, {**entrada, 'validado_em': agora})
+                    return entrada['conteudo']
+                if response.status != 200:
+                    print(f"❌ Falha (Status {response.status}): {url}")
+                    await self._registrar_falha(chave, f"status {response.status}", agora)
+                    return None
+                tipo_conteudo = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                if tipo_conteudo and tipo_conteudo not in TIPOS_CONTEUDO_ACEITOS:
+                    print(f"⚠️ Descartado (tipo {tipo_conteudo}): {url}")
+                    await self._registrar_falha(chave, f"tipo {tipo_conteudo}", agora)
+                    return None
+                html, truncada = await self._ler_corpo_limitado(response, max_caracteres)
+                if truncada:
+                    self.contadores['truncadas'] += 1
+                conteudo = await extrair(html)
+                self.contadores['baixadas'] += 1
+                await self._guardar(chave, {
+                    'conteudo': conteudo,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'validado_em': agora,
+                })
+                return conteudo
+        except Exception as e:
+            print(f"❌ Falha (Erro: {type(e).__name__}): {url}")
+            await self._registrar_falha(chave, type(e).__name__, agora)
+            return None
+
+    async def _ler_corpo_limitado(self, response, max_caracteres: Optional[int]) -> Tuple[str, bool]:
+        """
+        Lê o corpo em blocos até o fim, até 'max_bytes_pagina' ou até o texto visível estimado cobrir
+        'max_caracteres' (com margem). Retorna o HTML decodificado e se a leitura foi interrompida.
+        """
+        blocos = []
+        total_bytes = 0
+        texto_estimado = 0
+        meta_texto = max_caracteres * self.config['margem_texto'] if max_caracteres else None
+        async for bloco in response.content.iter_chunked(self.config['tamanho_bloco']):
+            blocos.append(bloco)
+            total_bytes += len(bloco)
+            if total_bytes >= self.config['max_bytes_pagina']:
+                return b"".join(blocos)[:self.config['max_bytes_pagina']].decode('utf-8', errors='ignore'), True
+            if meta_texto:
+                trecho = _RE_TAGS.sub(' ', _RE_BLOCOS_INVISIVEIS.sub(' ', bloco.decode('utf-8', errors='ignore')))
+                texto_estimado += len(_RE_ESPACOS.sub(' ', trecho))
+                if texto_estimado >= meta_texto:
+                    return b"".join(blocos).decode('utf-8', errors='ignore'), True
+        return b"".join(blocos).decode('utf-8', errors='ignore'), False
+
+    async def _guardar(self, chave: str, entrada: Dict[str, Any]):
+        if self.cache:
+            await self.cache.definir_async(chave, entrada)
+
+    async def _registrar_falha(self, chave: str, motivo: str, agora: float):
+        self.contadores['erros'] += 1
+        await self._guardar(chave, {'falha': motivo, 'validado_em': agora})
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Páginas servidas do cache, revalidadas (304), baixadas e evitadas pelo cache negativo."""
+        if not self.cache:
+            return {"habilitado": False, **self.contadores}
+        return {"habilitado": True, **self.contadores, **self.cache.estatisticas()}
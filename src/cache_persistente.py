@@ -0,0 +1,153 @@
+# cache_persistente.py - Cache em Disco (SQLite) com Expiração por TTL e Remoção LRU
+
+import os
+import json
+import math
+import asyncio
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+def diretorio_cache() -> str:
+    """Diretório onde os caches persistentes são gravados (configurável por JURIDOC_CACHE_DIR)."""
+    diretorio = os.getenv('JURIDOC_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'juridoc_cache'))
+    os.makedirs(diretorio, exist_ok=True)
+    return diretorio
+
+def gerar_chave(*partes: Any) -> str:
+    """Gera uma chave de conteúdo (SHA-256) estável a partir de qualquer combinação de valores serializáveis."""
+    conteudo = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+class CachePersistente:
+    """
+    Cache chave -> valor (JSON) armazenado num arquivo SQLite local.
+    - Entradas expiram após 'ttl_segundos'.
+    - Quando o número de entradas ou o tamanho total ultrapassa o limite, as menos usadas recentemente (LRU) são removidas.
+    - Mantém contadores de acertos e falhas para monitoramento.
+    É seguro para uso concorrente entre threads (uma conexão protegida por lock).
+    - O número de entradas e o total de bytes são mantidos em memória a cada escrita, sem varrer a tabela; as
+      entradas expiradas são apagadas (e os totais conferidos com a tabela) a cada 'intervalo_limpeza' escritas.
+    - No event loop, use 'obter_async'/'definir_async': a consulta ao SQLite roda numa thread e não bloqueia as
+      outras gerações em andamento.
+    """
+    def __init__(self, nome: str, ttl_segundos: int, max_entradas: int = 10000, max_bytes: int = 200 * 1024 * 1024, caminho: Optional[str] = None):
+        self.nome = nome
+        self.config = {
+            'ttl_segundos': ttl_segundos,
+            'max_entradas': max_entradas,
+            'max_bytes': max_bytes,
+            'intervalo_limpeza': 200,   # Escritas entre duas limpezas das entradas expiradas.
+            'folga_remocao': 0.05,      # Fração do limite liberada a mais em cada remoção LRU, para ela não ocorrer a cada escrita.
+        }
+        self.caminho = caminho or os.path.join(diretorio_cache(), f"{nome}.sqlite3")
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS entradas (
+                chave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                criado_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+        """)
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_entradas_acesso ON entradas (acessado_em)")
+        self.acertos = 0
+        self.falhas = 0
+        self._escritas_desde_limpeza = 0
+        with self._lock:
+            self._limpar_expiradas(time.time())
+
+    def obter(self, chave: str) -> Optional[Any]:
+        """Retorna o valor armazenado, ou None se não existir ou estiver expirado."""
+        agora = time.time()
+        with self._lock:
+            linha = self._conexao.execute("SELECT valor, criado_em, tamanho FROM entradas WHERE chave = ?", (chave,)).fetchone()
+            if linha and agora - linha[1] <= self.config['ttl_segundos']:
+                self._conexao.execute("UPDATE entradas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+                self.acertos += 1
+                return json.loads(linha[0])
+            if linha:
+                self._conexao.execute("DELETE FROM entradas WHERE chave = ?", (chave,))
+                self._total_entradas -= 1
+                self._total_bytes -= linha[2]
+            self.falhas += 1
+            return None
+
+    def definir(self, chave: str, valor: Any):
+        """Armazena (ou substitui) um valor e aplica os limites de tamanho do cache."""
+        serializado = json.dumps(valor, ensure_ascii=False)
+        agora = time.time()
+        with self._lock:
+            anterior = self._conexao.execute("SELECT tamanho FROM entradas WHERE chave = ?", (chave,)).fetchone()
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO entradas (chave, valor, tamanho, criado_em, acessado_em) VALUES (?, ?, ?, ?, ?)",
+                (chave, serializado, len(serializado), agora, agora)
+            )
+            if anterior:
+                self._total_bytes += len(serializado) - anterior[0]
+            else:
+                self._total_entradas += 1
+                self._total_bytes += len(serializado)
+            self._escritas_desde_limpeza += 1
+            if self._escritas_desde_limpeza >= self.config['intervalo_limpeza']:
+                self._limpar_expiradas(agora)
+            self._aplicar_limites()
+
+    async def obter_async(self, chave: str) -> Optional[Any]:
+        """'obter' numa thread, para uso dentro do event loop."""
+        return await asyncio.to_thread(self.obter, chave)
+
+    async def definir_async(self, chave: str, valor: Any):
+        """'definir' numa thread, para uso dentro do event loop."""
+        await asyncio.to_thread(self.definir, chave, valor)
+
+    def remover(self, chave: str):
+        with self._lock:
+            linha = self._conexao.execute("SELECT tamanho FROM entradas WHERE chave = ?", (chave,)).fetchone()
+            if not linha: return
+            self._conexao.execute("DELETE FROM entradas WHERE chave = ?", (chave,))
+            self._total_entradas -= 1
+            self._total_bytes -= linha[0]
+
+    def _limpar_expiradas(self, agora: float):
+        """Apaga as entradas expiradas e recalcula os totais a partir da tabela (chamado com o lock adquirido)."""
+        self._conexao.execute("DELETE FROM entradas WHERE criado_em < ?", (agora - self.config['ttl_segundos'],))
+        self._total_entradas, self._total_bytes = self._conexao.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()
+        self._escritas_desde_limpeza = 0
+
+    def _aplicar_limites(self):
+        """
+        Acima dos limites, remove de uma vez as entradas menos usadas recentemente, liberando também uma folga
+        ('folga_remocao') para que a próxima remoção não venha na escrita seguinte (chamado com o lock adquirido).
+        """
+        max_entradas, max_bytes = self.config['max_entradas'], self.config['max_bytes']
+        while self._total_entradas > 0 and (self._total_entradas > max_entradas or self._total_bytes > max_bytes):
+            excesso_entradas = self._total_entradas - int(max_entradas * (1 - self.config['folga_remocao']))
+            excesso_bytes = self._total_bytes - int(max_bytes * (1 - self.config['folga_remocao']))
+            tamanho_medio = max(self._total_bytes // self._total_entradas, 1)
+            quantidade = max(excesso_entradas, math.ceil(excesso_bytes / tamanho_medio), 1)
+            removidas, bytes_removidos = self._conexao.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM (SELECT tamanho FROM entradas ORDER BY acessado_em ASC LIMIT ?)", (quantidade,)
+            ).fetchone()
+            self._conexao.execute("DELETE FROM entradas WHERE chave IN (SELECT chave FROM entradas ORDER BY acessado_em ASC LIMIT ?)", (quantidade,))
+            self._total_entradas -= removidas
+            self._total_bytes -= bytes_removidos
+            if not removidas: break
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores de acertos/falhas e ocupação atual do cache."""
+        consultas = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": round(self.acertos / consultas, 3) if consultas else 0.0,
+            "entradas": self._total_entradas,
+            "bytes": self._total_bytes,
+        }
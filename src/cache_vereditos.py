@@ -0,0 +1,55 @@
+# cache_vereditos.py - Cache Persistente dos Vereditos de Relevância (URL + Termo -> SIM/NÃO)
+
+import os
+import hashlib
+from typing import Dict, Any, Optional
+
+from cache_persistente import CachePersistente, gerar_chave
+from busca_textual import tokenizar
+
+def normalizar_termo(termo: str) -> str:
+    """'Danos Morais' e 'dano moral' viram o mesmo termo (tokens normalizados, sem repetição, em ordem alfabética)."""
+    return ' '.join(sorted(set(tokenizar(termo))))
+
+def hash_conteudo(texto: str) -> str:
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:32]
+
+class CacheVereditos:
+    """
+    Guarda em disco o veredito de relevância (triagem local ou IA) de cada página para cada termo pesquisado.
+    - Páginas já julgadas irrelevantes para o termo nem são baixadas novamente enquanto o veredito não expira.
+    - Páginas já aprovadas são reaproveitadas sem nova validação se o conteúdo (hash do texto) não mudou.
+    O cache pode ser desligado com JURIDOC_CACHE_VEREDITOS=0.
+    """
+    def __init__(self):
+        self.config = {
+            'ttl_segundos': int(os.getenv('JURIDOC_CACHE_VEREDITOS_TTL_SEGUNDOS', str(30 * 24 * 3600))),
+            'max_entradas': int(os.getenv('JURIDOC_CACHE_VEREDITOS_MAX_ENTRADAS', '100000')),
+        }
+        self.cache = None
+        if os.getenv('JURIDOC_CACHE_VEREDITOS', '1') != '0':
+            self.cache = CachePersistente("vereditos_relevancia", ttl_segundos=self.config['ttl_segundos'], max_entradas=self.config['max_entradas'])
+        self.contadores = {'ignoradas_sem_download': 0, 'reaproveitados': 0, 'conteudo_alterado': 0}
+
+    async def obter(self, url: str, termo: str) -> Optional[Dict[str, Any]]:
+        """{'relevante': bool, 'hash': str} do último julgamento da página para o termo, ou None."""
+        if not self.cache: return None
+        return await self.cache.obter_async(gerar_chave(url, normalizar_termo(termo)))
+
+    async def definir(self, url: str, termo: str, texto: str, relevante: bool):
+        if not self.cache: return
+        await self.cache.definir_async(gerar_chave(url, normalizar_termo(termo)), {'relevante': relevante, 'hash': hash_conteudo(texto)})
+
+    def veredito_valido(self, veredito: Optional[Dict[str, Any]], texto: str) -> Optional[bool]:
+        """O veredito guardado, se ainda vale para o texto atual da página; None se não há veredito ou o conteúdo mudou."""
+        if not veredito: return None
+        if veredito['hash'] != hash_conteudo(texto):
+            self.contadores['conteudo_alterado'] += 1
+            return None
+        self.contadores['reaproveitados'] += 1
+        return veredito['relevante']
+
+    def estatisticas(self) -> Dict[str, Any]:
+        if not self.cache:
+            return {"habilitado": False, **self.contadores}
+        return {"habilitado": True, **self.contadores, **self.cache.estatisticas()}
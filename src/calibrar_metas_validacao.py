@@ -0,0 +1,113 @@
+# calibrar_metas_validacao.py - Calibração das Metas do Agente Validador a partir de um Corpus
+
+"""
+Calcula as metas de tamanho por tipo de documento (e por seção) a partir de um corpus de
+documentos aceitos e grava a tabela usada pelo AgenteValidador (metas_validacao.json).
+
+Fontes de corpus aceitas:
+  - Arquivos JSONL gerados pelo próprio sistema (variável JURIDOC_CORPUS_DOCUMENTOS), com
+    'tipo_documento', 'tamanho_documento' e 'tamanhos_secoes' por linha. Por padrão só entram os
+    documentos aprovados pelo validador ('status_validacao'), para que versões reprovadas não puxem as metas.
+  - Diretórios com um subdiretório por tipo de documento contendo arquivos .html
+    (ex: corpus/Habeas Corpus/hc_001.html). Nesse caso apenas a meta do documento é calibrada.
+
+A meta é escolhida de forma que o limite de aceitação (meta x tolerância) coincida com o
+percentil informado dos documentos do corpus: por padrão, 80% dos documentos aceitos passariam
+na primeira tentativa.
+
+Uso:
+    python calibrar_metas_validacao.py --corpus corpus_documentos.jsonl --percentil 20
+    python calibrar_metas_validacao.py --corpus ./corpus_html --simular
+"""
+
+import os
+import json
+import argparse
+import statistics
+from collections import defaultdict
+from typing import Dict, Any, List
+
+from agente_validador import CAMINHO_METAS_PADRAO
+
+def carregar_corpus(caminhos: List[str], somente_aprovados: bool = True) -> Dict[str, Dict[str, Any]]:
+    """Agrupa os tamanhos dos documentos e das seções por tipo de documento."""
+    amostras = defaultdict(lambda: {'documentos': [], 'secoes': defaultdict(list)})
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            for tipo in sorted(os.listdir(caminho)):
+                diretorio_tipo = os.path.join(caminho, tipo)
+                if not os.path.isdir(diretorio_tipo): continue
+                for nome_arquivo in sorted(os.listdir(diretorio_tipo)):
+                    if not nome_arquivo.lower().endswith(('.html', '.htm')): continue
+                    with open(os.path.join(diretorio_tipo, nome_arquivo), encoding='utf-8', errors='ignore') as arquivo:
+                        amostras[tipo]['documentos'].append(len(arquivo.read()))
+        else:
+            with open(caminho, encoding='utf-8') as arquivo:
+                for linha in arquivo:
+                    if not linha.strip(): continue
+                    registro = json.loads(linha)
+                    if somente_aprovados and registro.get('status_validacao') != 'aprovado': continue
+                    tipo = registro.get('tipo_documento') or 'padrao'
+                    amostras[tipo]['documentos'].append(int(registro.get('tamanho_documento', 0)))
+                    for secao, tamanho in (registro.get('tamanhos_secoes') or {}).items():
+                        amostras[tipo]['secoes'][secao].append(int(tamanho))
+    return amostras
+
+def calcular_percentil(valores: List[int], percentil: float) -> float:
+    """Percentil com interpolação linear (funciona também para poucas amostras)."""
+    if len(valores) == 1: return float(valores[0])
+    return statistics.quantiles(sorted(valores), n=100, method='inclusive')[max(0, min(98, int(round(percentil)) - 1))]
+
+def calibrar(tabela_atual: Dict[str, Any], amostras: Dict[str, Dict[str, Any]], percentil: float, min_amostras: int) -> Dict[str, Any]:
+    """Gera a nova tabela de metas; tipos/seções com poucas amostras mantêm a meta atual."""
+    nova_tabela = json.loads(json.dumps(tabela_atual))
+    tolerancia_padrao = tabela_atual.get('padrao', {}).get('tolerancia', 0.80)
+    for tipo, dados in sorted(amostras.items()):
+        criterios = nova_tabela.setdefault(tipo, {'tamanho_minimo': tabela_atual.get('padrao', {}).get('tamanho_minimo', 30000), 'tolerancia': tolerancia_padrao, 'secoes': {}})
+        tolerancia = criterios.get('tolerancia', tolerancia_padrao)
+        if len(dados['documentos']) >= min_amostras:
+            antes = criterios.get('tamanho_minimo')
+            criterios['tamanho_minimo'] = int(round(calcular_percentil(dados['documentos'], percentil) / tolerancia, -2))
+            print(f"📐 {tipo}: documento {antes} -> {criterios['tamanho_minimo']} ({len(dados['documentos'])} amostras)")
+        else:
+            print(f"⚠️ {tipo}: apenas {len(dados['documentos'])} documentos (mínimo {min_amostras}); meta do documento mantida.")
+        for secao, tamanhos in sorted(dados['secoes'].items()):
+            if secao not in criterios.setdefault('secoes', {}): continue  # Só calibra seções que já têm meta.
+            if len(tamanhos) < min_amostras: continue
+            antes = criterios['secoes'][secao]
+            criterios['secoes'][secao] = int(round(calcular_percentil(tamanhos, percentil) / tolerancia, -2))
+            print(f"   -> seção '{secao}': {antes} -> {criterios['secoes'][secao]} ({len(tamanhos)} amostras)")
+    return nova_tabela
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra as metas de validação por tipo de documento a partir de um corpus de documentos aceitos.")
+    parser.add_argument('--corpus', nargs='+', required=True, help="Arquivos JSONL e/ou diretórios (um subdiretório .html por tipo).")
+    parser.add_argument('--percentil', type=float, default=20.0, help="Percentil dos tamanhos aceitos usado como limite de aceitação (padrão: 20).")
+    parser.add_argument('--min-amostras', type=int, default=5, help="Número mínimo de documentos para recalibrar um tipo ou seção (padrão: 5).")
+    parser.add_argument('--incluir-reprovados', action='store_true', help="Nos arquivos JSONL, considera também os documentos reprovados pelo validador (por padrão, só os aprovados).")
+    parser.add_argument('--metas', default=CAMINHO_METAS_PADRAO, help="Tabela de metas atual (e de saída).")
+    parser.add_argument('--saida', default=None, help="Arquivo de saída (padrão: sobrescreve --metas).")
+    parser.add_argument('--simular', action='store_true', help="Apenas mostra as novas metas, sem gravar.")
+    args = parser.parse_args()
+
+    with open(args.metas, encoding='utf-8') as arquivo:
+        tabela_atual = json.load(arquivo)
+
+    amostras = carregar_corpus(args.corpus, somente_aprovados=not args.incluir_reprovados)
+    if not amostras:
+        print("❌ Nenhum documento encontrado no corpus.")
+        return
+
+    nova_tabela = calibrar(tabela_atual, amostras, args.percentil, args.min_amostras)
+    if args.simular:
+        print(json.dumps(nova_tabela, indent=2, ensure_ascii=False))
+        return
+
+    caminho_saida = args.saida or args.metas
+    with open(caminho_saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(nova_tabela, arquivo, indent=2, ensure_ascii=False)
+        arquivo.write("\n")
+    print(f"✅ Metas de validação gravadas em {caminho_saida}")
+
+if __name__ == '__main__':
+    main()
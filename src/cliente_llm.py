@@ -0,0 +1,188 @@
+# cliente_llm.py - Cliente Assíncrono Compartilhado para a API da DeepSeek
+
+import os
+import re
+import importlib.util
+import httpx
+import openai
+from typing import Optional, Dict, Any, List
+
+from cache_persistente import CachePersistente, gerar_chave
+from orcamento_tokens import contar_tokens
+
+INSTRUCAO_CONTINUACAO = "Continue o texto acima exatamente de onde ele parou, no mesmo formato HTML. NÃO repita nada do que já foi escrito, NÃO reabra o título da seção e NÃO resuma o que já foi dito: apenas acrescente novos parágrafos que aprofundem o conteúdo."
+FIM_DE_BLOCO = re.compile(r"</(?:p|h2|h3)>")
+
+class ClienteLLM:
+    """
+    Cliente único (AsyncOpenAI) compartilhado por todos os agentes que chamam a DeepSeek.
+    - Usa um pool de conexões HTTP com keep-alive, de forma que as seções geradas em paralelo
+      reaproveitam conexões TLS já abertas em vez de cada uma abrir a sua.
+    - Usa HTTP/2 quando o pacote 'h2' está instalado (várias requisições na mesma conexão).
+    - As chamadas são nativamente assíncronas: nenhuma thread é ocupada enquanto se espera a resposta.
+    - Respostas ficam num cache em disco, endereçado pelo conteúdo (modelo, temperatura, max_tokens e prompt),
+      de forma que um formulário reenviado é respondido sem nova chamada à API.
+    - Seções com meta de tamanho são geradas em streaming e interrompidas ao atingi-la; seções curtas
+      podem ser continuadas a partir do texto já gerado.
+    - Um 'contexto' comum (ver construtor_prompts) vai como primeira mensagem, idêntica em todas as seções de um
+      documento, para ser aproveitado pelo cache de prefixo da API; os tokens de entrada lidos desse cache e os
+      processados do zero, informados pela API no campo 'usage', são acumulados em 'estatisticas_uso'. Numa geração
+      interrompida antes do último chunk (que traz o 'usage'), os tokens são estimados e a entrada conta como sem cache.
+    """
+    def __init__(self, api_key: Optional[str] = None, base_url: str = "https://api.deepseek.com/v1", modelo: str = "deepseek-chat"):
+        api_key = api_key or os.getenv('DEEPSEEK_API_KEY')
+        if not api_key: raise ValueError("DEEPSEEK_API_KEY não configurada")
+
+        self.modelo = modelo
+        self.config = {
+            'max_conexoes': int(os.getenv('JURIDOC_LLM_MAX_CONEXOES', '32')),
+            'max_conexoes_keepalive': int(os.getenv('JURIDOC_LLM_MAX_CONEXOES_KEEPALIVE', '16')),
+            'keepalive_segundos': 120.0,
+            'timeout_segundos': 600.0,
+            'http2': importlib.util.find_spec('h2') is not None,
+        }
+        self._http_client = httpx.AsyncClient(
+            http2=self.config['http2'],
+            limits=httpx.Limits(
+                max_connections=self.config['max_conexoes'],
+                max_keepalive_connections=self.config['max_conexoes_keepalive'],
+                keepalive_expiry=self.config['keepalive_segundos'],
+            ),
+            timeout=httpx.Timeout(self.config['timeout_segundos'], connect=15.0),
+        )
+        self.client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self._http_client)
+
+        # COMENTÁRIO: O cache pode ser desligado com JURIDOC_CACHE_LLM=0 (ex: para comparar gerações).
+        self.cache = None
+        if os.getenv('JURIDOC_CACHE_LLM', '1') != '0':
+            self.cache = CachePersistente(
+                "completacoes_llm",
+                ttl_segundos=int(os.getenv('JURIDOC_CACHE_LLM_TTL_SEGUNDOS', str(7 * 24 * 3600))),
+                max_entradas=int(os.getenv('JURIDOC_CACHE_LLM_MAX_ENTRADAS', '5000')),
+                max_bytes=int(os.getenv('JURIDOC_CACHE_LLM_MAX_MB', '200')) * 1024 * 1024,
+            )
+        self.uso = {'chamadas_com_uso': 0, 'chamadas_com_uso_estimado': 0, 'tokens_entrada_cache': 0, 'tokens_entrada_sem_cache': 0, 'tokens_entrada_estimados': 0, 'tokens_saida': 0}
+        print(f"✅ Cliente LLM compartilhado inicializado (HTTP/2: {'sim' if self.config['http2'] else 'não'}, até {self.config['max_conexoes']} conexões).")
+
+    async def completar(self, prompt: str, temperatura: float, max_tokens: int = 8192, modelo: Optional[str] = None, tamanho_alvo: Optional[int] = None, texto_anterior: Optional[str] = None, contexto: Optional[str] = None, ler_cache: bool = True) -> str:
+        """
+        Envia um prompt de usuário único e retorna o texto da resposta (consultando o cache antes).
+        - Com 'contexto', ele é enviado antes do prompt como mensagem de sistema (o prefixo comum das seções).
+        - Com 'tamanho_alvo', a resposta é recebida em streaming e a geração é interrompida no primeiro fim de
+          parágrafo após atingir esse número de caracteres, sem pagar pelos tokens restantes.
+        - Com 'texto_anterior', pede a continuação desse texto (sem repeti-lo) e retorna apenas o trecho novo.
+        - Com 'ler_cache=False', o cache não é consultado (a resposta nova ainda é guardada). Os redatores usam isso nas
+          novas tentativas: quando o validador não aponta seções, os prompts podem ser idênticos aos da tentativa
+          anterior, e o cache devolveria o mesmo texto reprovado.
+        """
+        modelo = modelo or self.modelo
+        partes_chave = [modelo, temperatura, max_tokens, prompt]
+        if tamanho_alvo or texto_anterior:
+            partes_chave += [tamanho_alvo, texto_anterior]
+        if contexto:
+            partes_chave += ["contexto", contexto]
+        chave = gerar_chave(*partes_chave)
+        if self.cache and ler_cache:
+            resposta_cache = await self.cache.obter_async(chave)
+            if resposta_cache is not None:
+                return resposta_cache
+
+        mensagens = [{"role": "system", "content": contexto}] if contexto else []
+        mensagens.append({"role": "user", "content": prompt})
+        if texto_anterior:
+            instrucao = INSTRUCAO_CONTINUACAO + (f" Acrescente pelo menos {tamanho_alvo} caracteres." if tamanho_alvo else "")
+            mensagens += [{"role": "assistant", "content": texto_anterior}, {"role": "user", "content": instrucao}]
+
+        if tamanho_alvo:
+            resposta = await self._completar_em_streaming(modelo, mensagens, temperatura, max_tokens, tamanho_alvo)
+        else:
+            response = await self.client.chat.completions.create(
+                model=modelo,
+                messages=mensagens,
+                max_tokens=max_tokens,
+                temperature=temperatura
+            )
+            self._registrar_uso(response.usage)
+            resposta = response.choices[0].message.content or ""
+        # Respostas vazias não são guardadas, para não fixar uma falha no cache.
+        if self.cache and resposta.strip():
+            await self.cache.definir_async(chave, resposta)
+        return resposta
+
+    async def _completar_em_streaming(self, modelo: str, mensagens: List[Dict[str, str]], temperatura: float, max_tokens: int, tamanho_alvo: int) -> str:
+        """Recebe a resposta em streaming e encerra a conexão assim que o texto atinge 'tamanho_alvo' num fim de parágrafo."""
+        stream = await self.client.chat.completions.create(
+            model=modelo,
+            messages=mensagens,
+            max_tokens=max_tokens,
+            temperature=temperatura,
+            stream=True,
+            # COMENTÁRIO: O uso (tokens) vem num último chunk sem 'choices'; se a geração for interrompida antes, ele é estimado.
+            stream_options={"include_usage": True}
+        )
+        texto = ""
+        uso_recebido = False
+        try:
+            async for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    self._registrar_uso(chunk.usage)
+                    uso_recebido = True
+                if not chunk.choices: continue
+                texto += chunk.choices[0].delta.content or ""
+                if len(texto) < tamanho_alvo: continue
+                # COMENTÁRIO: Só corta num fechamento de bloco, para a seção não terminar no meio de uma frase.
+                fim_bloco = FIM_DE_BLOCO.search(texto, max(0, tamanho_alvo - 5))
+                if fim_bloco:
+                    print(f"⏹️ Geração interrompida em {fim_bloco.end()} caracteres (alvo: {tamanho_alvo}).")
+                    texto = texto[:fim_bloco.end()]
+                    break
+        finally:
+            await stream.close()
+        if not uso_recebido:
+            self._registrar_uso_estimado(mensagens, texto)
+        return texto
+
+    def _registrar_uso(self, usage: Any):
+        """
+        Acumula os tokens informados pela API. A DeepSeek informa 'prompt_cache_hit_tokens' e 'prompt_cache_miss_tokens';
+        APIs compatíveis com a OpenAI informam 'prompt_tokens_details.cached_tokens'.
+        """
+        if usage is None: return
+        tokens_entrada = getattr(usage, 'prompt_tokens', 0) or 0
+        em_cache = getattr(usage, 'prompt_cache_hit_tokens', None)
+        if em_cache is None:
+            em_cache = getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', None) or 0
+        sem_cache = getattr(usage, 'prompt_cache_miss_tokens', None)
+        if sem_cache is None:
+            sem_cache = max(tokens_entrada - em_cache, 0)
+        self.uso['chamadas_com_uso'] += 1
+        self.uso['tokens_entrada_cache'] += em_cache
+        self.uso['tokens_entrada_sem_cache'] += sem_cache
+        self.uso['tokens_saida'] += getattr(usage, 'completion_tokens', 0) or 0
+        print(f"💾 Tokens de entrada: {em_cache} do cache de prefixo, {sem_cache} sem cache.")
+
+    def _registrar_uso_estimado(self, mensagens: List[Dict[str, str]], texto: str):
+        """
+        Uso de uma chamada sem o 'usage' da API (geração interrompida): os tokens são contados localmente e toda a
+        entrada conta como sem cache, pois não se sabe quanto dela veio do cache de prefixo.
+        """
+        tokens_entrada = sum(contar_tokens(mensagem['content']) for mensagem in mensagens)
+        self.uso['chamadas_com_uso_estimado'] += 1
+        self.uso['tokens_entrada_sem_cache'] += tokens_entrada
+        self.uso['tokens_entrada_estimados'] += tokens_entrada
+        self.uso['tokens_saida'] += contar_tokens(texto)
+        print(f"💾 Tokens de entrada: {tokens_entrada} estimados (geração interrompida antes do uso informado pela API).")
+
+    def estatisticas_uso(self) -> Dict[str, Any]:
+        """
+        Tokens acumulados desde o início do processo, com a fração da entrada servida pelo cache de prefixo da API.
+        Como a entrada das chamadas interrompidas ('tokens_entrada_estimados') conta como sem cache, a fração é um limite inferior.
+        """
+        tokens_entrada = self.uso['tokens_entrada_cache'] + self.uso['tokens_entrada_sem_cache']
+        return {**self.uso, 'fracao_entrada_cache': round(self.uso['tokens_entrada_cache'] / tokens_entrada, 3) if tokens_entrada else 0.0}
+
+    def estatisticas_cache(self) -> Dict[str, Any]:
+        """Acertos, falhas e ocupação do cache de completações."""
+        if not self.cache:
+            return {"habilitado": False}
+        return {"habilitado": True, **self.cache.estatisticas()}
@@ -0,0 +1,139 @@
+# condensador_pesquisa.py - Condensação da Pesquisa num Resumo Jurídico por Categoria (Map-Reduce)
+
+import os
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+
+from cliente_llm import ClienteLLM
+from cache_persistente import CachePersistente, gerar_chave
+from cache_vereditos import hash_conteudo
+from selecao_trechos import selecionar_trechos
+
+CATEGORIAS = {
+    "legislacao": "LEGISLAÇÃO",
+    "jurisprudencia": "JURISPRUDÊNCIA",
+    "doutrina": "DOUTRINA",
+    "pesquisa": "MODELOS E CLÁUSULAS DE REFERÊNCIA",
+}
+# COMENTÁRIO: Muda quando os prompts abaixo mudam, para não reaproveitar resumos feitos com instruções antigas.
+VERSAO_PROMPTS = 1
+
+PROMPT_RESUMO_FONTE = """Resuma a fonte jurídica abaixo ({categoria}) para uso na redação de um documento jurídico sobre "{termo}".
+Preserve literalmente todas as citações úteis: artigos e incisos de lei, números de processo, tribunal, órgão julgador, relator, datas, autores e obras, e trechos citáveis entre aspas.
+Não acrescente nada que não esteja no texto. Use no máximo {palavras} palavras, em texto corrido e sem Markdown.
+Se a fonte não tiver conteúdo jurídico útil para o tema, responda apenas: IRRELEVANTE
+
+FONTE: {url}
+TEXTO:
+{texto}"""
+
+PROMPT_RESUMO_CATEGORIA = """Una os resumos de fontes abaixo num único RESUMO JURÍDICO de {categoria}, compacto e rico em citações, para ser usado por todas as seções de um documento jurídico.
+Agrupe por tema, elimine repetições e mantenha cada citação (artigo, número de processo, tribunal, autor, trecho entre aspas) acompanhada da URL da sua fonte no formato (Fonte: URL).
+Não acrescente nada que não esteja nos resumos. Use no máximo {palavras} palavras, em texto corrido e sem Markdown.
+
+RESUMOS:
+{resumos}"""
+
+class CondensadorPesquisa:
+    """
+    Etapa opcional após a pesquisa (JURIDOC_CONDENSAR_PESQUISA=1): condensa as fontes de cada categoria num resumo jurídico.
+    - map: cada fonte é resumida em paralelo, preservando as citações;
+    - reduce: os resumos de uma categoria viram um único resumo compacto, com a URL de cada citação.
+    O resumo substitui a pesquisa formatada da categoria ('<categoria>_formatada') e, com o contexto comum dos redatores,
+    é enviado igual a todas as seções e tentativas: cada fonte é paga uma vez por solicitação, não por seção.
+    Os resumos ficam num cache em disco endereçado pelo conjunto de hashes dos conteúdos das fontes.
+    """
+    def __init__(self, cliente_llm: Optional[ClienteLLM] = None):
+        self.config = {
+            'habilitado': os.getenv('JURIDOC_CONDENSAR_PESQUISA', '0') == '1',
+            'caracteres_por_fonte': 6000,    # Trechos mais relevantes de cada fonte enviados ao resumo (map).
+            'palavras_resumo_fonte': 250,
+            'palavras_resumo_categoria': 1200,
+            'max_tokens_resumo_fonte': 800,
+            'max_tokens_resumo_categoria': 3000,
+            'max_resumos_simultaneos': 8,
+            'temperatura': 0.1,
+            'ttl_segundos': int(os.getenv('JURIDOC_CONDENSAR_PESQUISA_TTL_SEGUNDOS', str(30 * 24 * 3600))),
+        }
+        self.cliente_llm = cliente_llm
+        self.cache = None
+        if self.config['habilitado']:
+            self.cliente_llm = cliente_llm or ClienteLLM()
+            self.cache = CachePersistente("resumos_pesquisa", ttl_segundos=self.config['ttl_segundos'], max_entradas=5000)
+        self.contadores = {'categorias_condensadas': 0, 'do_cache': 0, 'fontes_resumidas': 0, 'erros': 0}
+
+    async def _resumir_fonte_async(self, semaforo: asyncio.Semaphore, categoria: str, item: Dict[str, Any], trecho: str) -> Tuple[Optional[str], bool]:
+        """(resumo da fonte, houve erro) do map; o resumo é None se a fonte não tem nada útil e, em caso de erro, é o próprio trecho."""
+        prompt = PROMPT_RESUMO_FONTE.format(categoria=CATEGORIAS[categoria], termo=item.get('termo', ''), palavras=self.config['palavras_resumo_fonte'], url=item['url'], texto=trecho)
+        async with semaforo:
+            try:
+                resumo = (await self.cliente_llm.completar(prompt, temperatura=self.config['temperatura'], max_tokens=self.config['max_tokens_resumo_fonte'])).strip()
+            except Exception as e:
+                print(f"⚠️ Falha ao resumir a fonte {item['url']}: {e}")
+                self.contadores['erros'] += 1
+                return trecho, True
+        self.contadores['fontes_resumidas'] += 1
+        return (None if not resumo or resumo.upper().startswith("IRRELEVANTE") else resumo), False
+
+    async def condensar_categoria_async(self, categoria: str, itens: List[Dict[str, Any]]) -> Optional[str]:
+        """Resumo jurídico da categoria a partir dos seus itens ({url, texto, termo}); None se não há o que condensar."""
+        if not itens:
+            return None
+        trechos = [selecionar_trechos(item['texto'], item.get('termo', ''), self.config['caracteres_por_fonte']) for item in itens]
+        chave = gerar_chave(VERSAO_PROMPTS, categoria, sorted({hash_conteudo(trecho) for trecho in trechos}))
+        resumo_cache = await self.cache.obter_async(chave) if self.cache else None
+        if resumo_cache is not None:
+            self.contadores['do_cache'] += 1
+            print(f"🗜️ Resumo de {categoria.upper()} reaproveitado do cache ({len(itens)} fontes).")
+            return resumo_cache
+
+        semaforo = asyncio.Semaphore(self.config['max_resumos_simultaneos'])
+        resultados = await asyncio.gather(*[self._resumir_fonte_async(semaforo, categoria, item, trecho) for item, trecho in zip(itens, trechos)])
+        resumos_fontes = [f"Fonte: {item['url']}\n{resumo}" for item, (resumo, _) in zip(itens, resultados) if resumo]
+        houve_erro = any(erro for _, erro in resultados)
+        if not resumos_fontes:
+            return None
+        if len(resumos_fontes) == 1:
+            resumo_final = resumos_fontes[0]
+        else:
+            prompt = PROMPT_RESUMO_CATEGORIA.format(categoria=CATEGORIAS[categoria], palavras=self.config['palavras_resumo_categoria'], resumos="\n\n".join(resumos_fontes))
+            try:
+                resumo_final = (await self.cliente_llm.completar(prompt, temperatura=self.config['temperatura'], max_tokens=self.config['max_tokens_resumo_categoria'])).strip()
+            except Exception as e:
+                # Sem o reduce, os resumos das fontes (já bem menores que a pesquisa original) são usados diretamente.
+                print(f"⚠️ Falha ao unir os resumos de {categoria.upper()}: {e}")
+                self.contadores['erros'] += 1
+                return "\n\n".join(resumos_fontes)
+            if not resumo_final:
+                return "\n\n".join(resumos_fontes)
+
+        self.contadores['categorias_condensadas'] += 1
+        # Um resumo com trechos brutos (falha no map) serve a esta solicitação, mas não fica no cache.
+        if self.cache and not houve_erro:
+            await self.cache.definir_async(chave, resumo_final)
+        print(f"🗜️ {categoria.upper()}: {len(itens)} fontes condensadas em {len(resumo_final)} caracteres.")
+        return resumo_final
+
+    async def condensar_async(self, resultado_pesquisa: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Substitui a pesquisa formatada de cada categoria pelo seu resumo, condensando as categorias em paralelo.
+        Sem a etapa habilitada, ou se uma categoria não puder ser condensada, a pesquisa formatada original é mantida.
+        """
+        if not self.config['habilitado'] or not resultado_pesquisa:
+            return resultado_pesquisa
+        # Petições trazem uma lista por categoria; contratos trazem só 'conteudos_extraidos' e a 'pesquisa_formatada'.
+        categorias = {categoria: resultado_pesquisa[categoria] for categoria in ("legislacao", "jurisprudencia", "doutrina") if isinstance(resultado_pesquisa.get(categoria), list)}
+        if not categorias and 'pesquisa_formatada' in resultado_pesquisa:
+            categorias = {"pesquisa": resultado_pesquisa.get('conteudos_extraidos') or []}
+
+        resumos = await asyncio.gather(*[self.condensar_categoria_async(categoria, itens) for categoria, itens in categorias.items()])
+        condensado = dict(resultado_pesquisa)
+        for categoria, resumo in zip(categorias, resumos):
+            if resumo:
+                condensado[f'{categoria}_formatada'] = resumo
+        return condensado
+
+    def estatisticas(self) -> Dict[str, Any]:
+        if not self.cache:
+            return {"habilitado": False, **self.contadores}
+        return {"habilitado": True, **self.contadores, **self.cache.estatisticas()}
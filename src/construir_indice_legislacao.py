@@ -0,0 +1,104 @@
+# construir_indice_legislacao.py - Geração do Snapshot Local da Legislação (zstd)
+
+"""
+Baixa (ou lê de arquivos salvos) o texto compilado dos códigos no planalto.gov.br, separa os artigos
+e grava o snapshot compactado usado pelo IndiceLegislacao (dados/legislacao.json.zst).
+
+O texto revogado (riscado no planalto) é descartado; quando um artigo aparece mais de uma vez
+(ex: o artigo da lei que aprova o código), vale a última ocorrência.
+
+Uso:
+    python construir_indice_legislacao.py
+    python construir_indice_legislacao.py --codigos CLT CPP
+    python construir_indice_legislacao.py --arquivo CLT=./del5452compilado.htm --saida ./dados/legislacao.json.zst
+"""
+
+import os
+import re
+import json
+import argparse
+import urllib.request
+from datetime import datetime
+from typing import Dict, Any, List
+
+import zstandard
+
+from extracao_html import extrair_texto_html, TAGS_REMOVIDAS_PADRAO
+from indice_legislacao import CAMINHO_INDICE_PADRAO, normalizar_numero_artigo
+
+CODIGOS = {
+    'CF': {'nome': 'Constituição Federal', 'url': 'https://www.planalto.gov.br/ccivil_03/constituicao/constituicao.htm'},
+    'CC': {'nome': 'Código Civil', 'url': 'https://www.planalto.gov.br/ccivil_03/leis/2002/l10406compilada.htm'},
+    'CPC': {'nome': 'Código de Processo Civil', 'url': 'https://www.planalto.gov.br/ccivil_03/_ato2015-2018/2015/lei/l13105.htm'},
+    'CP': {'nome': 'Código Penal', 'url': 'https://www.planalto.gov.br/ccivil_03/decreto-lei/del2848compilado.htm'},
+    'CPP': {'nome': 'Código de Processo Penal', 'url': 'https://www.planalto.gov.br/ccivil_03/decreto-lei/del3689compilado.htm'},
+    'CLT': {'nome': 'Consolidação das Leis do Trabalho', 'url': 'https://www.planalto.gov.br/ccivil_03/decreto-lei/del5452compilado.htm'},
+}
+_RE_INICIO_ARTIGO = re.compile(r'^\s*Art\.\s*(\d{1,4}(?:\.\d{3})*)\s*(?:o|º|°)?\s*(?:-\s*([A-Z])\b)?')
+_RE_TITULO_ESTRUTURA = re.compile(r'^(PARTE|LIVRO|T[IÍ]TULO|CAP[IÍ]TULO|SE[CÇ][AÃ]O|SUBSE[CÇ][AÃ]O)\b', re.IGNORECASE)
+
+def decodificar(conteudo: bytes) -> str:
+    """O planalto declara o charset na página (normalmente windows-1252); sem declaração, tenta UTF-8."""
+    declarado = re.search(rb'charset=["\']?([\w-]+)', conteudo[:4096], re.IGNORECASE)
+    for encoding in ([declarado.group(1).decode('ascii')] if declarado else []) + ['utf-8', 'cp1252']:
+        try:
+            return conteudo.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return conteudo.decode('cp1252', errors='ignore')
+
+def separar_artigos(texto: str) -> List[Dict[str, str]]:
+    """Divide o texto do código em artigos ({'numero', 'texto'}), descartando os títulos de capítulos e seções."""
+    artigos: Dict[str, List[str]] = {}
+    atual = None
+    for linha in texto.split('\n'):
+        linha = linha.strip()
+        if not linha: continue
+        inicio = _RE_INICIO_ARTIGO.match(linha)
+        if inicio:
+            atual = normalizar_numero_artigo(inicio.group(1), inicio.group(2))
+            artigos.pop(atual, None)  # Vale a última ocorrência, na posição em que ela aparece.
+            artigos[atual] = [linha]
+        elif atual and not _RE_TITULO_ESTRUTURA.match(linha) and not linha.isupper():
+            artigos[atual].append(linha)
+    return [{'numero': numero, 'texto': ' '.join(linhas)} for numero, linhas in artigos.items()]
+
+def obter_html(sigla: str, arquivos_locais: Dict[str, str]) -> str:
+    if sigla in arquivos_locais:
+        with open(arquivos_locais[sigla], 'rb') as arquivo:
+            return decodificar(arquivo.read())
+    requisicao = urllib.request.Request(CODIGOS[sigla]['url'], headers={'User-Agent': 'Mozilla/5.0'})
+    with urllib.request.urlopen(requisicao, timeout=60) as resposta:
+        return decodificar(resposta.read())
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o snapshot local (zstd) da legislação usado pelo IndiceLegislacao.")
+    parser.add_argument('--codigos', nargs='+', default=list(CODIGOS), choices=list(CODIGOS), help="Códigos a incluir (padrão: todos).")
+    parser.add_argument('--arquivo', action='append', default=[], help="Usa um HTML salvo em vez de baixar: SIGLA=caminho (pode repetir).")
+    parser.add_argument('--saida', default=CAMINHO_INDICE_PADRAO, help="Arquivo de saída (padrão: dados/legislacao.json.zst).")
+    args = parser.parse_args()
+
+    arquivos_locais = dict(item.split('=', 1) for item in args.arquivo)
+    snapshot: Dict[str, Any] = {'gerado_em': datetime.now().isoformat(), 'codigos': {}}
+    for sigla in args.codigos:
+        try:
+            html = obter_html(sigla, arquivos_locais)
+        except Exception as e:
+            print(f"❌ Falha ao obter {sigla}: {e}")
+            continue
+        texto = extrair_texto_html(html, remover_tags=TAGS_REMOVIDAS_PADRAO + ('strike', 's', 'del'), separador='\n')['texto']
+        artigos = separar_artigos(texto)
+        snapshot['codigos'][sigla] = {**CODIGOS[sigla], 'artigos': artigos}
+        print(f"✔ {sigla}: {len(artigos)} artigos")
+
+    if not snapshot['codigos']:
+        print("❌ Nenhum código processado; o snapshot não foi gravado.")
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+    dados = json.dumps(snapshot, ensure_ascii=False).encode('utf-8')
+    with open(args.saida, 'wb') as arquivo:
+        arquivo.write(zstandard.ZstdCompressor(level=19).compress(dados))
+    print(f"✅ Snapshot gravado em {args.saida} ({len(dados) / 1024 / 1024:.1f} MB -> {os.path.getsize(args.saida) / 1024 / 1024:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# construtor_prompts.py - Montagem do Contexto Comum das Seções (Aproveitamento do Cache de Prefixo da API)
+
+import json
+import asyncio
+import inspect
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+
+from orcamento_tokens import OrcamentoTokens
+from deduplicacao import remover_fontes_repetidas
+
+INSTRUCAO_SECAO = "Cada pedido a seguir solicita UMA parte deste documento. Use as regras e as informações acima e redija apenas a parte pedida."
+
+def montar_contexto(regras: List[str], dados: Dict[str, Any], pesquisas: Optional[Dict[str, str]] = None, instrucao_melhoria: str = "") -> str:
+    """
+    Monta o contexto das seções de um documento, enviado como primeira mensagem de cada chamada.
+    A API reaproveita o processamento de um prefixo idêntico já visto, então tudo o que é igual entre as seções
+    vem aqui e a tarefa de cada seção vai depois, num prompt curto (ver 'ContextosSecoes').
+    - A ordem vai do mais estável ao menos estável: regras, dados do caso, pesquisa ({rótulo: texto}) e, numa nova
+      tentativa, as instruções de melhoria. Assim o prefixo até a pesquisa também é reaproveitado entre tentativas.
+    - Os dados usam o mesmo json.dumps dos prompts anteriores, medido como componente "dados" pelo orçamento de tokens.
+    """
+    partes = [regra.strip() for regra in regras if regra and regra.strip()]
+    partes.append(f"DADOS DO CASO: {json.dumps(dados, ensure_ascii=False)}")
+    for rotulo, texto in (pesquisas or {}).items():
+        partes.append(f"PESQUISA - {rotulo}:\n{texto}")
+    if instrucao_melhoria and instrucao_melhoria.strip():
+        partes.append(instrucao_melhoria.strip())
+    partes.append(INSTRUCAO_SECAO)
+    return "\n\n".join(partes)
+
+async def resolver_pesquisa(pesquisas: Dict[str, Any], chave: str, padrao: str = "N/A") -> str:
+    """
+    Texto de uma chave da pesquisa ('<categoria>_formatada'). Com a pesquisa ainda em andamento, o valor é a tarefa
+    da categoria (ver orquestrador), esperada aqui e cujo resultado é o dicionário parcial da categoria.
+    """
+    valor = pesquisas.get(chave, padrao)
+    if inspect.isawaitable(valor):
+        valor = await valor
+    if isinstance(valor, dict):
+        valor = valor.get(chave)
+    return valor or padrao
+
+class ContextosSecoes:
+    """
+    Contexto de cada seção (ver 'montar_contexto'): regras, dados do caso, apenas a pesquisa de que a seção depende
+    e as instruções de melhoria.
+    - Seções com as mesmas dependências recebem exatamente o mesmo contexto, e regras e dados são o prefixo comum
+      a todas, aproveitado pelo cache de prefixo da API.
+    - Com a pesquisa em andamento, cada seção espera só as suas categorias: as seções sem pesquisa começam na hora.
+    - Numa seção que junta várias categorias, as fontes repetidas entre elas entram uma única vez.
+    - O orçamento de tokens é aplicado a cada contexto montado; as contagens por seção ficam em 'tokens_prompt'.
+    """
+    def __init__(self, prompts: Dict[str, str], dependencias: Dict[str, List[str]], regras: List[str], dados: Dict[str, Any], pesquisas: Dict[str, Any], rotulos: Dict[str, str], instrucao_melhoria: str, orcamento_tokens: OrcamentoTokens, componentes: Dict[str, str], padrao_pesquisa: str = "N/A"):
+        self.prompts = prompts
+        self.dependencias = {nome: tuple(chaves) for nome, chaves in dependencias.items()}
+        self.regras = regras
+        self.dados = dados
+        self.pesquisas = pesquisas or {}
+        self.rotulos = rotulos
+        self.instrucao_melhoria = instrucao_melhoria
+        self.orcamento_tokens = orcamento_tokens
+        self.componentes = componentes
+        self.padrao_pesquisa = padrao_pesquisa
+        self.tokens_prompt: Dict[str, Dict[str, int]] = {}
+        self._contextos: Dict[Tuple[str, ...], "asyncio.Future"] = {}
+
+    async def _montar_async(self, chaves: Tuple[str, ...]) -> str:
+        textos = {chave: await resolver_pesquisa(self.pesquisas, chave, self.padrao_pesquisa) for chave in chaves}
+        if len(chaves) > 1:
+            # Só aqui as categorias se juntam: as cópias são removidas na ordem das dependências da seção.
+            textos = {chave: texto or self.padrao_pesquisa for chave, texto in zip(chaves, remover_fontes_repetidas([textos[chave] for chave in chaves]))}
+        tarefas = {nome: prompt for nome, prompt in self.prompts.items() if self.dependencias.get(nome, ()) == chaves}
+        contexto, contagens = self.orcamento_tokens.ajustar_contexto(
+            lambda pesquisas: montar_contexto(self.regras, self.dados, {self.rotulos[chave]: pesquisas[chave] for chave in chaves}, self.instrucao_melhoria),
+            textos, tarefas, self.componentes
+        )
+        self.tokens_prompt.update(contagens)
+        return contexto
+
+    async def contexto_async(self, secao_nome: str) -> str:
+        """Contexto da seção, montado uma única vez para cada conjunto de dependências."""
+        chaves = self.dependencias.get(secao_nome, ())
+        if chaves not in self._contextos:
+            self._contextos[chaves] = asyncio.ensure_future(self._montar_async(chaves))
+        return await self._contextos[chaves]
+
+    def chamar_api(self, chamar_api: Callable[..., Awaitable[str]], **argumentos_fixos) -> Callable[..., Awaitable[str]]:
+        """
+        Envolve o '_chamar_api_async' do redator para 'gerar_secoes_async': cada chamada recebe o contexto da sua seção
+        e os 'argumentos_fixos' (ex: 'ler_cache=False' numa nova tentativa).
+        """
+        async def _chamar_com_contexto(prompt: str, secao_nome: str, **kwargs) -> str:
+            return await chamar_api(prompt, secao_nome, contexto=await self.contexto_async(secao_nome), **argumentos_fixos, **kwargs)
+        return _chamar_com_contexto
@@ -0,0 +1,75 @@
+# deduplicacao.py - Remoção de Conteúdos Quase Duplicados (MinHash) entre as Fontes Pesquisadas
+
+import re
+import zlib
+from typing import Dict, Any, List
+
+from busca_textual import tokenizar
+from orcamento_tokens import dividir_fontes
+
+TAMANHO_SHINGLE = 5          # Palavras por trecho comparado.
+TAMANHO_ASSINATURA = 128     # Menores hashes guardados por documento (MinHash "bottom-k").
+MAX_TOKENS_ASSINATURA = 5000 # Espelhos e republicações já coincidem no início; o resto do texto não muda o resultado.
+LIMIAR_SIMILARIDADE = 0.7    # Similaridade de Jaccard estimada a partir da qual dois textos são considerados o mesmo conteúdo.
+_RE_URL_FONTE = re.compile(r'^(?:### )?Fonte: (\S+)')
+
+def assinatura_minhash(texto: str) -> List[int]:
+    """
+    Assinatura MinHash (bottom-k) do texto: os menores hashes dos seus trechos de TAMANHO_SHINGLE palavras.
+    Um único hash por trecho (crc32), sem permutações, mantém o custo linear no tamanho do texto.
+    """
+    tokens = tokenizar(texto)[:MAX_TOKENS_ASSINATURA]
+    if len(tokens) < TAMANHO_SHINGLE:
+        tokens = tokens + [''] * (TAMANHO_SHINGLE - len(tokens))
+    hashes = {zlib.crc32(' '.join(tokens[inicio:inicio + TAMANHO_SHINGLE]).encode('utf-8')) for inicio in range(len(tokens) - TAMANHO_SHINGLE + 1)}
+    return sorted(hashes)[:TAMANHO_ASSINATURA]
+
+def similaridade(assinatura_a: List[int], assinatura_b: List[int]) -> float:
+    """Estimativa da similaridade de Jaccard entre os dois textos a partir das assinaturas."""
+    if not assinatura_a or not assinatura_b:
+        return 0.0
+    conjunto_a, conjunto_b = set(assinatura_a), set(assinatura_b)
+    uniao = sorted(conjunto_a | conjunto_b)[:TAMANHO_ASSINATURA]
+    return sum(1 for valor in uniao if valor in conjunto_a and valor in conjunto_b) / len(uniao)
+
+def indices_unicos(itens: List[Dict[str, Any]], limiar: float = LIMIAR_SIMILARIDADE) -> List[int]:
+    """
+    Posições dos itens mantidos: a primeira ocorrência de cada conteúdo (a ordem de entrada é a de prioridade).
+    As cópias (mesma URL ou texto com similaridade >= 'limiar' com algum item já mantido) são descartadas.
+    """
+    mantidos: List[int] = []
+    assinaturas: List[List[int]] = []
+    urls = set()
+    for posicao, item in enumerate(itens):
+        if item.get('url') in urls:
+            continue
+        assinatura = assinatura_minhash(item.get('texto', ''))
+        duplicado_de = next((anterior for anterior, outra in zip(mantidos, assinaturas) if similaridade(assinatura, outra) >= limiar), None)
+        if duplicado_de is not None:
+            print(f"♻️ Conteúdo quase duplicado descartado: {item.get('url')} (mesmo conteúdo de {itens[duplicado_de].get('url')})")
+            continue
+        mantidos.append(posicao)
+        assinaturas.append(assinatura)
+        urls.add(item.get('url'))
+    return mantidos
+
+def remover_quase_duplicados(itens: List[Dict[str, Any]], limiar: float = LIMIAR_SIMILARIDADE) -> List[Dict[str, Any]]:
+    """Os itens sem as cópias, na ordem original (ver 'indices_unicos')."""
+    return [itens[posicao] for posicao in indices_unicos(itens, limiar)]
+
+def remover_fontes_repetidas(pesquisas: List[str], limiar: float = LIMIAR_SIMILARIDADE) -> List[str]:
+    """
+    Pesquisas formatadas ('Fonte: URL' no início de cada fonte) que vão juntas para a mesma seção, sem as fontes
+    repetidas entre elas. A ordem da lista é a de prioridade: a cópia é removida das pesquisas seguintes.
+    Blocos que não são fontes (ex: o texto de uma pesquisa que falhou ou um resumo condensado) são mantidos.
+    """
+    blocos = [(indice, bloco) for indice, texto in enumerate(pesquisas) for bloco in dividir_fontes(texto)]
+    posicoes_fontes = [posicao for posicao, (_, bloco) in enumerate(blocos) if _RE_URL_FONTE.match(bloco)]
+    itens = [{'url': _RE_URL_FONTE.match(blocos[posicao][1]).group(1), 'texto': blocos[posicao][1]} for posicao in posicoes_fontes]
+    mantidas = {posicoes_fontes[indice] for indice in indices_unicos(itens, limiar)}
+    fontes = set(posicoes_fontes)
+    partes: List[List[str]] = [[] for _ in pesquisas]
+    for posicao, (indice, bloco) in enumerate(blocos):
+        if posicao in mantidas or posicao not in fontes:
+            partes[indice].append(bloco)
+    return ["\n\n".join(blocos_pesquisa) for blocos_pesquisa in partes]
@@ -0,0 +1,153 @@
+# extracao_html.py - Extração de Texto de Páginas HTML Fora do Event Loop (Pool de Processos)
+
+import os
+import re
+import asyncio
+import threading
+import importlib.util
+import multiprocessing
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Sequence
+
+TAGS_REMOVIDAS_PADRAO = ('script', 'style', 'nav', 'footer', 'header', 'aside')
+BACKENDS = ('html.parser', 'lxml', 'tokenizador')
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+def backend_padrao() -> str:
+    """Backend usado quando nenhum é informado: JURIDOC_BACKEND_HTML, ou lxml se instalado, ou o tokenizador."""
+    backend = os.getenv('JURIDOC_BACKEND_HTML')
+    if backend in BACKENDS:
+        return backend
+    return 'lxml' if importlib.util.find_spec('lxml') is not None else 'tokenizador'
+
+def _normalizar(texto: str, separador: str) -> str:
+    """Mesma limpeza de espaços que os agentes já faziam: tudo numa linha (' ') ou sem linhas em branco ('\\n')."""
+    if separador == '\n':
+        return re.sub(r'\n\s*\n', '\n', texto).strip()
+    return re.sub(r'\s+', ' ', texto).strip()
+
+def _extrair_com_beautifulsoup(html: str, remover_tags: Sequence[str], separador: str, parser: str) -> Dict[str, Any]:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, parser)
+    for tag in soup.find_all(list(remover_tags)):
+        tag.decompose()
+    texto = soup.body.get_text(separator=separador, strip=True) if soup.body else ""
+    titulo = soup.title.string.strip() if soup.title and soup.title.string else "N/A"
+    return {"texto": _normalizar(texto, separador), "titulo": titulo}
+
+def _extrair_com_lxml(html: str, remover_tags: Sequence[str], separador: str) -> Dict[str, Any]:
+    import lxml.html
+    try:
+        documento = lxml.html.document_fromstring(html)
+    except ValueError:
+        # Strings com declaração de encoding XML não são aceitas pelo lxml; o tokenizador resolve esses casos.
+        return _extrair_com_tokenizador(html, remover_tags, separador)
+    for elemento in documento.xpath('|'.join(f'//{tag}' for tag in remover_tags)):
+        elemento.drop_tree()
+    corpo = documento.find('body')
+    partes = (parte.strip() for parte in corpo.itertext()) if corpo is not None else ()
+    titulo = (documento.findtext('.//title') or "").strip() or "N/A"
+    return {"texto": _normalizar(separador.join(parte for parte in partes if parte), separador), "titulo": titulo}
+
+class _TokenizadorTexto(HTMLParser):
+    """Percorre o HTML como uma sequência de tokens, sem montar árvore, guardando apenas o texto visível."""
+    def __init__(self, remover_tags: Sequence[str]):
+        super().__init__(convert_charrefs=True)
+        self.remover_tags = set(remover_tags)
+        self.profundidade_removida = 0
+        self.no_titulo = False
+        self.viu_body = False
+        self.partes_antes_body = []
+        self.partes = []
+        self.titulo = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.remover_tags:
+            self.profundidade_removida += 1
+        elif tag == 'title':
+            self.no_titulo = True
+        elif tag == 'body' and not self.viu_body:
+            self.viu_body = True
+
+    def handle_endtag(self, tag):
+        if tag in self.remover_tags and self.profundidade_removida:
+            self.profundidade_removida -= 1
+        elif tag == 'title':
+            self.no_titulo = False
+
+    def handle_data(self, data):
+        if self.no_titulo:
+            self.titulo.append(data)
+            return
+        if self.profundidade_removida: return
+        parte = data.strip()
+        if parte:
+            (self.partes if self.viu_body else self.partes_antes_body).append(parte)
+
+def _extrair_com_tokenizador(html: str, remover_tags: Sequence[str], separador: str) -> Dict[str, Any]:
+    tokenizador = _TokenizadorTexto(remover_tags)
+    tokenizador.feed(html)
+    tokenizador.close()
+    # Páginas sem <body> explícito: usa todo o texto visível.
+    partes = tokenizador.partes if tokenizador.viu_body else tokenizador.partes_antes_body
+    titulo = "".join(tokenizador.titulo).strip() or "N/A"
+    return {"texto": _normalizar(separador.join(partes), separador), "titulo": titulo}
+
+def extrair_texto_html(html: str, remover_tags: Sequence[str] = TAGS_REMOVIDAS_PADRAO, separador: str = ' ', backend: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Função única de extração usada pelos três agentes de pesquisa: remove scripts e elementos de navegação
+    e retorna {'texto', 'titulo'} da página. Os backends produzem o mesmo formato de saída:
+    - 'html.parser': BeautifulSoup com o parser da biblioteca padrão (comportamento original);
+    - 'lxml': árvore do lxml (em C), bem mais rápida em páginas grandes;
+    - 'tokenizador': leitura em streaming dos tokens, sem montar árvore nem depender de pacotes externos.
+    """
+    backend = backend or backend_padrao()
+    if backend == 'lxml':
+        return _extrair_com_lxml(html, remover_tags, separador)
+    if backend == 'tokenizador':
+        return _extrair_com_tokenizador(html, remover_tags, separador)
+    return _extrair_com_beautifulsoup(html, remover_tags, separador, 'html.parser')
+
+def iniciar_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Cria o pool de processos de extração (JURIDOC_PROCESSOS_EXTRACAO; 0 desliga e extrai numa thread).
+    Deve ser chamado cedo, na inicialização, enquanto o processo ainda tem uma única thread: com o método
+    'fork', todos os processos do pool são criados de uma vez no primeiro envio de tarefa, feito aqui.
+    """
+    global _pool
+    with _lock:
+        if _pool is not None:
+            return _pool
+        processos = int(os.getenv('JURIDOC_PROCESSOS_EXTRACAO', str(min(4, os.cpu_count() or 1))))
+        if processos <= 0:
+            return None
+        metodo = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        _pool = ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context(metodo))
+        _pool.submit(len, "").result()
+        print(f"🧩 Pool de extração HTML iniciado ({processos} processos, backend: {backend_padrao()}).")
+        return _pool
+
+def _descartar_pool(pool: ProcessPoolExecutor):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+async def extrair_texto_html_async(html: str, remover_tags: Sequence[str] = TAGS_REMOVIDAS_PADRAO, separador: str = ' ', backend: Optional[str] = None) -> Dict[str, Any]:
+    """Executa 'extrair_texto_html' no pool de processos, sem bloquear o event loop enquanto a página é processada."""
+    loop = asyncio.get_running_loop()
+    pool = _pool if _pool is not None else iniciar_pool()
+    try:
+        return await loop.run_in_executor(pool, extrair_texto_html, html, tuple(remover_tags), separador, backend)
+    except BrokenProcessPool:
+        # COMENTÁRIO: Um processo do pool morreu (ex: falta de memória numa página enorme). O pool é recriado
+        # na próxima extração; esta página é processada numa thread para não se perder.
+        print("⚠️ Pool de extração HTML interrompido; recriando.")
+        if pool is not None:
+            _descartar_pool(pool)
+        return await loop.run_in_executor(None, extrair_texto_html, html, tuple(remover_tags), separador, backend)
@@ -0,0 +1,131 @@
+# gerenciador_jobs.py - Execução Assíncrona de Solicitações com Pool de Workers Limitado
+
+import os
+import uuid
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional
+
+class FilaCheiaError(RuntimeError):
+    """A fila de jobs atingiu o limite de jobs aguardando execução ('max_jobs_na_fila')."""
+
+class GerenciadorJobs:
+    """
+    Gerencia a execução de solicitações longas (geração de documentos) fora do ciclo HTTP.
+    - Cada solicitação vira um "job" com ID próprio, executado num pool de threads de tamanho limitado.
+    - O estado do job (status, progresso por etapa e resultado final) pode ser consultado a qualquer momento.
+    - A fila é limitada: com 'max_jobs_na_fila' jobs aguardando um worker, novos jobs são recusados (FilaCheiaError)
+      em vez de se acumularem sem fim.
+    - Jobs finalizados são descartados após um tempo de retenção para não acumular memória; a limpeza ocorre ao
+      submeter e ao consultar jobs, no máximo uma vez a cada 'intervalo_limpeza_segundos'.
+    """
+    def __init__(self, max_workers: Optional[int] = None, retencao_segundos: Optional[int] = None):
+        print("🧵 Inicializando Gerenciador de Jobs...")
+        self.config = {
+            'max_workers': max_workers or int(os.getenv('JURIDOC_MAX_JOBS_SIMULTANEOS', '4')),
+            'retencao_segundos': retencao_segundos or int(os.getenv('JURIDOC_RETENCAO_JOBS_SEGUNDOS', '3600')),
+            'max_jobs_na_fila': int(os.getenv('JURIDOC_MAX_JOBS_NA_FILA', '32')),
+            'intervalo_limpeza_segundos': 60,
+        }
+        self._executor = ThreadPoolExecutor(max_workers=self.config['max_workers'], thread_name_prefix="juridoc-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._ultima_limpeza = datetime.now()
+        print(f"✅ Gerenciador de Jobs pronto ({self.config['max_workers']} workers).")
+
+    def submeter(self, funcao: Callable[..., Dict[str, Any]], dados_entrada: Dict[str, Any], ouvinte: Optional[Callable[[str, Dict[str, Any]], None]] = None, **kwargs_funcao) -> str:
+        """
+        Registra um novo job e agenda sua execução no pool.
+        A função recebe os dados de entrada, um callback de progresso (etapa, detalhes) e os 'kwargs_funcao' extras.
+        O 'ouvinte' opcional recebe cada evento de progresso e, ao final, o evento 'fim' com o resultado.
+        Levanta FilaCheiaError se já houver 'max_jobs_na_fila' jobs aguardando execução.
+        """
+        self._limpar_jobs_expirados()
+        job_id = uuid.uuid4().hex
+        agora = datetime.now().isoformat()
+        with self._lock:
+            na_fila = sum(1 for job in self._jobs.values() if job["status"] == "na_fila")
+            if na_fila >= self.config['max_jobs_na_fila']:
+                print(f"🚫 Job recusado: {na_fila} jobs já aguardam na fila.")
+                raise FilaCheiaError(f"Fila de processamento cheia ({na_fila} solicitações aguardando). Tente novamente em alguns minutos.")
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "na_fila",
+                "etapa_atual": None,
+                "progresso": [],
+                "criado_em": agora,
+                "iniciado_em": None,
+                "finalizado_em": None,
+                "resultado": None,
+            }
+        self._executor.submit(self._executar, job_id, funcao, dados_entrada, ouvinte, kwargs_funcao)
+        print(f"📥 Job {job_id} adicionado à fila.")
+        return job_id
+
+    def _executar(self, job_id: str, funcao: Callable[..., Dict[str, Any]], dados_entrada: Dict[str, Any], ouvinte: Optional[Callable] = None, kwargs_funcao: Optional[Dict[str, Any]] = None):
+        """Executa o job numa thread do pool e guarda o resultado final."""
+        self._atualizar(job_id, status="em_execucao", iniciado_em=datetime.now().isoformat())
+
+        def callback_progresso(etapa: str, detalhes: Optional[Dict[str, Any]] = None):
+            self.registrar_progresso(job_id, etapa, detalhes)
+            if ouvinte: ouvinte("etapa", {"etapa": etapa, **(detalhes or {})})
+
+        try:
+            resultado = funcao(dados_entrada, callback_progresso=callback_progresso, **(kwargs_funcao or {}))
+            status = "erro" if resultado.get("status") == "erro" else "concluido"
+        except Exception as e:
+            traceback.print_exc()
+            resultado = {"status": "erro", "erro": str(e)}
+            status = "erro"
+
+        self._atualizar(job_id, status=status, resultado=resultado, finalizado_em=datetime.now().isoformat())
+        print(f"🏁 Job {job_id} finalizado com status: {status}")
+        if ouvinte:
+            try:
+                ouvinte("fim", {"job_id": job_id, "status": status, **resultado})
+            except Exception as e:
+                print(f"⚠️ Falha ao notificar o fim do job {job_id}: {e}")
+
+    def registrar_progresso(self, job_id: str, etapa: str, detalhes: Optional[Dict[str, Any]] = None):
+        """Anexa um evento de progresso ao job (ex: 'pesquisa', 'redacao', 'validacao')."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job: return
+            job["etapa_atual"] = etapa
+            job["progresso"].append({"etapa": etapa, "detalhes": detalhes or {}, "timestamp": datetime.now().isoformat()})
+
+    def _atualizar(self, job_id: str, **campos):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(campos)
+
+    def consultar(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna uma cópia do estado atual do job, ou None se ele não existir (ou já tiver expirado)."""
+        self._limpar_jobs_expirados()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job: return None
+            return {**job, "progresso": list(job["progresso"])}
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Resumo da ocupação do pool, útil para monitoramento."""
+        with self._lock:
+            contagem = {}
+            for job in self._jobs.values():
+                contagem[job["status"]] = contagem.get(job["status"], 0) + 1
+        return {"max_workers": self.config['max_workers'], "max_jobs_na_fila": self.config['max_jobs_na_fila'], "jobs_por_status": contagem}
+
+    def _limpar_jobs_expirados(self):
+        """Remove jobs finalizados há mais tempo que o período de retenção (no máximo uma vez por intervalo de limpeza)."""
+        agora = datetime.now()
+        with self._lock:
+            if (agora - self._ultima_limpeza).total_seconds() < self.config['intervalo_limpeza_segundos']: return
+            self._ultima_limpeza = agora
+            expirados = [
+                job_id for job_id, job in self._jobs.items()
+                if job["finalizado_em"] and (agora - datetime.fromisoformat(job["finalizado_em"])).total_seconds() > self.config['retencao_segundos']
+            ]
+            for job_id in expirados:
+                del self._jobs[job_id]
@@ -0,0 +1,142 @@
+# indice_jurisprudencia.py - Índice Local (SQLite FTS5) da Jurisprudência Já Pesquisada
+
+import os
+import re
+import time
+import sqlite3
+import threading
+from urllib.parse import urlparse
+from typing import Dict, Any, List, Optional
+
+from cache_persistente import diretorio_cache
+from busca_textual import tokenizar
+
+# COMENTÁRIO: Tribunais reconhecidos pelo domínio da fonte; para os demais (ex: jusbrasil), a sigla é procurada no texto.
+TRIBUNAIS_POR_DOMINIO = {'stf.jus.br': 'STF', 'stj.jus.br': 'STJ', 'tst.jus.br': 'TST'}
+_RE_TRIBUNAL = re.compile(r'\b(STF|STJ|TST|TSE|STM|TJ[A-Z]{2}|TRT-?\d{1,2}|TRF-?\d)\b')
+
+def identificar_tribunal(url: str, texto: str) -> str:
+    """Sigla do tribunal da decisão (ex: 'STJ', 'TJSP', 'TRT2'), ou '' quando não é possível identificar."""
+    dominio = urlparse(url).netloc.lower()
+    for sufixo, tribunal in TRIBUNAIS_POR_DOMINIO.items():
+        if dominio.endswith(sufixo):
+            return tribunal
+    encontrado = _RE_TRIBUNAL.search(texto[:3000])
+    return encontrado.group(1).replace('-', '') if encontrado else ''
+
+class IndiceJurisprudencia:
+    """
+    Índice de texto completo (SQLite FTS5, ranqueamento BM25) das jurisprudências aprovadas nas pesquisas anteriores.
+    - Cada resultado aceito pelo filtro de relevância é gravado (url, título, tribunal e texto).
+    - Novas pesquisas consultam o índice primeiro; a raspagem na web só completa o que faltar,
+      e resultados mais antigos que 'idade_maxima_segundos' não são servidos (a raspagem os atualiza).
+    Fica no diretório dos caches e sobrevive a reinícios. Pode ser desligado com JURIDOC_INDICE_JURISPRUDENCIA=0.
+    """
+    def __init__(self, caminho: Optional[str] = None):
+        self.config = {
+            'idade_maxima_segundos': int(os.getenv('JURIDOC_INDICE_JURISPRUDENCIA_IDADE_MAXIMA_DIAS', '180')) * 24 * 3600,
+            'peso_titulo': 5.0, # Termos no título (ementa, número do processo) valem mais que no corpo.
+        }
+        self.contadores = {'consultas': 0, 'resultados_locais': 0, 'indexados': 0}
+        self._lock = threading.Lock()
+        self._conexao = None
+        if os.getenv('JURIDOC_INDICE_JURISPRUDENCIA', '1') == '0':
+            return
+        self.caminho = caminho or os.path.join(diretorio_cache(), "jurisprudencia.sqlite3")
+        try:
+            self._conexao = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute("PRAGMA synchronous=NORMAL")
+            self._criar_tabelas()
+        except sqlite3.Error as e:
+            # COMENTÁRIO: SQLite compilado sem FTS5 (ou arquivo inacessível): a pesquisa segue apenas na web.
+            print(f"⚠️ Índice local de jurisprudência indisponível: {e}")
+            self._conexao = None
+
+    def _criar_tabelas(self):
+        self._conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS decisoes (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                titulo TEXT NOT NULL,
+                tribunal TEXT NOT NULL,
+                texto TEXT NOT NULL,
+                termo TEXT NOT NULL,
+                indexado_em REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS decisoes_fts USING fts5(
+                titulo, texto, content='decisoes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS decisoes_ai AFTER INSERT ON decisoes BEGIN
+                INSERT INTO decisoes_fts (rowid, titulo, texto) VALUES (new.id, new.titulo, new.texto);
+            END;
+            CREATE TRIGGER IF NOT EXISTS decisoes_ad AFTER DELETE ON decisoes BEGIN
+                INSERT INTO decisoes_fts (decisoes_fts, rowid, titulo, texto) VALUES ('delete', old.id, old.titulo, old.texto);
+            END;
+        """)
+
+    @property
+    def habilitado(self) -> bool:
+        return self._conexao is not None
+
+    def adicionar(self, resultados: List[Dict[str, Any]], termo: str):
+        """Grava (ou atualiza) os resultados aprovados de uma pesquisa."""
+        if not self.habilitado or not resultados: return
+        agora = time.time()
+        with self._lock:
+            self._conexao.execute("BEGIN")
+            try:
+                for item in resultados:
+                    tribunal = item.get('tribunal') or identificar_tribunal(item['url'], item['texto'])
+                    # COMENTÁRIO: DELETE + INSERT (e não REPLACE) para que os triggers mantenham o FTS em sincronia.
+                    self._conexao.execute("DELETE FROM decisoes WHERE url = ?", (item['url'],))
+                    self._conexao.execute(
+                        "INSERT INTO decisoes (url, titulo, tribunal, texto, termo, indexado_em) VALUES (?, ?, ?, ?, ?, ?)",
+                        (item['url'], item.get('titulo') or '', tribunal, item['texto'], termo, agora)
+                    )
+                self._conexao.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._conexao.execute("ROLLBACK")
+                print(f"⚠️ Falha ao indexar jurisprudência: {e}")
+                return
+        self.contadores['indexados'] += len(resultados)
+
+    @staticmethod
+    def _consulta_fts(termo: str) -> str:
+        """
+        Converte o termo em consulta FTS5: todos os termos significativos são exigidos, cada um como prefixo
+        (para que 'hora' encontre 'horas'); aspas evitam que palavras como 'NOT' virem operadores.
+        """
+        return ' '.join(f'"{token}"*' for token in dict.fromkeys(tokenizar(termo)))
+
+    def pesquisar(self, termo: str, limite: int = 10) -> List[Dict[str, Any]]:
+        """Jurisprudências indexadas para o termo, da mais para a menos relevante, no formato da pesquisa na web."""
+        if not self.habilitado: return []
+        consulta = self._consulta_fts(termo)
+        if not consulta: return []
+        self.contadores['consultas'] += 1
+        limite_idade = time.time() - self.config['idade_maxima_segundos']
+        try:
+            with self._lock:
+                linhas = self._conexao.execute("""
+                    SELECT d.url, d.titulo, d.tribunal, d.texto
+                    FROM decisoes_fts JOIN decisoes d ON d.id = decisoes_fts.rowid
+                    WHERE decisoes_fts MATCH ? AND d.indexado_em >= ?
+                    ORDER BY bm25(decisoes_fts, ?, 1.0)
+                    LIMIT ?
+                """, (consulta, limite_idade, self.config['peso_titulo'], limite)).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ Falha na consulta ao índice de jurisprudência: {e}")
+            return []
+        self.contadores['resultados_locais'] += len(linhas)
+        return [
+            {"url": url, "titulo": titulo, "tribunal": tribunal, "texto": texto, "fonte": "indice_local"}
+            for url, titulo, tribunal, texto in linhas
+        ]
+
+    def estatisticas(self) -> Dict[str, Any]:
+        if not self.habilitado:
+            return {"habilitado": False, **self.contadores}
+        with self._lock:
+            total, tribunais = self._conexao.execute("SELECT COUNT(*), COUNT(DISTINCT tribunal) FROM decisoes").fetchone()
+        return {"habilitado": True, "decisoes": total, "tribunais": tribunais, **self.contadores}
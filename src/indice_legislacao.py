@@ -0,0 +1,134 @@
+# indice_legislacao.py - Índice Local (Offline) dos Principais Códigos Federais
+
+import os
+import re
+import json
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from busca_textual import IndiceBM25, normalizar_texto
+
+CAMINHO_INDICE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados', 'legislacao.json.zst')
+
+# COMENTÁRIO: Nomes pelos quais cada código aparece nos fundamentos (já sem acentos e em minúsculas).
+APELIDOS_CODIGOS = {
+    'CLT': ['clt', 'consolidacao das leis do trabalho'],
+    'CC': ['cc', 'cc/2002', 'codigo civil'],
+    'CPC': ['cpc', 'cpc/2015', 'codigo de processo civil'],
+    'CP': ['cp', 'codigo penal'],
+    'CPP': ['cpp', 'codigo de processo penal'],
+    'CF': ['cf', 'cf/88', 'crfb', 'constituicao federal', 'constituicao da republica', 'constituicao'],
+}
+_RE_ARTIGO = re.compile(r'\bart(?:igo)?s?\.?\s*(\d{1,4}(?:\.\d{3})*)\s*(?:o|º|°)?(?:\s*-\s*([a-z])\b)?')
+
+def normalizar_numero_artigo(numero: str, letra: Optional[str] = None) -> str:
+    """'1.228' -> '1228'; ('7', 'A') -> '7-a'."""
+    numero = numero.replace('.', '').lstrip('0') or '0'
+    return f"{numero}-{letra.lower()}" if letra else numero
+
+class IndiceLegislacao:
+    """
+    Consulta local da legislação federal mais usada (CLT, CC, CPC, CP, CPP e CF), a partir de um snapshot
+    compactado com zstd (gerado por 'construir_indice_legislacao.py').
+    - Índice por artigo: "art. 312 CPP" ou "artigo 59 da CLT" é respondido com um acesso a dicionário.
+    - Índice textual (BM25): fundamentos como "horas extras" retornam os artigos mais relevantes.
+    Tudo fica em memória e funciona sem rede. Sem o snapshot, o índice fica vazio e a pesquisa usa a web.
+    """
+    def __init__(self, caminho: Optional[str] = None):
+        self.caminho = caminho or os.getenv('JURIDOC_INDICE_LEGISLACAO', CAMINHO_INDICE_PADRAO)
+        self.config = {
+            'max_resultados': 4,
+            'cobertura_minima': 0.6, # Fração dos termos do fundamento que o artigo precisa conter.
+        }
+        self.artigos: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.urls_codigos: Dict[str, str] = {}
+        self.indice_textual = IndiceBM25()
+        self.contadores = {'consultas': 0, 'por_artigo': 0, 'por_texto': 0, 'sem_resultado': 0}
+        self._carregar()
+
+    def _carregar(self):
+        if not os.path.exists(self.caminho):
+            print(f"⚠️ Índice local de legislação não encontrado ({self.caminho}); a legislação será pesquisada na web.")
+            return
+        try:
+            import zstandard
+            inicio = time.perf_counter()
+            with open(self.caminho, 'rb') as arquivo:
+                snapshot = json.loads(zstandard.ZstdDecompressor().decompress(arquivo.read(), max_output_size=512 * 1024 * 1024))
+            for sigla, codigo in snapshot.get('codigos', {}).items():
+                self.urls_codigos[sigla] = codigo.get('url', '')
+                for artigo in codigo.get('artigos', []):
+                    chave = (sigla, artigo['numero'])
+                    self.artigos[chave] = {**artigo, 'codigo': sigla, 'nome_codigo': codigo.get('nome', sigla)}
+                    self.indice_textual.adicionar(chave, artigo['texto'])
+            print(f"📚 Índice local de legislação carregado: {len(self.artigos)} artigos de {list(self.urls_codigos)} em {time.perf_counter() - inicio:.2f}s.")
+        except Exception as e:
+            print(f"⚠️ Falha ao carregar o índice local de legislação: {e}")
+            self.artigos.clear()
+            self.indice_textual = IndiceBM25()
+
+    @property
+    def disponivel(self) -> bool:
+        return bool(self.artigos)
+
+    def _identificar_codigos(self, consulta_normalizada: str) -> List[str]:
+        """Códigos citados no texto, pelos apelidos (o mais longo primeiro, para 'cpp' não virar 'cp')."""
+        encontrados = []
+        apelidos = sorted(((apelido, sigla) for sigla, lista in APELIDOS_CODIGOS.items() for apelido in lista), key=lambda item: -len(item[0]))
+        restante = consulta_normalizada
+        for apelido, sigla in apelidos:
+            padrao = r'(?<![a-z0-9/])' + re.escape(apelido) + r'(?![a-z0-9/])'
+            if re.search(padrao, restante):
+                if sigla not in encontrados: encontrados.append(sigla)
+                restante = re.sub(padrao, ' ', restante)
+        return encontrados
+
+    def buscar_artigos_citados(self, consulta: str) -> List[Dict[str, Any]]:
+        """Artigos citados explicitamente (ex: 'art. 312 do CPP', 'arts. 186 e 927 do Código Civil')."""
+        consulta_normalizada = normalizar_texto(consulta)
+        codigos = self._identificar_codigos(consulta_normalizada)
+        if not codigos: return []
+        numeros = [normalizar_numero_artigo(numero, letra) for numero, letra in _RE_ARTIGO.findall(consulta_normalizada)]
+        # 'arts. 186 e 927': os números seguintes ao primeiro também são considerados.
+        for trecho in re.findall(r'\barts?\.?\s*[\d\.\s,e]+', consulta_normalizada):
+            numeros += [normalizar_numero_artigo(numero) for numero in re.findall(r'\d{1,4}(?:\.\d{3})*', trecho)]
+        resultados = []
+        for numero in dict.fromkeys(numeros):
+            for sigla in codigos:
+                artigo = self.artigos.get((sigla, numero))
+                if artigo: resultados.append(artigo)
+        return resultados
+
+    def pesquisar(self, consulta: str, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Retorna os artigos para o fundamento no mesmo formato da pesquisa na web ({'url', 'titulo', 'texto'}).
+        Primeiro os artigos citados explicitamente; depois, os mais relevantes pela busca textual.
+        Lista vazia quando o índice não tem nada a dizer sobre o fundamento.
+        """
+        if not self.disponivel: return []
+        limite = limite or self.config['max_resultados']
+        self.contadores['consultas'] += 1
+
+        artigos = self.buscar_artigos_citados(consulta)
+        if artigos:
+            self.contadores['por_artigo'] += 1
+        else:
+            codigos = self._identificar_codigos(normalizar_texto(consulta))
+            encontrados = self.indice_textual.buscar(consulta, limite=limite * 5, cobertura_minima=self.config['cobertura_minima'])
+            # Se o fundamento menciona um código, os artigos desse código vêm primeiro.
+            chaves = [chave for chave, _ in encontrados if not codigos or chave[0] in codigos] or [chave for chave, _ in encontrados]
+            artigos = [self.artigos[chave] for chave in chaves]
+            if artigos: self.contadores['por_texto'] += 1
+        if not artigos:
+            self.contadores['sem_resultado'] += 1
+            return []
+
+        return [{
+            "url": f"{self.urls_codigos.get(artigo['codigo'], '')}#art{artigo['numero']}",
+            "titulo": f"{artigo['nome_codigo']} - Art. {artigo['numero']}",
+            "texto": artigo['texto'],
+            "fonte": "indice_local",
+        } for artigo in artigos[:limite]]
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {"disponivel": self.disponivel, "artigos": len(self.artigos), "codigos": list(self.urls_codigos), **self.contadores}
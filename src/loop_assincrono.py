@@ -0,0 +1,39 @@
+# loop_assincrono.py - Event Loop Persistente Compartilhado por Todo o Pipeline
+
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+def obter_loop() -> asyncio.AbstractEventLoop:
+    """
+    Retorna o event loop do processo, criando-o (numa thread dedicada) na primeira chamada.
+    Todas as etapas assíncronas (pesquisa, redação, validação de relevância) rodam neste mesmo loop,
+    de modo que sessões HTTP e clientes da API podem ser reaproveitados entre etapas e solicitações.
+    """
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="juridoc-event-loop", daemon=True)
+            _thread.start()
+            print("🔁 Event loop persistente do JuriDoc iniciado.")
+        return _loop
+
+def executar_no_loop(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """
+    Ponte síncrona: agenda a corrotina no loop persistente e bloqueia a thread chamadora até o resultado.
+    Substitui o 'asyncio.run', que criava e destruía um loop novo a cada etapa.
+    """
+    loop = obter_loop()
+    try:
+        loop_atual = asyncio.get_running_loop()
+    except RuntimeError:
+        loop_atual = None
+    if loop_atual is loop:
+        coro.close()
+        raise RuntimeError("executar_no_loop não pode ser chamado de dentro do loop persistente; use 'await' diretamente.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
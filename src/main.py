@@ -2,13 +2,15 @@
 
 import os
 import json
+import queue
 import traceback
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 
 # Importar o orquestrador completo
 from orquestrador import OrquestradorPrincipal
+from gerenciador_jobs import GerenciadorJobs, FilaCheiaError
 
 app = Flask(__name__)
 CORS(app)
@@ -20,6 +22,10 @@ os.environ.setdefault('OPENAI_API_KEY', os.getenv('OPENAI_API_KEY', ''))
 print("🚀 Inicializando sistema completo com todos os agentes...")
 orquestrador = OrquestradorPrincipal()
 
+# COMENTÁRIO: Pool limitado de workers para o modo assíncrono. Com ele, a geração de documentos
+# não prende mais um worker do gunicorn durante minutos; o cliente recebe um job_id e consulta o andamento.
+gerenciador_jobs = GerenciadorJobs()
+
 @app.route('/', methods=['GET'])
 def home():
     """Endpoint de status do sistema."""
@@ -67,7 +73,11 @@ def gerar_peticao():
     """
     Endpoint principal para geração de petições.
     Usa o orquestrador completo com todos os agentes.
+    Com '?modo=assincrono', apenas enfileira a solicitação e retorna um job_id (HTTP 202),
+    cujo andamento é consultado em GET /api/jobs/<job_id>.
     """
+    if request.args.get('modo') == 'assincrono':
+        return submeter_job_peticao()
     try:
         inicio_tempo = datetime.now()
         print(f"\n{'='*80}")
@@ -138,6 +148,111 @@ def gerar_peticao():
             "timestamp": datetime.now().isoformat()
         }), 500
 
+def submeter_job_peticao():
+    """Enfileira a geração do documento no Gerenciador de Jobs e responde imediatamente."""
+    dados_entrada = request.get_json(silent=True)
+    if not dados_entrada:
+        return jsonify({
+            "status": "erro",
+            "erro": "Nenhum dado fornecido",
+            "timestamp": datetime.now().isoformat()
+        }), 400
+
+    try:
+        job_id = gerenciador_jobs.submeter(orquestrador.processar_solicitacao_completa, dados_entrada)
+    except FilaCheiaError as e:
+        return _resposta_fila_cheia(e)
+    return jsonify({
+        "status": "na_fila",
+        "job_id": job_id,
+        "url_status": f"/api/jobs/{job_id}",
+        "timestamp": datetime.now().isoformat()
+    }), 202
+
+def _resposta_fila_cheia(erro: FilaCheiaError):
+    """HTTP 503 para uma solicitação recusada porque a fila de jobs está cheia."""
+    resposta = jsonify({
+        "status": "erro",
+        "erro": str(erro),
+        "timestamp": datetime.now().isoformat()
+    })
+    resposta.headers['Retry-After'] = '60'
+    return resposta, 503
+
+def _formatar_evento_sse(tipo: str, dados: dict) -> str:
+    """Serializa um evento no formato Server-Sent Events."""
+    return f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+@app.route('/api/gerar-peticao/stream', methods=['POST'])
+def gerar_peticao_stream():
+    """
+    Versão em streaming (Server-Sent Events) da geração de documentos.
+    Emite eventos 'etapa' (progresso), 'secao' (cada seção assim que fica pronta), 'documento'
+    (documento montado), 'validacao' (resultado de cada tentativa) e, por fim, 'fim' ou 'erro'.
+    """
+    dados_entrada = request.get_json(silent=True)
+    if not dados_entrada:
+        return jsonify({
+            "status": "erro",
+            "erro": "Nenhum dado fornecido",
+            "timestamp": datetime.now().isoformat()
+        }), 400
+
+    # COMENTÁRIO: O fluxo roda no pool do Gerenciador de Jobs; os eventos chegam por esta fila
+    # e são repassados ao cliente à medida que são produzidos.
+    fila_eventos = queue.Queue()
+    ouvinte = lambda tipo, dados: fila_eventos.put((tipo, dados))
+    try:
+        job_id = gerenciador_jobs.submeter(orquestrador.processar_solicitacao_completa, dados_entrada, ouvinte=ouvinte, callback_evento=ouvinte)
+    except FilaCheiaError as e:
+        return _resposta_fila_cheia(e)
+
+    def gerar_eventos():
+        yield _formatar_evento_sse("job", {"job_id": job_id, "url_status": f"/api/jobs/{job_id}"})
+        while True:
+            try:
+                tipo, dados = fila_eventos.get(timeout=15)
+            except queue.Empty:
+                # Comentário SSE para manter a conexão viva através de proxies.
+                yield ": keep-alive\n\n"
+                continue
+            if tipo == "fim":
+                if dados.get("status") == "erro":
+                    yield _formatar_evento_sse("erro", {"job_id": job_id, "erro": dados.get("erro")})
+                else:
+                    yield _formatar_evento_sse("fim", {"job_id": job_id, "documento_html": dados.get("documento_final")})
+                break
+            yield _formatar_evento_sse(tipo, dados)
+
+    return Response(
+        stream_with_context(gerar_eventos()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def consultar_job(job_id):
+    """Retorna o status, o progresso por etapa e, quando concluído, o documento final de um job."""
+    job = gerenciador_jobs.consultar(job_id)
+    if not job:
+        return jsonify({"status": "erro", "erro": f"Job '{job_id}' não encontrado"}), 404
+
+    resposta = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "etapa_atual": job["etapa_atual"],
+        "progresso": job["progresso"],
+        "criado_em": job["criado_em"],
+        "iniciado_em": job["iniciado_em"],
+        "finalizado_em": job["finalizado_em"],
+    }
+    resultado = job.get("resultado") or {}
+    if job["status"] == "concluido":
+        resposta["documento_final"] = resultado.get("documento_final")
+    elif job["status"] == "erro":
+        resposta["erro"] = resultado.get("erro")
+    return jsonify(resposta)
+
 @app.route('/api/status-sistema', methods=['GET'])
 def status_sistema():
     """Status detalhado do sistema e agentes."""
@@ -174,6 +289,15 @@ def status_sistema():
                 "tempo_limite": "60 segundos",
                 "qualidade_minima": "85%"
             },
+            "jobs": gerenciador_jobs.estatisticas(),
+            "cache_llm": orquestrador.cliente_llm.estatisticas_cache(),
+            "uso_tokens_llm": orquestrador.cliente_llm.estatisticas_uso(),
+            "cache_paginas": orquestrador.cache_paginas.estatisticas(),
+            "cache_buscas": orquestrador.cache_buscas.estatisticas(),
+            "indice_legislacao": orquestrador.pesquisa_juridica_peticoes.indice_legislacao.estatisticas(),
+            "indice_jurisprudencia": orquestrador.indice_jurisprudencia.estatisticas(),
+            "cache_vereditos": orquestrador.cache_vereditos.estatisticas(),
+            "condensador_pesquisa": orquestrador.condensador_pesquisa.estatisticas(),
             "timestamp": datetime.now().isoformat()
         })
         
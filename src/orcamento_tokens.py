@@ -0,0 +1,112 @@
+# orcamento_tokens.py - Contagem de Tokens e Orçamento de Entrada dos Prompts dos Redatores
+
+import os
+import re
+import math
+from typing import Dict, List, Optional, Tuple, Callable
+
+_encoding = None
+_encoding_carregado = False
+
+def _obter_encoding():
+    """
+    Encoding do tiktoken (JURIDOC_TIKTOKEN_ENCODING, padrão 'cl100k_base'), carregado uma única vez por processo.
+    O tokenizador da DeepSeek não é público no tiktoken; o cl100k_base é uma aproximação próxima para português.
+    Se o arquivo do encoding não puder ser obtido (ex: sem acesso à rede), a contagem passa a ser estimada.
+    """
+    global _encoding, _encoding_carregado
+    if not _encoding_carregado:
+        _encoding_carregado = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(os.getenv('JURIDOC_TIKTOKEN_ENCODING', 'cl100k_base'))
+        except Exception as e:
+            print(f"⚠️ Encoding do tiktoken indisponível ({e.__class__.__name__}); os tokens dos prompts serão estimados.")
+    return _encoding
+
+# COMENTÁRIO: Média de caracteres por token em textos jurídicos em português, usada quando o tiktoken não está disponível.
+CARACTERES_POR_TOKEN_ESTIMADO = 3.5
+
+def contar_tokens(texto: str) -> int:
+    if not texto:
+        return 0
+    encoding = _obter_encoding()
+    if encoding is None:
+        return math.ceil(len(texto) / CARACTERES_POR_TOKEN_ESTIMADO)
+    return len(encoding.encode(texto, disallowed_special=()))
+
+# COMENTÁRIO: Cada fonte da pesquisa formatada começa com "Fonte:" (ou "### Fonte:" na pesquisa de contratos).
+_RE_INICIO_FONTE = re.compile(r'\n+(?=(?:### )?Fonte: )')
+
+def dividir_fontes(pesquisa_formatada: str) -> List[str]:
+    """Divide a pesquisa formatada em blocos, um por fonte, na ordem de prioridade em que foram montados."""
+    return _RE_INICIO_FONTE.split(pesquisa_formatada)
+
+class OrcamentoTokens:
+    """
+    Mede os componentes do contexto de cada seção (pesquisa, dados do caso e instruções) e aplica um limite de
+    tokens de entrada por seção.
+    - Acima do limite, a pesquisa é reduzida primeiro, removendo as fontes de menor prioridade (as últimas de cada
+      pesquisa formatada: resultados de pior posição na busca e dos últimos fundamentos).
+    - Dados do caso e instruções nunca são cortados; se só eles já passam do limite, apenas um aviso é emitido.
+    - Retorna as contagens por seção, registradas pelo orquestrador a cada solicitação.
+    """
+    def __init__(self):
+        self.config = {
+            'max_tokens_entrada_secao': int(os.getenv('JURIDOC_MAX_TOKENS_ENTRADA_SECAO', '48000')),
+        }
+
+    def _reduzir_pesquisa(self, pesquisa: str, tokens_a_remover: int) -> Tuple[str, int]:
+        """Remove fontes do fim da pesquisa até liberar 'tokens_a_remover'; retorna o texto reduzido e os tokens removidos."""
+        fontes = dividir_fontes(pesquisa)
+        tokens_fontes = [contar_tokens(fonte) for fonte in fontes]
+        removidos = 0
+        while len(fontes) > 1 and removidos < tokens_a_remover:
+            fontes.pop()
+            removidos += tokens_fontes.pop()
+        if removidos < tokens_a_remover:
+            # Sobrou uma única fonte grande demais: ela é encurtada proporcionalmente.
+            restante = max(tokens_fontes[0] - (tokens_a_remover - removidos), 0)
+            fontes[0] = fontes[0][:int(len(fontes[0]) * restante / max(tokens_fontes[0], 1))]
+            removidos = tokens_a_remover
+        return "\n\n".join(fontes), removidos
+
+    def ajustar_contexto(self, montar: Callable[[Dict[str, str]], str], pesquisas: Dict[str, str], tarefas: Dict[str, str], componentes: Optional[Dict[str, str]] = None) -> Tuple[str, Dict[str, Dict[str, int]]]:
+        """
+        Aplica o orçamento ao contexto comum das seções (ver construtor_prompts) e retorna (contexto ajustado, contagens).
+        - 'montar' monta o contexto a partir dos textos da pesquisa ({chave: texto}); com a pesquisa reduzida, o contexto
+          é montado de novo com os textos reduzidos, sem substituir trechos no texto já montado.
+        - A pesquisa é reduzida uma única vez, no contexto, para ele continuar idêntico em todas as seções; o espaço
+          disponível é o limite menos a maior tarefa. A contagem de cada seção soma o contexto e a sua tarefa.
+        - 'componentes' são outras partes do contexto apenas medidas (ex: {"dados": json dos dados}).
+        """
+        tokens_tarefas = {nome: contar_tokens(tarefa) for nome, tarefa in tarefas.items()}
+        limite = self.config['max_tokens_entrada_secao'] - max(tokens_tarefas.values(), default=0)
+        contexto = montar(pesquisas)
+        total = contar_tokens(contexto)
+        tokens_pesquisa = {chave: contar_tokens(texto) for chave, texto in pesquisas.items()}
+        pesquisa_removida = 0
+        if total > limite and pesquisas:
+            reduzidas = dict(pesquisas)
+            # COMENTÁRIO: A pesquisa maior é reduzida primeiro; normalmente há uma única pesquisa por seção.
+            for chave in sorted(pesquisas, key=lambda chave: -tokens_pesquisa[chave]):
+                if total - pesquisa_removida <= limite: break
+                reduzidas[chave], removidos = self._reduzir_pesquisa(pesquisas[chave], total - pesquisa_removida - limite)
+                pesquisa_removida += removidos
+            contexto = montar(reduzidas)
+            total = contar_tokens(contexto)
+            tokens_pesquisa = {chave: contar_tokens(texto) for chave, texto in reduzidas.items()}
+            print(f"✂️ Contexto de {', '.join(tarefas)}: pesquisa reduzida em ~{pesquisa_removida} tokens para caber no orçamento ({limite} tokens).")
+        if total > limite:
+            print(f"⚠️ Contexto de {', '.join(tarefas)} com {total} tokens de entrada, acima do orçamento de {limite}, mesmo sem pesquisa a reduzir.")
+
+        contagem = {'total': total, 'pesquisa': sum(tokens_pesquisa.values())}
+        for componente, texto in (componentes or {}).items():
+            if texto:
+                contagem[componente] = contar_tokens(texto) * contexto.count(texto)
+        contagem['instrucoes'] = max(total - sum(valor for chave, valor in contagem.items() if chave != 'total'), 0)
+        contagem['pesquisa_removida'] = pesquisa_removida
+        return contexto, {
+            nome: {**contagem, 'total': total + tokens, 'instrucoes': contagem['instrucoes'] + tokens, 'contexto_comum': total}
+            for nome, tokens in tokens_tarefas.items()
+        }
@@ -1,8 +1,9 @@
 # orquestrador.py - Versão Final com a Nova Arquitetura de Agentes Especializados
 
 import os
+import asyncio
 import traceback
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional, Awaitable
 from datetime import datetime
 
 # COMENTÁRIO: Importamos o novo agente identificador e todos os coletores especializados.
@@ -27,6 +28,17 @@ from agente_redator_estudo_de_caso import AgenteRedatorEstudoDeCaso
 from agente_validador import AgenteValidador
 from agente_pesquisador_jurisprudencia import AgentePesquisadorJurisprudencia
 from agente_redator_jurisprudencia import AgenteRedatorJurisprudencia
+from loop_assincrono import executar_no_loop
+from cliente_llm import ClienteLLM
+from cache_paginas import CachePaginas
+from cache_buscas import CacheBuscas
+from indice_jurisprudencia import IndiceJurisprudencia
+from cache_vereditos import CacheVereditos
+from condensador_pesquisa import CondensadorPesquisa
+from extracao_html import iniciar_pool
+
+# COMENTÁRIO: Nomes usados no texto de falha de cada categoria da pesquisa ('pesquisa' é a pesquisa única dos contratos).
+NOMES_CATEGORIAS_PESQUISA = {"legislacao": "legislação", "jurisprudencia": "jurisprudência", "doutrina": "doutrina", "pesquisa": "modelos de contrato"}
 
 class OrquestradorPrincipal:
     def __init__(self):
@@ -38,6 +50,9 @@ class OrquestradorPrincipal:
         
         print("✅ Chave da API encontrada pelo Orquestrador.")
 
+        # COMENTÁRIO: Um único cliente assíncrono (com pool de conexões) é compartilhado por todos os agentes que usam a DeepSeek.
+        self.cliente_llm = ClienteLLM(api_key=deepseek_api_key)
+
         # COMENTÁRIO: Inicializamos o novo agente identificador e um dicionário com todos os coletores.
         self.agente_identificador = AgenteIdentificador()
         self.coletores = {
@@ -50,23 +65,38 @@ class OrquestradorPrincipal:
             "Estudo de Caso": AgenteColetorEstudoDeCaso(),
         }
         
-        self.pesquisa_juridica_peticoes = PesquisaJuridica()
-        self.pesquisa_juridica_contratos = AgentePesquisaContratos()
+        # COMENTÁRIO: Os agentes de pesquisa compartilham o mesmo cache de páginas (em disco), com GET condicional e cache negativo.
+        # As buscas no Google (consulta -> URLs) também são compartilhadas, com uma única busca para consultas simultâneas idênticas.
+        self.cache_paginas = CachePaginas()
+        # O pool de processos que extrai o texto das páginas é criado aqui, antes de existirem outras threads.
+        iniciar_pool()
+        self.cache_buscas = CacheBuscas()
+        self.pesquisa_juridica_peticoes = PesquisaJuridica(cache_paginas=self.cache_paginas, cache_buscas=self.cache_buscas)
+        self.pesquisa_juridica_contratos = AgentePesquisaContratos(cache_paginas=self.cache_paginas, cache_buscas=self.cache_buscas)
+        # COMENTÁRIO: Etapa opcional (JURIDOC_CONDENSAR_PESQUISA=1) que troca a pesquisa bruta por um resumo jurídico por categoria.
+        self.condensador_pesquisa = CondensadorPesquisa(cliente_llm=self.cliente_llm)
         
         # Inicializa todos os agentes redatores num dicionário para fácil acesso.
         self.redatores = {
-            "Ação Cível": AgenteRedatorCivel(api_key=deepseek_api_key),
-            "Ação Trabalhista": AgenteRedatorTrabalhista(api_key=deepseek_api_key),
-            "Contrato": AgenteRedatorContratos(api_key=deepseek_api_key),
-            "Parecer Jurídico": AgenteRedatorParecer(api_key=deepseek_api_key),
-            "Queixa-Crime": AgenteRedatorQueixaCrime(api_key=deepseek_api_key),
-            "Habeas Corpus": AgenteRedatorHabeasCorpus(api_key=deepseek_api_key),
-            "Estudo de Caso": AgenteRedatorEstudoDeCaso(api_key=deepseek_api_key),
+            "Ação Cível": AgenteRedatorCivel(api_key=deepseek_api_key, cliente_llm=self.cliente_llm),
+            "Ação Trabalhista": AgenteRedatorTrabalhista(api_key=deepseek_api_key, cliente_llm=self.cliente_llm),
+            "Contrato": AgenteRedatorContratos(api_key=deepseek_api_key, cliente_llm=self.cliente_llm),
+            "Parecer Jurídico": AgenteRedatorParecer(api_key=deepseek_api_key, cliente_llm=self.cliente_llm),
+            "Queixa-Crime": AgenteRedatorQueixaCrime(api_key=deepseek_api_key, cliente_llm=self.cliente_llm),
+            "Habeas Corpus": AgenteRedatorHabeasCorpus(api_key=deepseek_api_key, cliente_llm=self.cliente_llm),
+            "Estudo de Caso": AgenteRedatorEstudoDeCaso(api_key=deepseek_api_key, cliente_llm=self.cliente_llm),
         }
         
         self.agente_validador = AgenteValidador()
         # COMENTÁRIO: Inicializamos os novos agentes para a pesquisa de jurisprudência.
-        self.agente_pesquisador_jurisprudencia = AgentePesquisadorJurisprudencia()
+        # O índice local guarda as jurisprudências aprovadas, para que pesquisas repetidas ou parecidas não dependam da raspagem.
+        # Os vereditos de relevância (URL + termo) também ficam em disco, evitando baixar e validar de novo as mesmas páginas.
+        self.indice_jurisprudencia = IndiceJurisprudencia()
+        self.cache_vereditos = CacheVereditos()
+        self.agente_pesquisador_jurisprudencia = AgentePesquisadorJurisprudencia(
+            cliente_llm=self.cliente_llm, cache_paginas=self.cache_paginas, cache_buscas=self.cache_buscas,
+            indice_jurisprudencia=self.indice_jurisprudencia, cache_vereditos=self.cache_vereditos
+        )
         self.agente_redator_jurisprudencia = AgenteRedatorJurisprudencia()
         
         print("Orquestrador Principal inicializado com todos os agentes configurados.")
@@ -74,6 +104,10 @@ class OrquestradorPrincipal:
         # COMENTÁRIO: Esta é a nova função que estava em falta.
         # Ela lida exclusivamente com o fluxo de pesquisa de jurisprudência.
     def processar_pesquisa_jurisprudencia(self, dados_entrada: Dict[str, Any]) -> Dict[str, Any]:
+        """Ponto de entrada síncrono: executa a versão assíncrona no event loop persistente."""
+        return executar_no_loop(self.processar_pesquisa_jurisprudencia_async(dados_entrada))
+
+    async def processar_pesquisa_jurisprudencia_async(self, dados_entrada: Dict[str, Any]) -> Dict[str, Any]:
         try:
             print("\n--- FLUXO DE PESQUISA DE JURISPRUDÊNCIA INICIADO ---")
             
@@ -83,7 +117,7 @@ class OrquestradorPrincipal:
             print(f"  -> Termos a serem pesquisados: {termos_pesquisa}")
 
             # Chama o Agente de Pesquisa de Jurisprudência
-            resultados = self.agente_pesquisador_jurisprudencia.pesquisar(termos_pesquisa)
+            resultados = await self.agente_pesquisador_jurisprudencia.pesquisar_async(termos_pesquisa)
 
             # Chama o Agente para Formatar o Resultado
             resultado_formatado = self.agente_redator_jurisprudencia.formatar_resultados(termos_pesquisa, resultados)
@@ -94,7 +128,57 @@ class OrquestradorPrincipal:
             traceback.print_exc()
             return {"status": "erro", "erro": f"Erro no fluxo de pesquisa de jurisprudência: {e}"}
     
-    def processar_solicitacao_completa(self, dados_entrada: Dict[str, Any]) -> Dict[str, Any]:
+    async def _preparar_categoria_async(self, categoria: str, pesquisa: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Resultado de uma categoria da pesquisa, já condensado quando a condensação está habilitada.
+        Nunca falha: se a pesquisa falhar, a categoria recebe o texto de falha (como no fallback da pesquisa) e, se só
+        a condensação falhar, a pesquisa original é usada. Assim uma categoria com problema não derruba o documento.
+        """
+        try:
+            resultado = await pesquisa
+        except Exception as e:
+            print(f"❌ Falha na pesquisa de {categoria.upper()}: {e}")
+            return {f'{categoria}_formatada': f"A pesquisa de {NOMES_CATEGORIAS_PESQUISA.get(categoria, categoria)} falhou."}
+        if self.condensador_pesquisa.config['habilitado']:
+            try:
+                resultado = await self.condensador_pesquisa.condensar_async(resultado)
+            except Exception as e:
+                print(f"⚠️ Falha ao condensar a pesquisa de {categoria.upper()}; usando a pesquisa original: {e}")
+        return resultado
+
+    def _descartar_pesquisa_concluida(self, tarefa: "asyncio.Future"):
+        """Lê o desfecho de uma tarefa de pesquisa que terminou depois da resposta, para que nenhuma exceção fique sem ser lida."""
+        if not tarefa.cancelled() and tarefa.exception():
+            print(f"⚠️ Pesquisa em segundo plano terminou com erro: {tarefa.exception()}")
+
+    def _notificar_progresso(self, callback_progresso: Optional[Callable], etapa: str, detalhes: Optional[Dict[str, Any]] = None):
+        """Repassa o avanço do fluxo a quem acompanha a execução (ex: o Gerenciador de Jobs), sem interromper o fluxo em caso de falha."""
+        if not callback_progresso: return
+        try:
+            callback_progresso(etapa, detalhes or {})
+        except Exception as e:
+            print(f"⚠️ Falha ao registrar progresso da etapa '{etapa}': {e}")
+
+    def _notificar_evento(self, callback_evento: Optional[Callable], tipo: str, dados: Dict[str, Any]):
+        """Entrega conteúdo parcial (seções, documento montado, validação) a quem consome o fluxo em streaming."""
+        if not callback_evento: return
+        try:
+            callback_evento(tipo, dados)
+        except Exception as e:
+            print(f"⚠️ Falha ao emitir o evento '{tipo}': {e}")
+
+    def processar_solicitacao_completa(self, dados_entrada: Dict[str, Any], callback_progresso: Optional[Callable] = None, callback_evento: Optional[Callable] = None) -> Dict[str, Any]:
+        """Ponto de entrada síncrono: executa a versão assíncrona no event loop persistente."""
+        return executar_no_loop(self.processar_solicitacao_completa_async(dados_entrada, callback_progresso, callback_evento))
+
+    async def processar_solicitacao_completa_async(self, dados_entrada: Dict[str, Any], callback_progresso: Optional[Callable] = None, callback_evento: Optional[Callable] = None) -> Dict[str, Any]:
+        """
+        Executa todo o fluxo (identificação, coleta, pesquisa, redação e validação) num único event loop,
+        reaproveitando conexões e evitando criar um loop novo a cada etapa e a cada tentativa.
+        """
+        # COMENTÁRIO: Tarefas da pesquisa (por categoria, e a preparação de cada uma), que correm em paralelo com a redação; ver o 'finally'.
+        tarefas_pesquisa: List[asyncio.Future] = []
+        concluido = False
         try:
             print("\n" + "="*60)
             print("🚀 INICIANDO NOVO FLUXO DE GERAÇÃO DE DOCUMENTO 🚀")
@@ -106,6 +190,7 @@ class OrquestradorPrincipal:
             if resultado_identificador.get("status") == "erro": return resultado_identificador
             tipo_documento = resultado_identificador.get("tipo_documento", "Ação Cível")
             print(f"  -> Documento identificado como: {tipo_documento}")
+            self._notificar_progresso(callback_progresso, "identificacao", {"tipo_documento": tipo_documento})
             
             # COMENTÁRIO: Este é o novo "desvio" no fluxo, agora com a indentação correta.
             if tipo_documento == "Pesquisa de Jurisprudência":
@@ -117,9 +202,11 @@ class OrquestradorPrincipal:
                 print(f"  -> Termos a serem pesquisados: {termos_pesquisa}")
 
                 # Chama o Agente de Pesquisa de Jurisprudência
-                resultados = self.agente_pesquisador_jurisprudencia.pesquisar(termos_pesquisa)
+                self._notificar_progresso(callback_progresso, "pesquisa_jurisprudencia", {"termos": termos_pesquisa})
+                resultados = await self.agente_pesquisador_jurisprudencia.pesquisar_async(termos_pesquisa)
 
                 # Chama o Agente para Formatar o Resultado
+                self._notificar_progresso(callback_progresso, "formatacao", {"resultados": len(resultados)})
                 resultado_formatado = self.agente_redator_jurisprudencia.formatar_resultados(termos_pesquisa, resultados)
 
                 print("✅ FLUXO DE PESQUISA DE JURISPRUDÊNCIA FINALIZADO!")
@@ -134,6 +221,7 @@ class OrquestradorPrincipal:
                 if not agente_coletor_ativo:
                     raise ValueError(f"Nenhum agente coletor encontrado para o tipo: {tipo_documento}")
                 print(f"  -> Acionando Agente: {agente_coletor_ativo.__class__.__name__}")
+                self._notificar_progresso(callback_progresso, "coleta", {"agente": agente_coletor_ativo.__class__.__name__})
                 resultado_coletor = agente_coletor_ativo.coletar_e_processar(dados_entrada)
                 if resultado_coletor.get("status") == "erro": return resultado_coletor
                 dados_estruturados = resultado_coletor.get('dados_estruturados', {})
@@ -141,16 +229,21 @@ class OrquestradorPrincipal:
                 print(f"  -> Fundamentos para Pesquisa: {dados_estruturados.get('fundamentos_necessarios', [])}")
 
                 # ETAPA 3: AGENTE DE PESQUISA ESPECIALIZADO
-                print("\n--- ETAPA 3: Pesquisa Jurídica ---")
+                # COMENTÁRIO: A pesquisa é disparada sem esperar por ela, com uma tarefa por categoria. A redação começa logo
+                # em seguida: as seções sem pesquisa imediatamente e as demais assim que a sua categoria fica pronta.
+                print("\n--- ETAPA 3: Pesquisa Jurídica (em paralelo com a redação) ---")
+                fundamentos = dados_estruturados.get('fundamentos_necessarios', [])
                 if tipo_documento == "Contrato":
                     agente_pesquisa_ativo = self.pesquisa_juridica_contratos
+                    pesquisas_por_categoria = {"pesquisa": asyncio.ensure_future(agente_pesquisa_ativo.pesquisar_fundamentacao_completa_async(fundamentos=fundamentos, tipo_acao=tipo_documento))}
                 else:
                     agente_pesquisa_ativo = self.pesquisa_juridica_peticoes
+                    pesquisas_por_categoria = agente_pesquisa_ativo.pesquisar_por_categoria(fundamentos)
                 print(f"  -> Acionando Agente: {agente_pesquisa_ativo.__class__.__name__}")
-                resultado_pesquisa = agente_pesquisa_ativo.pesquisar_fundamentacao_completa(
-                    fundamentos=dados_estruturados.get('fundamentos_necessarios', []),
-                    tipo_acao=tipo_documento
-                )
+                self._notificar_progresso(callback_progresso, "pesquisa", {"fundamentos": fundamentos})
+                # Os redatores recebem {'<categoria>_formatada': tarefa da categoria}; nas tentativas seguintes as tarefas já estão concluídas.
+                resultado_pesquisa = {f'{categoria}_formatada': asyncio.ensure_future(self._preparar_categoria_async(categoria, pesquisa)) for categoria, pesquisa in pesquisas_por_categoria.items()}
+                tarefas_pesquisa = [*pesquisas_por_categoria.values(), *resultado_pesquisa.values()]
 
                 # ETAPA 4: AGENTE REDATOR ESPECIALIZADO (COM CICLO DE FEEDBACK)
                 print("\n--- ETAPA 4: Redação e Validação Iterativa ---")
@@ -162,40 +255,105 @@ class OrquestradorPrincipal:
                 max_tentativas = 3
                 documento_atual = ""
                 recomendacoes = []
+                # COMENTÁRIO: Seções da última tentativa e as que o validador mandou reescrever.
+                # 'None' significa "todas" (primeira tentativa, ou quando o validador não aponta seções específicas).
+                secoes_atuais = {}
+                secoes_a_regenerar = None
+                # COMENTÁRIO: As metas por seção limitam a geração (streaming com parada antecipada) e orientam a continuação das seções curtas.
+                metas_secoes = self.agente_validador.obter_criterios(tipo_documento)['secoes']
+                # COMENTÁRIO: Tokens de entrada de cada seção, por tentativa (medidos pelo orçamento de tokens do redator).
+                tokens_prompt_por_tentativa = {}
                 
                 for tentativa_atual in range(1, max_tentativas + 1):
                     print(f"\n--- TENTATIVA DE REDAÇÃO Nº {tentativa_atual} ---")
-                    resultado_redacao = agente_redator_ativo.redigir_peticao_completa(
+                    self._notificar_progresso(callback_progresso, "redacao", {"tentativa": tentativa_atual, "secoes_a_regenerar": sorted(secoes_a_regenerar) if secoes_a_regenerar else "todas"})
+                    # COMENTÁRIO: Cada seção é repassada ao 'callback_evento' assim que fica pronta (streaming SSE).
+                    def callback_secao(nome_secao, conteudo, tentativa=tentativa_atual):
+                        self._notificar_evento(callback_evento, "secao", {"tentativa": tentativa, "secao": nome_secao, "conteudo": conteudo})
+
+                    resultado_redacao = await agente_redator_ativo.redigir_peticao_completa_async(
                         dados_estruturados=dados_estruturados,
                         pesquisa_juridica=resultado_pesquisa,
                         documento_anterior=documento_atual,
-                        recomendacoes=recomendacoes
+                        recomendacoes=recomendacoes,
+                        callback_secao=callback_secao if callback_evento else None,
+                        secoes_anteriores=secoes_atuais,
+                        secoes_a_regenerar=secoes_a_regenerar,
+                        metas_secoes=metas_secoes
                     )
                     if resultado_redacao.get("status") == "erro": return resultado_redacao
                     documento_atual = resultado_redacao.get('documento_html', '')
+                    secoes_atuais = resultado_redacao.get('secoes', {})
+                    tokens_prompt = resultado_redacao.get('tokens_prompt', {})
+                    tokens_prompt_por_tentativa[tentativa_atual] = tokens_prompt
+                    if tokens_prompt:
+                        print(f"🧮 Tokens de entrada por seção: { {nome: contagem['total'] for nome, contagem in tokens_prompt.items()} } (total: {sum(contagem['total'] for contagem in tokens_prompt.values())})")
+                    self._notificar_evento(callback_evento, "documento", {"tentativa": tentativa_atual, "documento_html": documento_atual})
                     
                     print(f"\n--- VALIDAÇÃO DA TENTATIVA Nº {tentativa_atual} ---")
-                    resultado_validacao = self.agente_validador.validar_e_formatar(documento_atual, dados_estruturados)
+                    self._notificar_progresso(callback_progresso, "validacao", {"tentativa": tentativa_atual})
+                    resultado_validacao = self.agente_validador.validar_e_formatar(
+                        documento_atual, dados_estruturados,
+                        secoes=secoes_atuais,
+                        tipo_documento=tipo_documento
+                    )
+                    self._notificar_progresso(callback_progresso, "resultado_validacao", {
+                        "tentativa": tentativa_atual,
+                        "status": resultado_validacao.get("status"),
+                        "score_qualidade": resultado_validacao.get("score_qualidade"),
+                    })
+                    self._notificar_evento(callback_evento, "validacao", {
+                        "tentativa": tentativa_atual,
+                        "status": resultado_validacao.get("status"),
+                        "score_qualidade": resultado_validacao.get("score_qualidade"),
+                        "recomendacoes": resultado_validacao.get("recomendacoes", []),
+                        "metricas_secoes": resultado_validacao.get("metricas_secoes", {}),
+                    })
                     
                     if resultado_validacao.get("status") == "aprovado":
                         print("✅ Documento APROVADO pelo Agente Validador.")
                         break
                     
                     recomendacoes = resultado_validacao.get("recomendacoes", [])
+                    secoes_a_regenerar = set(resultado_validacao.get("secoes_reprovadas", [])) or None
                     print(f"❌ Documento REPROVADO. Recomendações para a próxima tentativa: {recomendacoes}")
+                    print(f"   -> Seções a reescrever: {sorted(secoes_a_regenerar) if secoes_a_regenerar else 'todas'}")
                     if tentativa_atual == max_tentativas:
                         print("⚠️ Número máximo de tentativas atingido. Usando a melhor versão disponível.")
 
                 documento_final = resultado_validacao.get('documento_validado', documento_atual)
+                self.agente_validador.registrar_no_corpus(tipo_documento, documento_final, secoes_atuais, resultado_validacao.get("status"), tentativa_atual)
+                print(f"📦 Cache de completações LLM: {self.cliente_llm.estatisticas_cache()}")
+                print(f"💾 Tokens de entrada LLM (cache de prefixo da API): {self.cliente_llm.estatisticas_uso()}")
+                print(f"📦 Cache de páginas: {self.cache_paginas.estatisticas()}")
+                print(f"📦 Cache de buscas: {self.cache_buscas.estatisticas()}")
                 
                 print("\n" + "="*60)
                 print("✅ PROCESSAMENTO COMPLETO FINALIZADO!")
                 print("="*60)
+                concluido = True
                 return {
                     "status": "sucesso",
                     "documento_final": documento_final,
+                    "tokens_prompt": tokens_prompt_por_tentativa,
                 }
             
         except Exception as e:
             traceback.print_exc()
             return {"status": "erro", "erro": str(e)}
+        finally:
+            # COMENTÁRIO: A resposta não espera pela pesquisa de que nenhuma seção dependia: com o documento pronto, ela continua
+            # em segundo plano (alimentando os caches e índices locais). Se a redação falhar, a pesquisa é cancelada.
+            # Em ambos os casos o desfecho de cada tarefa é lido ("Task exception was never retrieved").
+            pendentes = [tarefa for tarefa in tarefas_pesquisa if not tarefa.done()]
+            if concluido:
+                if pendentes:
+                    print(f"⏩ {len(pendentes)} tarefa(s) de pesquisa continuam em segundo plano.")
+                for tarefa in tarefas_pesquisa:
+                    tarefa.add_done_callback(self._descartar_pesquisa_concluida)
+            else:
+                for tarefa in pendentes:
+                    tarefa.cancel()
+                if pendentes:
+                    print(f"🛑 Pesquisa interrompida: {len(pendentes)} tarefa(s) cancelada(s).")
+                await asyncio.gather(*tarefas_pesquisa, return_exceptions=True)
@@ -1,20 +1,30 @@
 # pesquisa_juridica.py - Versão 4.0 (Pesquisa Persistente e Aprofundada)
 
 import asyncio
-import aiohttp
-import re
 from datetime import datetime
-from typing import Dict, Any, List
-from googlesearch import search
-from bs4 import BeautifulSoup
+from typing import Dict, Any, List, Optional
+
+from loop_assincrono import executar_no_loop
+from cache_paginas import CachePaginas
+from cache_buscas import CacheBuscas
+from extracao_html import extrair_texto_html_async
+from sessao_http import obter_sessao
+from indice_legislacao import IndiceLegislacao
+from deduplicacao import indices_unicos
+from selecao_trechos import selecionar_trechos
+
+# COMENTÁRIO: Categorias pesquisadas, na ordem de prioridade usada na remoção de conteúdos duplicados entre categorias.
+CATEGORIAS_PESQUISA = ["legislacao", "jurisprudencia", "doutrina"]
 
 class PesquisaJuridica:
     """
     Agente de Pesquisa Jurídica Otimizado v4.0.
     - Realiza uma pesquisa persistente, garantindo um número mínimo de extrações bem-sucedidas.
     - É mais resiliente a bloqueios e erros de extração.
+    - Reaproveita as buscas e as páginas já baixadas por meio dos caches compartilhados.
+    - Consulta primeiro o índice local dos códigos (CLT, CC, CPC, CP, CPP, CF) para a legislação.
     """
-    def __init__(self):
+    def __init__(self, cache_paginas: Optional[CachePaginas] = None, cache_buscas: Optional[CacheBuscas] = None, indice_legislacao: Optional[IndiceLegislacao] = None):
         print("🔍 Inicializando Pesquisa Jurídica OTIMIZADA v4.0 (Persistente)...")
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -27,42 +37,39 @@ class PesquisaJuridica:
             'tamanho_maximo_conteudo': 30000,
             'min_sucessos_por_termo': 4, # META: Garantir pelo menos 4 conteúdos por termo.
             'google_search_results': 10, # Busca mais links para ter mais opções.
+            'max_extracoes_simultaneas_por_termo': 6, # Extrações em paralelo por termo; as restantes são canceladas ao atingir a meta.
+            'caracteres_por_fonte': 1500, # Trechos mais relevantes de cada fonte enviados aos redatores.
         }
         self.sites_prioritarios = {
             'legislacao': ['planalto.gov.br', 'lexml.gov.br'],
             'jurisprudencia': ['tst.jus.br', 'stj.jus.br', 'stf.jus.br', 'conjur.com.br'],
             'doutrina': ['conjur.com.br', 'migalhas.com.br', 'ambito-juridico.com.br']
         }
+        # COMENTÁRIO: Os caches de páginas e de buscas são compartilhados entre os agentes de pesquisa (injetados pelo orquestrador).
+        self.cache_paginas = cache_paginas or CachePaginas()
+        self.cache_buscas = cache_buscas or CacheBuscas()
+        self.indice_legislacao = indice_legislacao or IndiceLegislacao()
         print("✅ Sistema de pesquisa jurídica OTIMIZADA inicializado.")
 
+    async def _limpar_html(self, html: str) -> Dict[str, Any]:
+        """Texto limpo e título da página, extraídos no pool de processos (fora do event loop)."""
+        return await extrair_texto_html_async(html, separador=' ')
+
     async def _extrair_conteudo_url_async(self, session, url: str) -> Dict[str, Any]:
-        """Extrai conteúdo de uma URL de forma assíncrona."""
+        """Extrai conteúdo de uma URL de forma assíncrona (do cache de páginas, quando possível)."""
         print(f"→ Tentando extrair de: {url}")
-        try:
-            async with session.get(url, headers=self.headers, timeout=15, ssl=False) as response:
-                if response.status == 200:
-                    raw_html = await response.read()
-                    html = raw_html.decode('utf-8', errors='ignore')
-                    soup = BeautifulSoup(html, 'html.parser')
-                    for tag in soup.find_all(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-                        tag.decompose()
-                    
-                    texto = soup.body.get_text(separator=' ', strip=True) if soup.body else ""
-                    texto_limpo = re.sub(r'\s+', ' ', texto).strip()
-                    
-                    if len(texto_limpo) < self.config['tamanho_minimo_conteudo']:
-                        print(f"⚠️ Descartado (curto): {url}")
-                        return None
-
-                    print(f"✔ SUCESSO: Conteúdo extraído de {url} ({len(texto_limpo)} caracteres)")
-                    return { "url": url, "texto": texto_limpo[:self.config['tamanho_maximo_conteudo']], "titulo": soup.title.string.strip() if soup.title else "N/A" }
-                else:
-                    print(f"❌ Falha (Status {response.status}): {url}")
-                    return None
-        except Exception as e:
-            print(f"❌ Falha (Erro: {type(e).__name__}): {url}")
+        pagina = await self.cache_paginas.obter(session, url, self._limpar_html, "pesquisa_juridica", self.headers, 15, max_caracteres=self.config['tamanho_maximo_conteudo'])
+        if not pagina:
+            return None
+
+        texto_limpo = pagina['texto']
+        if len(texto_limpo) < self.config['tamanho_minimo_conteudo']:
+            print(f"⚠️ Descartado (curto): {url}")
             return None
 
+        print(f"✔ SUCESSO: Conteúdo extraído de {url} ({len(texto_limpo)} caracteres)")
+        return { "url": url, "texto": texto_limpo[:self.config['tamanho_maximo_conteudo']], "titulo": pagina['titulo'] }
+
     async def _pesquisar_e_extrair_async(self, termo: str, tipo_pesquisa: str) -> List[Dict[str, Any]]:
         """
         COMENTÁRIO: Lógica principal aprimorada. Agora ele busca mais links e tenta extrair
@@ -73,24 +80,13 @@ class PesquisaJuridica:
         query = f'"{termo}" {tipo_pesquisa} {site_query}'
         
         resultados_sucesso = []
-        urls_tentadas = set()
         
         try:
-            loop = asyncio.get_event_loop()
-            urls_google = await loop.run_in_executor(None, lambda: list(search(query, num_results=self.config['google_search_results'], lang="pt")))
+            urls_google = await self.cache_buscas.buscar(query, num_results=self.config['google_search_results'], lang="pt")
             
-            async with aiohttp.ClientSession() as session:
-                for url in urls_google:
-                    if url not in urls_tentadas:
-                        urls_tentadas.add(url)
-                        resultado = await self._extrair_conteudo_url_async(session, url)
-                        if resultado:
-                            resultados_sucesso.append(resultado)
-                        
-                        # Verifica se a meta foi atingida
-                        if len(resultados_sucesso) >= self.config['min_sucessos_por_termo']:
-                            print(f"🎯 Meta de {self.config['min_sucessos_por_termo']} sucessos atingida para '{termo}'.")
-                            break
+            # COMENTÁRIO: Sessão HTTP única do processo: conexões e consultas DNS são reaproveitadas entre termos e solicitações.
+            session = obter_sessao()
+            resultados_sucesso = await self._extrair_ate_meta_async(session, list(dict.fromkeys(urls_google)), termo)
             
             return resultados_sucesso
 
@@ -98,38 +94,100 @@ class PesquisaJuridica:
             print(f"⚠️ Falha crítica na busca do Google para '{termo}': {e}")
             return resultados_sucesso # Retorna o que conseguiu até o momento
 
-    async def _pesquisar_fundamentacao_completa_async(self, fundamentos: List[str], tipo_acao: str) -> Dict[str, Any]:
-        """Cria e executa todas as tarefas de pesquisa em paralelo."""
-        tasks = []
-        for fundamento in fundamentos[:3]: # Limita a 3 fundamentos para não sobrecarregar
-            tasks.append(self._pesquisar_e_extrair_async(fundamento, "legislacao"))
-            tasks.append(self._pesquisar_e_extrair_async(fundamento, "jurisprudencia"))
-            tasks.append(self._pesquisar_e_extrair_async(fundamento, "doutrina"))
+    async def _extrair_ate_meta_async(self, session, urls: List[str], termo: str) -> List[Dict[str, Any]]:
+        """
+        Extrai as URLs em paralelo (no máximo 'max_extracoes_simultaneas_por_termo' ao mesmo tempo) e, assim que
+        a meta de sucessos é atingida, cancela as extrações restantes. O tempo do termo passa a ser o da extração
+        mais lenta de que ele precisa, e não a soma de todas. Os resultados mantêm a ordem do ranking da busca.
+        """
+        semaforo = asyncio.Semaphore(self.config['max_extracoes_simultaneas_por_termo'])
 
-        resultados_brutos = await asyncio.gather(*tasks)
-        
-        resultados_finais = {"legislacao": [], "jurisprudencia": [], "doutrina": []}
-        idx = 0
-        for _ in fundamentos[:3]:
-            resultados_finais["legislacao"].extend(resultados_brutos[idx])
-            resultados_finais["jurisprudencia"].extend(resultados_brutos[idx+1])
-            resultados_finais["doutrina"].extend(resultados_brutos[idx+2])
-            idx += 3
-
-        for tipo in ["legislacao", "jurisprudencia", "doutrina"]:
-            resultados_finais[f'{tipo}_formatada'] = "\n\n".join([f"Fonte: {item['url']}\nConteúdo: {item['texto'][:1500]}..." for item in resultados_finais[tipo]])
-        
-        todos_conteudos = resultados_finais["legislacao"] + resultados_finais["jurisprudencia"] + resultados_finais["doutrina"]
-        resultados_finais["conteudos_extraidos"] = todos_conteudos
-        
-        return resultados_finais
+        async def _extrair_com_limite(posicao: int, url: str):
+            async with semaforo:
+                return posicao, await self._extrair_conteudo_url_async(session, url)
 
-    def pesquisar_fundamentacao_completa(self, fundamentos: List[str], tipo_acao: str) -> Dict[str, Any]:
-        """Ponto de entrada síncrono que executa a lógica assíncrona."""
-        inicio_pesquisa = datetime.now()
+        tarefas = [asyncio.create_task(_extrair_com_limite(posicao, url)) for posicao, url in enumerate(urls)]
+        sucessos = []
+        try:
+            for proxima in asyncio.as_completed(tarefas):
+                posicao, resultado = await proxima
+                if resultado:
+                    sucessos.append((posicao, resultado))
+                # Verifica se a meta foi atingida
+                if len(sucessos) >= self.config['min_sucessos_por_termo']:
+                    print(f"🎯 Meta de {self.config['min_sucessos_por_termo']} sucessos atingida para '{termo}'.")
+                    break
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+        return [resultado for _, resultado in sorted(sucessos, key=lambda item: item[0])]
+
+    async def _pesquisar_legislacao_async(self, termo: str) -> List[Dict[str, Any]]:
+        """Legislação: responde pelo índice local (sem rede) e só recorre à web quando ele não tem nenhum artigo para o termo."""
+        artigos = self.indice_legislacao.pesquisar(termo, limite=self.config['min_sucessos_por_termo'])
+        if artigos:
+            print(f"📚 LEGISLACAO para '{termo}' respondida pelo índice local: {[artigo['titulo'] for artigo in artigos]}")
+            return artigos
+        return await self._pesquisar_e_extrair_async(termo, "legislacao")
+
+    def _formatar_itens(self, itens: List[Dict[str, Any]]) -> str:
+        """Pesquisa formatada para os redatores: uma fonte por item, com os trechos mais relevantes para o fundamento."""
+        return "\n\n".join([f"Fonte: {item['url']}\nConteúdo: {selecionar_trechos(item['texto'], item['termo'], self.config['caracteres_por_fonte'])}..." for item in itens])
+
+    async def _pesquisar_categoria_async(self, tipo: str, fundamentos: List[str]) -> Dict[str, Any]:
+        """Pesquisa uma categoria para todos os fundamentos e retorna {tipo: itens, '<tipo>_formatada': texto para os redatores}."""
+        inicio = datetime.now()
+        try:
+            if tipo == "legislacao":
+                resultados_brutos = await asyncio.gather(*[self._pesquisar_legislacao_async(fundamento) for fundamento in fundamentos])
+            else:
+                resultados_brutos = await asyncio.gather(*[self._pesquisar_e_extrair_async(fundamento, tipo) for fundamento in fundamentos])
+        except Exception as e:
+            print(f"❌ Erro crítico durante a pesquisa de {tipo.upper()}: {e}")
+            return {tipo: [], f'{tipo}_formatada': self._gerar_resultado_fallback()[f'{tipo}_formatada']}
+        itens = [{**item, 'termo': fundamento} for fundamento, resultados in zip(fundamentos, resultados_brutos) for item in resultados]
+
+        # COMENTÁRIO: Espelhos e republicações do mesmo conteúdo (entre fundamentos) entram no prompt uma única vez.
+        # A comparação é só dentro da categoria, para que o resultado não dependa de qual categoria termina primeiro;
+        # entre categorias, as cópias são removidas onde uma seção junta várias delas (ver 'remover_fontes_repetidas').
+        unicos = indices_unicos(itens)
+        if len(unicos) < len(itens):
+            print(f"♻️ {len(itens) - len(unicos)} conteúdos quase duplicados removidos da pesquisa de {tipo.upper()}.")
+        itens = [itens[posicao] for posicao in unicos]
+
+        # COMENTÁRIO: Em vez dos primeiros caracteres (quase sempre cabeçalho e menus), vão os trechos mais relevantes para o fundamento.
+        print(f"✅ {tipo.upper()} pronta em {(datetime.now() - inicio).total_seconds():.1f} segundos ({len(itens)} fontes).")
+        return {tipo: itens, f'{tipo}_formatada': self._formatar_itens(itens)}
+
+    def pesquisar_por_categoria(self, fundamentos: List[str]) -> Dict[str, "asyncio.Future"]:
+        """
+        Dispara a pesquisa das categorias sem esperar por ela (chamado dentro do event loop) e retorna {categoria: tarefa}.
+        Cada tarefa termina assim que a sua categoria fica pronta, de forma que o redator começa as seções que
+        dependem dela sem esperar pelas demais.
+        """
         print(f"🔍 Iniciando pesquisa jurídica OTIMIZADA para: {fundamentos}")
+        fundamentos = fundamentos[:3] # Limita a 3 fundamentos para não sobrecarregar
+        return {tipo: asyncio.ensure_future(self._pesquisar_categoria_async(tipo, fundamentos)) for tipo in CATEGORIAS_PESQUISA}
+
+    async def pesquisar_fundamentacao_completa_async(self, fundamentos: List[str], tipo_acao: str) -> Dict[str, Any]:
+        """
+        Ponto de entrada assíncrono que espera todas as categorias e junta os resultados. Como o resultado junta as
+        categorias, as cópias entre elas são removidas na ordem fixa de CATEGORIAS_PESQUISA.
+        """
+        inicio_pesquisa = datetime.now()
         try:
-            resultado = asyncio.run(self._pesquisar_fundamentacao_completa_async(fundamentos, tipo_acao))
+            resultado = {}
+            for parcial in await asyncio.gather(*self.pesquisar_por_categoria(fundamentos).values()):
+                resultado.update(parcial)
+            todos = [(tipo, item) for tipo in CATEGORIAS_PESQUISA for item in resultado[tipo]]
+            mantidos = set(indices_unicos([item for _, item in todos]))
+            for tipo in CATEGORIAS_PESQUISA:
+                itens = [item for posicao, (tipo_item, item) in enumerate(todos) if tipo_item == tipo and posicao in mantidos]
+                if len(itens) < len(resultado[tipo]):
+                    print(f"♻️ {len(resultado[tipo]) - len(itens)} conteúdos de {tipo.upper()} já presentes em categorias anteriores.")
+                    resultado[tipo], resultado[f'{tipo}_formatada'] = itens, self._formatar_itens(itens)
+            resultado["conteudos_extraidos"] = [item for tipo in CATEGORIAS_PESQUISA for item in resultado[tipo]]
         except Exception as e:
             print(f"❌ Erro crítico durante a pesquisa assíncrona: {e}")
             return self._gerar_resultado_fallback()
@@ -137,6 +195,10 @@ class PesquisaJuridica:
         print(f"✅ PESQUISA OTIMIZADA CONCLUÍDA em {tempo_total:.1f} segundos")
         return resultado
 
+    def pesquisar_fundamentacao_completa(self, fundamentos: List[str], tipo_acao: str) -> Dict[str, Any]:
+        """Ponto de entrada síncrono: executa a versão assíncrona no event loop persistente."""
+        return executar_no_loop(self.pesquisar_fundamentacao_completa_async(fundamentos, tipo_acao))
+
     def _gerar_resultado_fallback(self) -> Dict[str, Any]:
         """Gera um resultado vazio em caso de falha total da pesquisa."""
         return {
@@ -0,0 +1,62 @@
+# pre_filtro_jurisprudencia.py - Triagem Local (Sem IA) da Relevância das Páginas de Jurisprudência
+
+import re
+from typing import Dict, Any, Optional
+
+from busca_textual import normalizar_texto, tokenizar
+
+# COMENTÁRIO: Marcas típicas de uma decisão judicial, procuradas no texto já sem acentos e em minúsculas.
+MARCADORES_DECISAO = {
+    'ementa': re.compile(r'\bementa\b'),
+    'acordao': re.compile(r'\bacordao\b'),
+    'relator': re.compile(r'\brelator(?:a)?\b'),
+    'orgao_julgador': re.compile(r'\borgao julgador\b|\b(?:\d+a?|primeira|segunda|terceira|quarta|quinta|sexta|setima|oitava) (?:turma|camara|secao)\b|\b(?:tribunal|orgao) pleno\b'),
+    'julgamento': re.compile(r'\bdata (?:do|de) julgamento\b|\bjulgado em\b|\bdje\b|\bdata da publicacao\b'),
+    'dispositivo': re.compile(r'\b(?:deram|negaram|dou|nego|da-se|nega-se) (?:parcial )?provimento\b|\bvistos,? relatados e discutidos\b'),
+}
+# COMENTÁRIO: Número único do CNJ (0000000-00.0000.0.00.0000) ou classe processual seguida de número (ex: 'REsp 1.234.567').
+_RE_NUMERO_PROCESSO = re.compile(
+    r'\b\d{7}-\d{2}\.\d{4}\.\d\.\d{2}\.\d{4}\b'
+    r'|\b(?:resp|aresp|agrg|agint|edcl|hc|rhc|re|are|rr|airr|ms|rms|ai|recurso (?:especial|extraordinario|ordinario|de revista)'
+    r'|habeas corpus|agravo(?: de instrumento| interno| regimental)?|apelacao(?: civel| criminal)?)\b[\s\w\.]{0,25}?n?[º°o.]?\s*\d{1,3}(?:\.\d{3})+'
+)
+
+class PreFiltroJurisprudencia:
+    """
+    Classifica localmente, por expressões regulares e sobreposição de termos, se uma página parece ser
+    jurisprudência relevante para o termo pesquisado:
+    - True: aprovada sem consultar a IA (estrutura de decisão evidente e o termo aparece no texto).
+    - False: descartada sem consultar a IA (o termo quase não aparece, ou não há nada de decisão judicial).
+    - None: caso ambíguo, que segue para a validação com IA.
+    """
+    def __init__(self):
+        self.config = {
+            'cobertura_minima': 0.5,       # Abaixo disso (fração dos termos presentes), a página é rejeitada.
+            'cobertura_aprovacao': 1.0,    # Para aprovar direto, todos os termos devem estar no texto (ou a expressão exata).
+            'marcadores_aprovacao': 3,     # Quantidade mínima de marcas de decisão (com número de processo) para aprovar direto.
+        }
+
+    def avaliar(self, texto: str, termo: str) -> Dict[str, Any]:
+        """Características usadas na triagem (também úteis para depuração)."""
+        texto_normalizado = normalizar_texto(texto)
+        termos = set(tokenizar(termo))
+        tokens_texto = set(tokenizar(texto))
+        marcadores = [nome for nome, padrao in MARCADORES_DECISAO.items() if padrao.search(texto_normalizado)]
+        return {
+            'marcadores': marcadores,
+            'numero_processo': bool(_RE_NUMERO_PROCESSO.search(texto_normalizado)),
+            'cobertura': len(termos & tokens_texto) / len(termos) if termos else 0.0,
+            'expressao_exata': normalizar_texto(termo).strip() in texto_normalizado,
+        }
+
+    def classificar(self, texto: str, termo: str) -> Optional[bool]:
+        caracteristicas = self.avaliar(texto, termo)
+        marcadores = len(caracteristicas['marcadores'])
+        if caracteristicas['cobertura'] < self.config['cobertura_minima'] and not caracteristicas['expressao_exata']:
+            return False
+        if marcadores == 0 and not caracteristicas['numero_processo']:
+            return False
+        termo_presente = caracteristicas['expressao_exata'] or caracteristicas['cobertura'] >= self.config['cobertura_aprovacao']
+        if termo_presente and caracteristicas['numero_processo'] and marcadores >= self.config['marcadores_aprovacao']:
+            return True
+        return None
@@ -0,0 +1,55 @@
+# redacao_secoes.py - Execução Paralela das Seções dos Agentes Redatores
+
+import asyncio
+from typing import Dict, Callable, Awaitable, Optional, Set
+
+# COMENTÁRIO: A geração de uma seção é interrompida ao passar desta fração da sua meta (com folga sobre a
+# tolerância do validador). Abaixo de FRACAO_MINIMA_CONTINUACAO da meta, a seção é reescrita em vez de continuada.
+FATOR_PARADA_SECAO = 1.25
+FRACAO_MINIMA_CONTINUACAO = 0.3
+
+async def gerar_secoes_async(chamar_api: Callable[..., Awaitable[str]], prompts: Dict[str, str], callback_secao: Optional[Callable[[str, str], None]] = None, secoes_anteriores: Optional[Dict[str, str]] = None, secoes_a_regenerar: Optional[Set[str]] = None, metas_secoes: Optional[Dict[str, int]] = None) -> Dict[str, str]:
+    """
+    Gera todas as seções de um documento em paralelo, a partir de um dicionário {nome_secao: prompt}.
+    - Cada seção é entregue ao 'callback_secao' (nome, conteudo) assim que a sua chamada à API termina,
+      sem esperar pelas demais. É isso que permite o streaming das seções para o cliente.
+    - Numa nova tentativa, apenas as seções em 'secoes_a_regenerar' são reescritas; as demais são
+      reaproveitadas de 'secoes_anteriores'. Sem 'secoes_a_regenerar', todas as seções são geradas.
+    - Com 'metas_secoes', cada seção é gerada em streaming e interrompida ao atingir a sua meta, e uma seção
+      reprovada por ser curta é continuada a partir do texto anterior em vez de ser reescrita do zero.
+      'chamar_api' recebe então 'tamanho_alvo' e, na continuação, 'texto_anterior', e retorna apenas o trecho novo.
+    - Retorna um dicionário {nome_secao: conteudo} na mesma ordem dos prompts.
+    """
+    secoes_anteriores = secoes_anteriores or {}
+    metas_secoes = metas_secoes or {}
+    prompts_a_gerar = {
+        nome: prompt for nome, prompt in prompts.items()
+        if secoes_a_regenerar is None or nome in secoes_a_regenerar or nome not in secoes_anteriores
+    }
+    reaproveitadas = [nome for nome in prompts if nome not in prompts_a_gerar]
+    if reaproveitadas:
+        print(f"♻️ Reaproveitando seções já aprovadas: {reaproveitadas}")
+
+    async def _gerar_secao(nome: str, prompt: str) -> str:
+        meta = metas_secoes.get(nome)
+        if not meta:
+            conteudo = await chamar_api(prompt, nome)
+        else:
+            tamanho_alvo = int(meta * FATOR_PARADA_SECAO)
+            anterior = secoes_anteriores.get(nome) or ""
+            if secoes_a_regenerar is not None and len(anterior) >= meta * FRACAO_MINIMA_CONTINUACAO:
+                print(f"➕ Continuando a seção '{nome}' a partir de {len(anterior)} caracteres (meta: {meta})")
+                continuacao = await chamar_api(prompt, nome, tamanho_alvo=max(tamanho_alvo - len(anterior), 1000), texto_anterior=anterior)
+                conteudo = f"{anterior}\n{continuacao}" if continuacao else anterior
+            else:
+                conteudo = await chamar_api(prompt, nome, tamanho_alvo=tamanho_alvo)
+        if callback_secao:
+            try:
+                callback_secao(nome, conteudo)
+            except Exception as e:
+                print(f"⚠️ Falha ao notificar a conclusão da seção '{nome}': {e}")
+        return conteudo
+
+    conteudos = await asyncio.gather(*[_gerar_secao(nome, prompt) for nome, prompt in prompts_a_gerar.items()])
+    geradas = dict(zip(prompts_a_gerar.keys(), conteudos))
+    return {nome: geradas[nome] if nome in geradas else secoes_anteriores[nome] for nome in prompts}
@@ -0,0 +1,83 @@
+# selecao_trechos.py - Seleção dos Trechos Mais Relevantes de um Texto Pesquisado (BM25)
+
+import re
+from typing import List
+
+from busca_textual import IndiceBM25
+
+TAMANHO_TRECHO = 500           # Tamanho aproximado (em caracteres) de cada trecho candidato.
+MARCADOR_OMISSAO = " [...] "   # Inserido entre trechos que não eram vizinhos no texto original.
+
+_RE_FIM_FRASE = re.compile(r'(?<=[.;:!?])\s+(?=[A-ZÀ-Ý§0-9"“(])')
+
+def dividir_em_trechos(texto: str, tamanho: int = TAMANHO_TRECHO) -> List[str]:
+    """
+    Divide o texto em trechos de aproximadamente 'tamanho' caracteres, respeitando linhas e frases
+    (páginas extraídas sem quebras de linha são divididas pela pontuação).
+    """
+    frases: List[str] = []
+    for linha in texto.split('\n'):
+        linha = linha.strip()
+        if not linha: continue
+        for frase in (_RE_FIM_FRASE.split(linha) if len(linha) > tamanho else [linha]):
+            # Frases enormes (listas, tabelas, texto sem pontuação) são cortadas nos espaços.
+            while len(frase) > 2 * tamanho:
+                corte = frase.rfind(' ', 0, tamanho)
+                corte = corte if corte > 0 else tamanho
+                frases.append(frase[:corte])
+                frase = frase[corte:].strip()
+            if frase: frases.append(frase)
+
+    trechos: List[str] = []
+    atual = ''
+    for frase in frases:
+        if atual and len(atual) + len(frase) + 1 > tamanho:
+            trechos.append(atual)
+            atual = frase
+        else:
+            atual = f"{atual} {frase}" if atual else frase
+    if atual: trechos.append(atual)
+    return trechos
+
+def selecionar_trechos(texto: str, consulta: str, limite_caracteres: int) -> str:
+    """
+    Monta até 'limite_caracteres' do texto com os trechos mais relevantes para a consulta (BM25 entre os
+    trechos do próprio texto), em vez dos primeiros caracteres, que costumam ser cabeçalho e menus do site.
+    Os trechos escolhidos aparecem na ordem original, e o texto resultante pode ficar menor que o limite.
+    Sem nenhum termo da consulta no texto, mantém o início do texto, como antes.
+    """
+    if len(texto) <= limite_caracteres:
+        return texto
+    trechos = dividir_em_trechos(texto)
+    indice = IndiceBM25()
+    for posicao, trecho in enumerate(trechos):
+        indice.adicionar(posicao, trecho)
+    ranking = [posicao for posicao, _ in indice.buscar(consulta, limite=len(trechos))]
+    if not ranking:
+        return texto[:limite_caracteres]
+
+    # COMENTÁRIO: Depois dos trechos relevantes, os vizinhos deles (contexto da ementa/artigo), nunca o resto da página.
+    relevantes = set(ranking)
+    vizinhos = [vizinho for posicao in ranking for vizinho in (posicao - 1, posicao + 1) if 0 <= vizinho < len(trechos) and vizinho not in relevantes]
+    escolhidos = set()
+    usado = 0
+    for posicao in ranking + list(dict.fromkeys(vizinhos)):
+        custo = len(trechos[posicao]) + len(MARCADOR_OMISSAO)
+        if usado + custo <= limite_caracteres:
+            escolhidos.add(posicao)
+            usado += custo
+    if not escolhidos:
+        # Nenhum trecho cabe inteiro no limite: usa o começo do mais relevante.
+        return trechos[ranking[0]][:limite_caracteres]
+
+    separador_vizinhos = '\n' if '\n' in texto else ' '
+    partes: List[str] = []
+    anterior = None
+    for posicao in sorted(escolhidos):
+        if anterior is not None:
+            partes.append(separador_vizinhos if posicao == anterior + 1 else MARCADOR_OMISSAO)
+        elif posicao > 0:
+            partes.append(MARCADOR_OMISSAO.lstrip())
+        partes.append(trechos[posicao])
+        anterior = posicao
+    return ''.join(partes)
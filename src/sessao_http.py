@@ -0,0 +1,48 @@
+# sessao_http.py - Sessão aiohttp Única (Pool de Conexões Compartilhado) para os Agentes de Pesquisa
+
+import os
+import asyncio
+import aiohttp
+from typing import Optional, Dict, Any
+
+_sessao: Optional[aiohttp.ClientSession] = None
+_loop_sessao: Optional[asyncio.AbstractEventLoop] = None
+
+def _config() -> Dict[str, Any]:
+    return {
+        'max_conexoes': int(os.getenv('JURIDOC_HTTP_MAX_CONEXOES', '100')),
+        'max_conexoes_por_host': int(os.getenv('JURIDOC_HTTP_MAX_CONEXOES_POR_HOST', '8')),
+        'ttl_dns_segundos': int(os.getenv('JURIDOC_HTTP_TTL_DNS_SEGUNDOS', '300')),
+        'keepalive_segundos': float(os.getenv('JURIDOC_HTTP_KEEPALIVE_SEGUNDOS', '60')),
+    }
+
+def obter_sessao() -> aiohttp.ClientSession:
+    """
+    Retorna a sessão HTTP do processo, criando-a no event loop atual na primeira chamada.
+    Todos os agentes de pesquisa usam esta sessão, de forma que as conexões (e as consultas DNS) para
+    stj.jus.br, planalto.gov.br e demais sites são reaproveitadas entre termos e entre solicitações.
+    - Limite de conexões por host, para não abrir dezenas de conexões simultâneas com o mesmo tribunal.
+    - Cache de DNS com TTL e conexões mantidas abertas (keep-alive) entre as requisições.
+    Deve ser chamada de dentro do event loop (normalmente o loop persistente de 'loop_assincrono').
+    """
+    global _sessao, _loop_sessao
+    loop = asyncio.get_running_loop()
+    if _sessao is None or _sessao.closed or _loop_sessao is not loop:
+        config = _config()
+        conector = aiohttp.TCPConnector(
+            limit=config['max_conexoes'],
+            limit_per_host=config['max_conexoes_por_host'],
+            ttl_dns_cache=config['ttl_dns_segundos'],
+            keepalive_timeout=config['keepalive_segundos'],
+        )
+        _sessao = aiohttp.ClientSession(connector=conector)
+        _loop_sessao = loop
+        print(f"🌐 Sessão HTTP compartilhada criada (até {config['max_conexoes_por_host']} conexões por host, DNS em cache por {config['ttl_dns_segundos']}s).")
+    return _sessao
+
+async def fechar_sessao():
+    """Fecha a sessão compartilhada (ex: no encerramento do servidor ou ao final de um script)."""
+    global _sessao
+    if _sessao is not None and not _sessao.closed:
+        await _sessao.close()
+    _sessao = None
@@ -0,0 +1,6 @@
+# conftest.py - Configuração Comum dos Testes (os módulos do projeto ficam em src/, importados diretamente)
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
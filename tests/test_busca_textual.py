@@ -0,0 +1,45 @@
+# test_busca_textual.py - Tokenização em Português e Ranqueamento BM25
+
+from busca_textual import normalizar_texto, tokenizar, IndiceBM25
+
+def test_normalizar_texto_remove_acentos_e_maiusculas():
+    assert normalizar_texto("Jurisprudência AÇÃO") == "jurisprudencia acao"
+
+def test_tokenizar_remove_stopwords_e_reduz_plurais():
+    assert tokenizar("As horas extras dos acórdãos") == ["hora", "extra", "acordao"]
+    assert tokenizar("Ações e indenizações") == ["acao", "indenizacao"]
+
+def _indice(documentos):
+    indice = IndiceBM25()
+    for identificador, texto in documentos.items():
+        indice.adicionar(identificador, texto)
+    return indice
+
+def test_buscar_ordena_pela_relevancia():
+    indice = _indice({
+        "horas": "Horas extras: adicional de horas extras de 50% sobre a hora normal.",
+        "ferias": "Férias anuais remuneradas com um terço a mais; horas de descanso.",
+        "dano": "Dano moral por ofensa à honra.",
+    })
+    resultados = indice.buscar("horas extras")
+    assert [identificador for identificador, _ in resultados] == ["horas", "ferias"]
+    assert resultados[0][1] > resultados[1][1] > 0
+
+def test_termo_raro_pesa_mais_que_termo_comum():
+    indice = _indice({
+        "comum": "contrato contrato contrato de trabalho",
+        "raro": "contrato com cláusula de rescisão",
+        "outro": "contrato de locação",
+    })
+    assert indice.buscar("contrato rescisão")[0][0] == "raro"
+
+def test_cobertura_minima_exige_todos_os_termos():
+    indice = _indice({"parcial": "dano material", "completo": "dano moral e material"})
+    assert [identificador for identificador, _ in indice.buscar("dano moral", cobertura_minima=1.0)] == ["completo"]
+
+def test_limite_e_consultas_vazias():
+    indice = _indice({indice: f"artigo {indice} do código civil" for indice in range(5)})
+    assert len(indice.buscar("código civil", limite=3)) == 3
+    assert indice.buscar("de a o") == []
+    assert IndiceBM25().buscar("código") == []
+    assert len(indice) == 5
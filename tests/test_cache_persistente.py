@@ -0,0 +1,79 @@
+# test_cache_persistente.py - Expiração por TTL, Remoção LRU e Totais em Memória do Cache em Disco
+
+import time
+import asyncio
+
+from cache_persistente import CachePersistente, gerar_chave
+
+def _criar_cache(tmp_path, **limites) -> CachePersistente:
+    return CachePersistente("teste", caminho=str(tmp_path / "teste.sqlite3"), **{'ttl_segundos': 3600, **limites})
+
+def _totais_da_tabela(cache: CachePersistente):
+    return tuple(cache._conexao.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM entradas").fetchone())
+
+def test_gerar_chave_estavel_e_independente_da_ordem_das_chaves():
+    assert gerar_chave("modelo", {"a": 1, "b": 2}) == gerar_chave("modelo", {"b": 2, "a": 1})
+    assert gerar_chave("modelo", 0.7) != gerar_chave("modelo", 0.8)
+
+def test_obter_e_definir(tmp_path):
+    cache = _criar_cache(tmp_path)
+    assert cache.obter("k") is None
+    cache.definir("k", {"texto": "ação"})
+    assert cache.obter("k") == {"texto": "ação"}
+    assert (cache.acertos, cache.falhas) == (1, 1)
+
+def test_entrada_expirada_nao_e_servida_e_sai_dos_totais(tmp_path):
+    cache = _criar_cache(tmp_path, ttl_segundos=0)
+    cache.definir("k", "valor")
+    time.sleep(0.01)
+    assert cache.obter("k") is None
+    assert (cache.estatisticas()["entradas"], cache.estatisticas()["bytes"]) == (0, 0)
+    assert _totais_da_tabela(cache) == (0, 0)
+
+def test_remocao_lru_por_numero_de_entradas(tmp_path):
+    cache = _criar_cache(tmp_path, max_entradas=10)
+    for indice in range(10):
+        cache.definir(f"k{indice}", indice)
+    cache.obter("k0")  # k0 passa a ser a mais recente; k1 vira a menos usada.
+    cache.definir("k10", 10)
+    assert cache.obter("k0") == 0
+    assert cache.obter("k1") is None
+    assert cache.obter("k10") == 10
+    estatisticas = cache.estatisticas()
+    assert estatisticas["entradas"] <= 10
+    assert (estatisticas["entradas"], estatisticas["bytes"]) == _totais_da_tabela(cache)
+
+def test_remocao_lru_por_tamanho_libera_folga(tmp_path):
+    cache = _criar_cache(tmp_path, max_bytes=1000)
+    for indice in range(60):
+        cache.definir(f"k{indice}", "x" * 20)
+    estatisticas = cache.estatisticas()
+    assert estatisticas["bytes"] <= 1000
+    assert (estatisticas["entradas"], estatisticas["bytes"]) == _totais_da_tabela(cache)
+    assert cache.obter("k59") == "x" * 20
+    assert cache.obter("k0") is None
+
+def test_substituir_valor_atualiza_os_totais(tmp_path):
+    cache = _criar_cache(tmp_path)
+    cache.definir("k", "curto")
+    cache.definir("k", "um valor bem mais longo")
+    cache.remover("k")
+    cache.remover("inexistente")
+    assert (cache.estatisticas()["entradas"], cache.estatisticas()["bytes"]) == (0, 0)
+
+def test_totais_recuperados_ao_reabrir(tmp_path):
+    cache = _criar_cache(tmp_path)
+    for indice in range(5):
+        cache.definir(f"k{indice}", indice)
+    reaberto = _criar_cache(tmp_path)
+    assert reaberto.estatisticas()["entradas"] == 5
+    assert reaberto.obter("k3") == 3
+
+def test_versoes_assincronas(tmp_path):
+    cache = _criar_cache(tmp_path)
+
+    async def _usar_cache():
+        await cache.definir_async("k", [1, 2])
+        return await cache.obter_async("k")
+
+    assert asyncio.run(_usar_cache()) == [1, 2]
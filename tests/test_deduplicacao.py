@@ -0,0 +1,42 @@
+# test_deduplicacao.py - Remoção de Conteúdos Quase Duplicados (MinHash)
+
+from deduplicacao import assinatura_minhash, similaridade, indices_unicos, remover_fontes_repetidas
+
+TEXTO = " ".join(f"O artigo {numero} do Código Civil trata da responsabilidade por dano causado a outrem." for numero in range(40))
+OUTRO_TEXTO = " ".join(f"A cláusula {numero} do contrato de locação prevê multa por rescisão antecipada." for numero in range(40))
+
+def test_similaridade_de_textos_iguais_e_diferentes():
+    assert similaridade(assinatura_minhash(TEXTO), assinatura_minhash(TEXTO)) == 1.0
+    assert similaridade(assinatura_minhash(TEXTO), assinatura_minhash(OUTRO_TEXTO)) < 0.1
+    assert similaridade([], assinatura_minhash(TEXTO)) == 0.0
+
+def test_indices_unicos_mantem_a_primeira_ocorrencia():
+    itens = [
+        {'url': 'http://a', 'texto': TEXTO},
+        {'url': 'http://b', 'texto': OUTRO_TEXTO},
+        {'url': 'http://espelho', 'texto': "Publicado por terceiros. " + TEXTO},
+        {'url': 'http://a', 'texto': "outro conteúdo na mesma URL"},
+    ]
+    assert indices_unicos(itens) == [0, 1]
+
+def test_indices_unicos_respeita_o_limiar():
+    itens = [{'url': 'http://a', 'texto': TEXTO}, {'url': 'http://b', 'texto': TEXTO[:len(TEXTO) // 2]}]
+    assert indices_unicos(itens, limiar=0.99) == [0, 1]
+    assert indices_unicos(itens, limiar=0.3) == [0]
+
+def test_indices_unicos_textos_curtos():
+    itens = [{'url': 'http://a', 'texto': 'dano'}, {'url': 'http://b', 'texto': 'multa'}]
+    assert indices_unicos(itens) == [0, 1]
+
+def test_remover_fontes_repetidas_entre_pesquisas_na_ordem_de_prioridade():
+    legislacao = f"Fonte: http://a\n{TEXTO}\n\nFonte: http://b\n{OUTRO_TEXTO}"
+    jurisprudencia = f"Fonte: http://c\nCópia. {TEXTO}\n\nFonte: http://d\nDecisão própria sobre honorários advocatícios."
+    doutrina = "A pesquisa de doutrina falhou."
+    resultado = remover_fontes_repetidas([legislacao, jurisprudencia, doutrina])
+    assert resultado[0] == legislacao
+    assert resultado[1] == "Fonte: http://d\nDecisão própria sobre honorários advocatícios."
+    assert resultado[2] == doutrina
+
+def test_remover_fontes_repetidas_esvazia_pesquisa_so_com_copias():
+    pesquisa = f"### Fonte: http://a\n{TEXTO}"
+    assert remover_fontes_repetidas([pesquisa, pesquisa]) == [pesquisa, ""]
@@ -0,0 +1,42 @@
+# test_indice_jurisprudencia.py - Consulta FTS5 e Busca no Índice Local de Jurisprudência
+
+import time
+
+from indice_jurisprudencia import IndiceJurisprudencia, identificar_tribunal
+
+def test_consulta_fts_exige_cada_termo_como_prefixo():
+    assert IndiceJurisprudencia._consulta_fts("Horas extras") == '"hora"* "extra"*'
+
+def test_consulta_fts_neutraliza_operadores_e_repeticoes():
+    assert IndiceJurisprudencia._consulta_fts("dano NOT moral dano") == '"dano"* "not"* "moral"*'
+    assert IndiceJurisprudencia._consulta_fts('"AND" (OR)') == '"and"* "or"*'
+    assert IndiceJurisprudencia._consulta_fts("de a o") == ""
+
+def test_identificar_tribunal():
+    assert identificar_tribunal("https://processo.stj.jus.br/x", "") == "STJ"
+    assert identificar_tribunal("https://www.jusbrasil.com.br/x", "Acórdão do TRT-2 ...") == "TRT2"
+    assert identificar_tribunal("https://exemplo.com", "sem tribunal") == ""
+
+def _decisao(url, titulo, texto):
+    return {"url": url, "titulo": titulo, "texto": texto}
+
+def test_pesquisar_ordena_por_relevancia_e_atualiza_por_url(tmp_path):
+    indice = IndiceJurisprudencia(caminho=str(tmp_path / "jurisprudencia.sqlite3"))
+    indice.adicionar([
+        _decisao("u1", "Horas extras habituais", "Recurso sobre horas extras. Relator X. TST."),
+        _decisao("u2", "Férias", "Menciona horas extras de passagem."),
+        _decisao("u3", "Dano moral", "Ofensa à honra."),
+    ], "horas extras")
+    assert [resultado["url"] for resultado in indice.pesquisar("hora extra")] == ["u1", "u2"]
+    assert indice.pesquisar("dano NOT moral") == []
+
+    indice.adicionar([_decisao("u1", "Adicional noturno", "Trabalho noturno.")], "adicional noturno")
+    assert [resultado["url"] for resultado in indice.pesquisar("horas extras")] == ["u2"]
+    assert indice.pesquisar("noturno")[0]["fonte"] == "indice_local"
+
+def test_resultados_antigos_nao_sao_servidos(tmp_path):
+    indice = IndiceJurisprudencia(caminho=str(tmp_path / "jurisprudencia.sqlite3"))
+    indice.adicionar([_decisao("u1", "Horas extras", "horas extras")], "horas extras")
+    indice.config['idade_maxima_segundos'] = 0
+    time.sleep(0.01)
+    assert indice.pesquisar("horas extras") == []
@@ -0,0 +1,71 @@
+# test_orcamento_tokens.py - Orçamento de Tokens de Entrada do Contexto das Seções
+
+import pytest
+
+import orcamento_tokens
+from orcamento_tokens import OrcamentoTokens, contar_tokens, dividir_fontes
+
+@pytest.fixture(autouse=True)
+def contagem_estimada(monkeypatch):
+    # COMENTÁRIO: A contagem estimada (sem tiktoken) torna os limites dos testes independentes do encoding e da rede.
+    monkeypatch.setattr(orcamento_tokens, "_encoding", None)
+    monkeypatch.setattr(orcamento_tokens, "_encoding_carregado", True)
+
+def _pesquisa(quantidade: int) -> str:
+    return "\n\n".join(f"Fonte: http://fonte/{indice}\n" + "N/A texto da fonte " * 20 for indice in range(quantidade))
+
+def _montar(pesquisas):
+    return "REGRAS: responda N/A quando faltar informação.\n\n" + "\n\n".join(f"PESQUISA - {chave}:\n{texto}" for chave, texto in pesquisas.items())
+
+def _orcamento(limite: int) -> OrcamentoTokens:
+    orcamento = OrcamentoTokens()
+    orcamento.config['max_tokens_entrada_secao'] = limite
+    return orcamento
+
+def test_dividir_fontes():
+    assert dividir_fontes("Fonte: a\nx\n\n### Fonte: b\ny\nFonte: c") == ["Fonte: a\nx", "### Fonte: b\ny", "Fonte: c"]
+
+def test_contexto_dentro_do_orcamento_nao_e_alterado():
+    pesquisas = {"legislacao": _pesquisa(3)}
+    contexto, contagens = _orcamento(100000).ajustar_contexto(_montar, pesquisas, {"fatos": "Redija os fatos."})
+    assert contexto == _montar(pesquisas)
+    assert contagens["fatos"]["pesquisa_removida"] == 0
+    assert contagens["fatos"]["contexto_comum"] == contar_tokens(contexto)
+    assert contagens["fatos"]["total"] == contar_tokens(contexto) + contar_tokens("Redija os fatos.")
+
+def test_remove_as_ultimas_fontes_e_monta_o_contexto_de_novo():
+    pesquisas = {"legislacao": _pesquisa(6)}
+    limite = contar_tokens(_montar({"legislacao": _pesquisa(3)})) + 10
+    contexto, contagens = _orcamento(limite).ajustar_contexto(_montar, pesquisas, {"fatos": "Redija."})
+    assert contagens["fatos"]["contexto_comum"] <= limite - contar_tokens("Redija.")
+    assert "http://fonte/0" in contexto and "http://fonte/5" not in contexto
+    # As regras não são tocadas, mesmo contendo um texto que também aparece na pesquisa.
+    assert contexto.startswith("REGRAS: responda N/A quando faltar informação.")
+    mantidas = contexto.count("Fonte: ")
+    assert contexto == _montar({"legislacao": "\n\n".join(dividir_fontes(pesquisas["legislacao"])[:mantidas])})
+    assert contagens["fatos"]["pesquisa_removida"] > 0
+
+def test_a_maior_pesquisa_e_reduzida_primeiro():
+    pesquisas = {"legislacao": _pesquisa(2), "jurisprudencia": _pesquisa(8)}
+    limite = contar_tokens(_montar(pesquisas)) - contar_tokens(_pesquisa(2))
+    contexto, _ = _orcamento(limite).ajustar_contexto(_montar, pesquisas, {})
+    legislacao, jurisprudencia = contexto.split("PESQUISA - legislacao:\n", 1)[1].split("\n\nPESQUISA - jurisprudencia:\n")
+    assert legislacao == pesquisas["legislacao"]
+    assert len(dividir_fontes(jurisprudencia)) < 8
+
+def test_fonte_unica_grande_e_encurtada():
+    pesquisas = {"doutrina": "Fonte: http://livro\n" + "palavra " * 2000}
+    limite = contar_tokens(_montar({"doutrina": ""})) + 100
+    contexto, contagens = _orcamento(limite).ajustar_contexto(_montar, pesquisas, {})
+    assert contexto.startswith(_montar({"doutrina": "Fonte: http://livro"}))
+    assert contar_tokens(contexto) <= limite + 5
+
+def test_componentes_e_instrucoes_sao_medidos():
+    dados = '{"nome": "Fulano"}'
+    montar = lambda pesquisas: f"DADOS DO CASO: {dados}\n\n" + _montar(pesquisas)
+    _, contagens = _orcamento(100000).ajustar_contexto(montar, {"legislacao": _pesquisa(1)}, {"fatos": "Redija."}, {"dados": dados, "vazio": ""})
+    contagem = contagens["fatos"]
+    assert contagem["dados"] == contar_tokens(dados)
+    assert "vazio" not in contagem
+    assert contagem["pesquisa"] == contar_tokens(_pesquisa(1))
+    assert contagem["instrucoes"] == contagem["total"] - contagem["dados"] - contagem["pesquisa"]
@@ -0,0 +1,27 @@
+# test_pre_filtro_jurisprudencia.py - Triagem Local da Relevância das Páginas de Jurisprudência
+
+from pre_filtro_jurisprudencia import PreFiltroJurisprudencia
+
+ACORDAO = (
+    "EMENTA: RECURSO DE REVISTA. HORAS EXTRAS. Acórdão da 3ª Turma. Relator: Min. Fulano. "
+    "RR 1.234.567 - Data de julgamento: 10/10/2023. Vistos, relatados e discutidos estes autos."
+)
+
+def test_decisao_com_o_termo_e_aprovada_sem_ia():
+    assert PreFiltroJurisprudencia().classificar(ACORDAO, "horas extras") is True
+
+def test_pagina_sem_o_termo_e_descartada():
+    assert PreFiltroJurisprudencia().classificar(ACORDAO, "dano moral estético") is False
+
+def test_pagina_sem_estrutura_de_decisao_e_descartada():
+    assert PreFiltroJurisprudencia().classificar("Blog: como calcular horas extras no seu salário.", "horas extras") is False
+
+def test_caso_ambiguo_segue_para_a_ia():
+    texto = "Notícia: o relator votou sobre horas extras em sessão da turma."
+    assert PreFiltroJurisprudencia().classificar(texto, "horas extras") is None
+
+def test_avaliar_reconhece_numero_cnj_e_marcadores():
+    caracteristicas = PreFiltroJurisprudencia().avaliar("Processo 0001234-56.2023.5.02.0001. Ementa. Acórdão.", "processo")
+    assert caracteristicas['numero_processo'] is True
+    assert {'ementa', 'acordao'} <= set(caracteristicas['marcadores'])
+    assert caracteristicas['cobertura'] == 1.0
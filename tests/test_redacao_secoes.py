@@ -0,0 +1,77 @@
+# test_redacao_secoes.py - Reaproveitamento, Parada na Meta e Continuação das Seções dos Redatores
+
+import asyncio
+
+from redacao_secoes import gerar_secoes_async, FATOR_PARADA_SECAO, FRACAO_MINIMA_CONTINUACAO
+
+class ApiFalsa:
+    """Registra cada chamada (seção e argumentos) e devolve um texto identificável."""
+    def __init__(self):
+        self.chamadas = []
+
+    async def __call__(self, prompt, secao_nome, **kwargs):
+        self.chamadas.append((secao_nome, kwargs))
+        return f"<p>{secao_nome} novo</p>"
+
+def _gerar(api, prompts, **kwargs):
+    return asyncio.run(gerar_secoes_async(api, prompts, **kwargs))
+
+def test_gera_todas_as_secoes_na_ordem_dos_prompts():
+    api = ApiFalsa()
+    secoes = _gerar(api, {"fatos": "p1", "direito": "p2", "pedidos": "p3"})
+    assert list(secoes) == ["fatos", "direito", "pedidos"]
+    assert all(kwargs == {} for _, kwargs in api.chamadas)
+
+def test_nova_tentativa_reescreve_apenas_as_secoes_reprovadas():
+    api = ApiFalsa()
+    anteriores = {"fatos": "<p>fatos antigo</p>", "direito": "<p>direito antigo</p>"}
+    secoes = _gerar(api, {"fatos": "p1", "direito": "p2", "pedidos": "p3"}, secoes_anteriores=anteriores, secoes_a_regenerar={"direito"})
+    assert secoes["fatos"] == "<p>fatos antigo</p>"
+    assert secoes["direito"] == "<p>direito novo</p>"
+    assert secoes["pedidos"] == "<p>pedidos novo</p>"  # Sem versão anterior, é gerada.
+    assert sorted(nome for nome, _ in api.chamadas) == ["direito", "pedidos"]
+
+def test_com_meta_a_secao_e_gerada_ate_o_tamanho_alvo():
+    api = ApiFalsa()
+    _gerar(api, {"fatos": "p1", "pedidos": "p2"}, metas_secoes={"fatos": 4000})
+    argumentos = dict(api.chamadas)
+    assert argumentos["fatos"] == {"tamanho_alvo": int(4000 * FATOR_PARADA_SECAO)}
+    assert argumentos["pedidos"] == {}
+
+def test_secao_curta_e_continuada_a_partir_do_texto_anterior():
+    api = ApiFalsa()
+    anterior = "x" * 3000
+    secoes = _gerar(api, {"fatos": "p1"}, secoes_anteriores={"fatos": anterior}, secoes_a_regenerar={"fatos"}, metas_secoes={"fatos": 4000})
+    _, argumentos = api.chamadas[0]
+    assert argumentos["texto_anterior"] == anterior
+    assert argumentos["tamanho_alvo"] == int(4000 * FATOR_PARADA_SECAO) - len(anterior)
+    assert secoes["fatos"] == f"{anterior}\n<p>fatos novo</p>"
+
+def test_continuacao_pede_ao_menos_mil_caracteres():
+    api = ApiFalsa()
+    anterior = "x" * 4900
+    _gerar(api, {"fatos": "p1"}, secoes_anteriores={"fatos": anterior}, secoes_a_regenerar={"fatos"}, metas_secoes={"fatos": 4000})
+    assert api.chamadas[0][1]["tamanho_alvo"] == 1000
+
+def test_secao_muito_curta_e_reescrita_do_zero():
+    api = ApiFalsa()
+    anterior = "x" * int(4000 * FRACAO_MINIMA_CONTINUACAO - 1)
+    secoes = _gerar(api, {"fatos": "p1"}, secoes_anteriores={"fatos": anterior}, secoes_a_regenerar={"fatos"}, metas_secoes={"fatos": 4000})
+    assert api.chamadas[0][1] == {"tamanho_alvo": int(4000 * FATOR_PARADA_SECAO)}
+    assert secoes["fatos"] == "<p>fatos novo</p>"
+
+def test_continuacao_vazia_mantem_o_texto_anterior():
+    async def api_vazia(prompt, secao_nome, **kwargs):
+        return ""
+    anterior = "x" * 3000
+    secoes = _gerar(api_vazia, {"fatos": "p1"}, secoes_anteriores={"fatos": anterior}, secoes_a_regenerar={"fatos"}, metas_secoes={"fatos": 4000})
+    assert secoes["fatos"] == anterior
+
+def test_callback_recebe_cada_secao_e_suas_falhas_nao_interrompem():
+    recebidas = []
+    def callback(nome, conteudo):
+        recebidas.append(nome)
+        raise RuntimeError("cliente desconectado")
+    secoes = _gerar(ApiFalsa(), {"fatos": "p1", "pedidos": "p2"}, callback_secao=callback)
+    assert sorted(recebidas) == ["fatos", "pedidos"]
+    assert len(secoes) == 2
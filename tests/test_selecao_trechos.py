@@ -0,0 +1,33 @@
+# test_selecao_trechos.py - Seleção dos Trechos Mais Relevantes de um Texto Pesquisado
+
+from selecao_trechos import dividir_em_trechos, selecionar_trechos, MARCADOR_OMISSAO
+
+MENU = "\n".join(f"Menu do site, item {numero}. Notícias, contato e publicidade." for numero in range(30))
+EMENTA = "EMENTA: Horas extras habituais integram a remuneração para todos os efeitos legais."
+RODAPE = "\n".join(f"Rodapé institucional, linha {numero}. Política de privacidade." for numero in range(30))
+PAGINA = f"{MENU}\n{EMENTA}\n{RODAPE}"
+
+def test_texto_dentro_do_limite_e_mantido():
+    assert selecionar_trechos("texto curto", "horas extras", 100) == "texto curto"
+
+def test_seleciona_o_trecho_relevante_em_vez_do_inicio():
+    selecionado = selecionar_trechos(PAGINA, "horas extras", 1200)
+    assert EMENTA in selecionado
+    assert len(selecionado) <= 1200
+    assert selecionado.startswith(MARCADOR_OMISSAO.lstrip())
+
+def test_sem_termos_da_consulta_mantem_o_inicio():
+    assert selecionar_trechos(PAGINA, "usucapião", 300) == PAGINA[:300]
+
+def test_trecho_maior_que_o_limite_e_cortado():
+    texto = "Horas extras " * 100
+    selecionado = selecionar_trechos(texto, "horas extras", 50)
+    assert len(selecionado) == 50
+    assert any(trecho.startswith(selecionado) for trecho in dividir_em_trechos(texto))
+
+def test_dividir_em_trechos_respeita_o_tamanho_e_nao_perde_texto():
+    texto = " ".join(f"Frase número {numero} do texto corrido." for numero in range(200))
+    trechos = dividir_em_trechos(texto, tamanho=200)
+    assert len(trechos) > 1
+    assert all(len(trecho) <= 400 for trecho in trechos)
+    assert " ".join(trechos).split() == texto.split()